@@ -0,0 +1,87 @@
+"""
+Mede throughput de compressão/descompressão e razão de compressão de cada
+codec/nível sobre payloads com o formato real (guild, players, TW, TB e
+calendário), para escolher o codec por tipo de objeto.
+
+Throughput é calculado sobre o tamanho do JSON não comprimido (MiB/s).
+
+Uso:
+    PYTHONPATH=. python benchmarks/compression.py [--payloads guild players] [--repeat 3]
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, List, Tuple
+
+import utils
+from benchmarks.payloads import PAYLOADS
+
+# (codec, nível) avaliados por padrão
+DEFAULT_SETTINGS = [
+    ("gzip", 1),
+    ("gzip", 6),
+    ("gzip", 9),
+    ("lzma", 1),
+    ("lzma", 6),
+    ("bz2", 9),
+]
+
+
+def _best_of(func: Callable[[], bytes], repeat: int) -> Tuple[float, bytes]:
+    best = float("inf")
+    result = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(payload_names: List[str], settings: List[Tuple[str, int]], repeat: int) -> None:
+    print(
+        f"{'payload':<10} {'codec':<8} {'nível':>5} {'JSON MiB':>9} {'comp KiB':>9} "
+        f"{'razão':>6} {'comp MiB/s':>11} {'desc MiB/s':>11}"
+    )
+    for name in payload_names:
+        raw = json.dumps(PAYLOADS[name](), ensure_ascii=False, default=str).encode("utf-8")
+        raw_mb = len(raw) / 2**20
+
+        for codec_name, level in settings:
+            codec = utils.CODECS[codec_name]
+            comp_s, compressed = _best_of(lambda: codec.compress(raw, level), repeat)
+            decomp_s, restored = _best_of(lambda: codec.decompress(compressed), repeat)
+            assert restored == raw
+
+            print(
+                f"{name:<10} {codec_name:<8} {level:>5} {raw_mb:>9.2f} "
+                f"{len(compressed) / 1024:>9.1f} {len(raw) / len(compressed):>6.1f} "
+                f"{raw_mb / comp_s:>11.1f} {raw_mb / decomp_s:>11.1f}"
+            )
+
+
+def _parse_setting(value: str) -> Tuple[str, int]:
+    codec_name, _, level = value.partition(":")
+    if codec_name not in utils.CODECS or not level.isdigit():
+        raise argparse.ArgumentTypeError(f"Esperado codec:nível, ex. gzip:6 (recebido {value})")
+    return codec_name, int(level)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payloads", nargs="+", choices=list(PAYLOADS), default=list(PAYLOADS))
+    parser.add_argument(
+        "--settings",
+        nargs="+",
+        type=_parse_setting,
+        default=DEFAULT_SETTINGS,
+        help="Pares codec:nível, ex. gzip:6 lzma:1",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run(args.payloads, args.settings, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
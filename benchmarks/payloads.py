@@ -0,0 +1,209 @@
+"""
+Payloads sintéticos com o formato das respostas reais (guild, players, TW,
+TB e calendário), usados pelos benchmarks. Gerados de forma determinística
+a partir de uma seed para que as medições sejam comparáveis entre execuções.
+"""
+
+import random
+from typing import Any, Dict, List
+
+GUILD_SIZE = 50
+ROSTER_SIZE = 250
+BASE_TIMESTAMP_MS = 1_700_000_000_000
+
+
+def _player_id(i: int) -> str:
+    return f"p{i:04d}-{'x' * 18}"
+
+
+def make_guild(members: int = GUILD_SIZE, seed: int = 1) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    return {
+        "profile": {
+            "id": "guild-" + "g" * 16,
+            "name": "Crosshair Squad",
+            "memberCount": members,
+            "guildGalacticPower": str(rng.randint(400_000_000, 600_000_000)),
+        },
+        "member": [
+            {
+                "playerId": _player_id(i),
+                "playerName": f"Player {i}",
+                "playerLevel": 85,
+                "memberLevel": rng.choice(["GUILD_MEMBER", "GUILD_OFFICER", "GUILD_LEADER"]),
+                "guildJoinTime": str(1_600_000_000 + rng.randint(0, 10_000_000)),
+                "galacticPower": str(rng.randint(5_000_000, 12_000_000)),
+                "lastActivityTime": str(BASE_TIMESTAMP_MS + rng.randint(0, 86_400_000)),
+                "memberContribution": [
+                    {
+                        "type": t,
+                        "currentValue": str(rng.randint(0, 600)),
+                        "lifetimeValue": str(rng.randint(0, 100_000)),
+                    }
+                    for t in (
+                        "CONTRIBUTION_TYPE_TRIBUTE",
+                        "CONTRIBUTION_TYPE_COMMENDATION",
+                        "CONTRIBUTION_TYPE_DONATION",
+                    )
+                ],
+            }
+            for i in range(members)
+        ],
+    }
+
+
+def make_player(i: int, roster: int = ROSTER_SIZE, seed: int = 1) -> Dict[str, Any]:
+    rng = random.Random(seed * 100_003 + i)
+    return {
+        "playerId": _player_id(i),
+        "name": f"Player {i}",
+        "level": 85,
+        "allyCode": str(100_000_000 + i),
+        "lastActivityTime": str(BASE_TIMESTAMP_MS + rng.randint(0, 86_400_000)),
+        "profileStat": [
+            {"nameKey": f"STAT_{k}", "value": str(rng.randint(0, 10**9))} for k in range(20)
+        ],
+        "rosterUnit": [
+            {
+                "id": f"unit{u:03d}{'u' * 8}",
+                "definitionId": f"UNIT_{u:03d}:SEVEN_STAR",
+                "currentRarity": 7,
+                "currentLevel": 85,
+                "currentXp": 0,
+                "currentTier": rng.randint(1, 13),
+                "relic": {"currentTier": rng.randint(1, 11)},
+                "skill": [{"id": f"skill_{u}_{k}", "tier": rng.randint(1, 8)} for k in range(4)],
+                "equippedStatMod": [
+                    {
+                        "id": f"mod{u}{m}",
+                        "definitionId": str(rng.randint(100, 999)),
+                        "level": 15,
+                        "tier": 5,
+                        "primaryStat": {
+                            "stat": {"unitStatId": rng.randint(1, 60), "statValueDecimal": "5880"}
+                        },
+                        "secondaryStat": [
+                            {
+                                "stat": {
+                                    "unitStatId": rng.randint(1, 60),
+                                    "statValueDecimal": str(rng.randint(1, 100_000)),
+                                },
+                                "statRolls": rng.randint(1, 5),
+                            }
+                            for _ in range(4)
+                        ],
+                    }
+                    for m in range(6)
+                ],
+            }
+            for u in range(roster)
+        ],
+    }
+
+
+def make_players(
+    members: int = GUILD_SIZE, roster: int = ROSTER_SIZE, seed: int = 1
+) -> List[Dict[str, Any]]:
+    return [make_player(i, roster=roster, seed=seed) for i in range(members)]
+
+
+def make_tw(members: int = GUILD_SIZE, seed: int = 1) -> Dict[str, Any]:
+    rng = random.Random(seed)
+
+    def banners(key: str = "banners") -> List[Dict[str, Any]]:
+        return [{"memberId": _player_id(i), key: rng.randint(0, 600)} for i in range(members)]
+
+    return {
+        "territoryMapId": f"TERRITORY_WAR_EVENT_C01:O{BASE_TIMESTAMP_MS}",
+        "data": {
+            "totalBanners": banners(),
+            "attackBanners": banners(),
+            "defenseBanners": banners(),
+            "rogueActions": banners("rogueActions"),
+        },
+    }
+
+
+def make_tb(members: int = GUILD_SIZE, rounds: int = 6, seed: int = 1) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    stat_ids = ["summary"] + [
+        f"{kind}_round_{r}"
+        for r in range(1, rounds + 1)
+        for kind in (
+            "power",
+            "strike_attempt",
+            "strike_encounter",
+            "covert_complete",
+            "unit_donated",
+        )
+    ]
+
+    def zones(kind: str, per_round: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "zoneStatus": {
+                    "zoneId": f"tb3_phase{r:02d}_{kind}{z:02d}",
+                    "zoneState": rng.choice(["ZONEOPEN", "ZONECOMPLETE", "ZONELOCKED"]),
+                    "score": str(rng.randint(0, 500_000_000)),
+                    "commandState": "ZONENOTCOMMANDED",
+                },
+                "playersParticipated": rng.randint(0, members),
+            }
+            for r in range(1, rounds + 1)
+            for z in range(per_round)
+        ]
+
+    return {
+        "territoryBattleStatus": {
+            "instanceId": f"TB_EVENT_C01:O{BASE_TIMESTAMP_MS}",
+            "definitionId": "t05D",
+            "currentRound": rounds,
+            "conflictZoneStatus": zones("conflict", 3),
+            "strikeZoneStatus": zones("strike", 8),
+            "reconZoneStatus": zones("recon", 3),
+            "covertZoneStatus": zones("covert", 2),
+            "currentStat": [
+                {
+                    "mapStatId": stat_id,
+                    "playerStat": [
+                        {"memberId": _player_id(i), "score": str(rng.randint(0, 200_000_000))}
+                        for i in range(members)
+                    ],
+                }
+                for stat_id in stat_ids
+            ],
+        }
+    }
+
+
+def make_calendar(events: int = 40, seed: int = 1) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    types = ["TERRITORY_WAR_EVENT", "TERRITORY_BATTLE_EVENT", "SCHEDULED", "LAUNCH"]
+    return {
+        "code": 0,
+        "events": [
+            {
+                "id": f"EVENT_{e}",
+                "type": types[e % len(types)],
+                "nameKey": f"EVENT_{e}_NAME",
+                "instance": [
+                    {
+                        "id": f"O{BASE_TIMESTAMP_MS + k * 86_400_000}",
+                        "startTime": str(BASE_TIMESTAMP_MS + k * 86_400_000),
+                        "endTime": str(BASE_TIMESTAMP_MS + (k + rng.randint(1, 6)) * 86_400_000),
+                    }
+                    for k in range(rng.randint(1, 3))
+                ],
+            }
+            for e in range(events)
+        ],
+    }
+
+
+PAYLOADS = {
+    "guild": make_guild,
+    "players": make_players,
+    "tw": make_tw,
+    "tb": make_tb,
+    "calendar": make_calendar,
+}
@@ -0,0 +1,87 @@
+"""
+Compara o tamanho de uma semana de snapshots de players gravados inteiros
+contra base + deltas diários (`utils.PlayersSnapshots`).
+
+A evolução diária é simulada sobre o payload sintético: uma fração dos
+players joga no dia (lastActivityTime, alguns relics/níveis de mod, stats
+do perfil) e, ocasionalmente, um membro sai e outro entra.
+
+Uso:
+    PYTHONPATH=. python benchmarks/players_delta.py [--days 7] [--active 0.6]
+"""
+
+import argparse
+import copy
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+import utils
+from benchmarks.payloads import GUILD_SIZE, ROSTER_SIZE, make_player, make_players
+
+
+def next_day(players: List[Dict[str, Any]], rng: random.Random, active: float) -> List[Any]:
+    players = copy.deepcopy(players)
+    for player in players:
+        if rng.random() > active:
+            continue
+        player["lastActivityTime"] = str(int(player["lastActivityTime"]) + 86_400_000)
+        for stat in rng.sample(player["profileStat"], 3):
+            stat["value"] = str(int(stat["value"]) + rng.randint(1, 5000))
+        for unit in rng.sample(player["rosterUnit"], 3):
+            unit["relic"]["currentTier"] = min(11, unit["relic"]["currentTier"] + 1)
+            unit["equippedStatMod"][rng.randrange(6)]["level"] = 15
+    if rng.random() < 0.2:
+        players.pop(rng.randrange(len(players)))
+        players.append(make_player(rng.randint(1000, 9999), seed=rng.randint(1, 10**6)))
+    return players
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--active", type=float, default=0.6, help="Fração de players ativos/dia")
+    parser.add_argument("--members", type=int, default=GUILD_SIZE)
+    parser.add_argument("--roster", type=int, default=ROSTER_SIZE)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    days = [make_players(args.members, args.roster)]
+    for _ in range(args.days - 1):
+        days.append(next_day(days[-1], rng, args.active))
+
+    full = utils.GCSClient("full", client=utils.MemoryStorageClient())
+    delta = utils.GCSClient("delta", client=utils.MemoryStorageClient())
+    snapshots = utils.PlayersSnapshots(delta, "g", base_interval=args.days)
+    start = date(2024, 1, 1)
+
+    full_total = delta_total = 0
+    write_s = read_s = 0.0
+    print(f"{'dia':<12} {'inteiro KiB':>12} {'gravado KiB':>12} {'formato':>8}")
+    for offset, players in enumerate(days):
+        day = start + timedelta(days=offset)
+        info = full._upload_json_gzip(players, f"g/{day}/players.json.gz")
+
+        t0 = time.perf_counter()
+        path = snapshots.write(day, players)
+        write_s += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        assert snapshots.read(day) == players
+        read_s += time.perf_counter() - t0
+
+        written = delta.uploaded[path].size
+        full_total += info.size
+        delta_total += written
+        kind = "delta" if path.endswith(snapshots.DELTA_NAME) else "base"
+        print(f"{day.isoformat():<12} {info.size / 1024:>12.1f} {written / 1024:>12.1f} {kind:>8}")
+
+    print(
+        f"\nTotal: inteiro {full_total / 2**20:.2f} MiB, base+delta {delta_total / 2**20:.2f} MiB "
+        f"({full_total / delta_total:.1f}x menor); escrita {write_s:.2f}s, "
+        f"reconstrução {read_s:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
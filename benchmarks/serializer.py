@@ -0,0 +1,64 @@
+"""
+Microbenchmark de encode/decode JSON por backend (stdlib e orjson) sobre
+cada tipo de payload bronze (guild, players, TW, TB e calendário).
+
+Também confere que os backends geram exatamente os mesmos bytes.
+
+Uso:
+    PYTHONPATH=. python benchmarks/serializer.py [--payloads players tw] [--repeat 5]
+"""
+
+import argparse
+import time
+from typing import Callable, List
+
+import utils
+from benchmarks.payloads import PAYLOADS
+
+
+def _best_of(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(payload_names: List[str], backends: List[str], repeat: int) -> None:
+    print(
+        f"{'payload':<10} {'backend':<8} {'JSON MiB':>9} {'enc ms':>8} {'dec ms':>8} "
+        f"{'enc MiB/s':>10} {'dec MiB/s':>10} {'idêntico':>9}"
+    )
+    for name in payload_names:
+        payload = PAYLOADS[name]()
+        reference = utils.get_serializer("json").dumps(payload)
+        size_mb = len(reference) / 2**20
+
+        for backend in backends:
+            serializer = utils.get_serializer(backend)
+            encoded = serializer.dumps(payload)
+            enc_s = _best_of(lambda: serializer.dumps(payload), repeat)
+            dec_s = _best_of(lambda: serializer.loads(encoded), repeat)
+
+            print(
+                f"{name:<10} {serializer.name:<8} {size_mb:>9.2f} {enc_s * 1000:>8.1f} "
+                f"{dec_s * 1000:>8.1f} {size_mb / enc_s:>10.1f} {size_mb / dec_s:>10.1f} "
+                f"{'sim' if encoded == reference else 'NÃO':>9}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payloads", nargs="+", choices=list(PAYLOADS), default=list(PAYLOADS))
+    parser.add_argument(
+        "--backends", nargs="+", choices=list(utils.SERIALIZERS), default=list(utils.SERIALIZERS)
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.payloads, args.backends, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Mede a transformação silver do TB (`silver.tb_leaderboard`) sobre um
+payload sintético de tamanho real (guild cheia, 6 fases), comparando a
+montagem colunar com a montagem linha a linha (lista de dicts).
+
+A meta é ficar abaixo de 1 s por TB; o script sai com código 1 se a versão
+colunar passar de `--budget`.
+
+Uso:
+    PYTHONPATH=. python benchmarks/tb_silver.py [--members 50] [--rounds 6] [--repeat 5]
+"""
+
+import argparse
+import time
+from typing import Any, Callable, Dict
+
+import pandas as pd
+
+from benchmarks.payloads import GUILD_SIZE, make_tb
+from silver.tb_leaderboard import ZONE_KINDS, member_stats_table, zone_table
+
+
+def rowwise_tables(status: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+    """Referência: um dict por linha, convertido no fim."""
+    zones = []
+    for key, kind in ZONE_KINDS.items():
+        for zone in status.get(key) or []:
+            zone_status = zone.get("zoneStatus") or {}
+            zone_id = zone_status.get("zoneId") or ""
+            phase = zone_id.split("phase", 1)[1][:2] if "phase" in zone_id else None
+            zones.append(
+                {
+                    "zone_kind": kind,
+                    "zone_id": zone_id,
+                    "phase": int(phase) if phase else None,
+                    "zone_state": zone_status.get("zoneState"),
+                    "command_state": zone_status.get("commandState"),
+                    "score": int(zone_status.get("score") or 0),
+                    "players_participated": int(zone.get("playersParticipated") or 0),
+                }
+            )
+
+    members = []
+    for stat in status.get("currentStat") or []:
+        map_stat_id = stat.get("mapStatId")
+        name, _, round_ = map_stat_id.partition("_round_")
+        for row in stat.get("playerStat") or []:
+            members.append(
+                {
+                    "player_id": row.get("memberId"),
+                    "map_stat_id": map_stat_id,
+                    "stat": name,
+                    "round": int(round_) if round_ else None,
+                    "score": int(row.get("score") or 0),
+                }
+            )
+    return {"tb_zone_status": pd.DataFrame(zones), "tb_member_stats": pd.DataFrame(members)}
+
+
+def columnar_tables(status: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+    return {"tb_zone_status": zone_table(status), "tb_member_stats": member_stats_table(status)}
+
+
+def _best_of(func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=GUILD_SIZE)
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="Limite (s) da versão colunar")
+    args = parser.parse_args()
+
+    status = make_tb(args.members, args.rounds)["territoryBattleStatus"]
+    tables = columnar_tables(status)
+    rows = {name: len(df) for name, df in tables.items()}
+    print(f"Payload: {args.members} membros, {args.rounds} fases, linhas {rows}")
+
+    # As duas montagens geram as mesmas linhas e valores
+    reference = rowwise_tables(status)
+    for name, df in tables.items():
+        assert df["score"].tolist() == reference[name]["score"].tolist(), name
+
+    print(f"{'montagem':<10} {'ms':>8}")
+    timings = {}
+    for label, func in (("linhas", rowwise_tables), ("colunar", columnar_tables)):
+        timings[label] = _best_of(lambda: func(status), args.repeat)
+        print(f"{label:<10} {timings[label] * 1000:>8.1f}")
+
+    print(f"\nColunar {timings['linhas'] / timings['colunar']:.1f}x mais rápida que linhas.")
+    if timings["colunar"] > args.budget:
+        print(f"ACIMA DO LIMITE: {timings['colunar']:.2f}s > {args.budget:.2f}s")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Compara o pico de RSS do upload de JSON.gz em memória (upload_from_file com
+BytesIO) contra o caminho streaming (BlobWriter resumable).
+
+Cada modo roda em um subprocesso próprio para que o pico de memória de um
+não contamine o outro. O bucket é simulado: os bytes são consumidos e
+descartados, então só o custo de serialização/compressão é medido.
+
+Uso:
+    PYTHONPATH=. python benchmarks/upload_memory.py [--members 50] [--roster 250]
+"""
+
+import argparse
+import gc
+import json
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+import utils
+from benchmarks.payloads import make_players
+
+
+class _DiscardWriter:
+    """Imita o BlobWriter: acumula até `chunk_size` e 'envia' o bloco."""
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self.buffer = BytesIO()
+        self.sent = 0
+
+    def write(self, data: bytes) -> int:
+        self.buffer.write(data)
+        if self.buffer.tell() >= self.chunk_size:
+            self.sent += self.buffer.tell()
+            self.buffer = BytesIO()
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.sent += self.buffer.tell()
+        self.buffer = BytesIO()
+
+
+class _DiscardBlob:
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or utils.DEFAULT_UPLOAD_CHUNK_SIZE
+
+    def upload_from_file(self, fileobj, **kwargs):
+        while fileobj.read(1024 * 1024):
+            pass
+
+    def open(self, mode, chunk_size=None, **kwargs):
+        return _DiscardWriter(chunk_size or self.chunk_size)
+
+
+class _DiscardBucket:
+    def blob(self, path, chunk_size=None):
+        return _DiscardBlob(chunk_size)
+
+
+class _DiscardClient:
+    def bucket(self, name):
+        return _DiscardBucket()
+
+
+def _reset_peak_rss() -> bool:
+    """Zera o VmHWM do processo (Linux >= 4.0); retorna False se não suportado."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Fallback: ru_maxrss (KiB no Linux) não pode ser zerado
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(mode: str, members: int, roster: int, chunk_size: int) -> None:
+    payload = make_players(members=members, roster=roster)
+    gc.collect()
+    _reset_peak_rss()
+    baseline = _peak_rss_mb()
+
+    gcs = utils.GCSClient("bench", client=_DiscardClient(), upload_chunk_size=chunk_size)
+    start = time.perf_counter()
+    ok = gcs.upload_json_gzip(payload, "bench/players.json.gz", stream=(mode == "stream"))
+    elapsed = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "ok": ok,
+                "baseline_mb": round(baseline, 1),
+                "peak_mb": round(_peak_rss_mb(), 1),
+                "seconds": round(elapsed, 3),
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--roster", type=int, default=250)
+    parser.add_argument("--chunk-size", type=int, default=utils.DEFAULT_UPLOAD_CHUNK_SIZE)
+    parser.add_argument("--child", choices=["memory", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.members, args.roster, args.chunk_size)
+        return
+
+    payload_mb = len(json.dumps(make_players(args.members, args.roster), default=str)) / 2**20
+    print(f"Payload players: {args.members} membros, JSON ~{payload_mb:.1f} MiB")
+    print(f"{'modo':<8} {'base MiB':>10} {'pico MiB':>10} {'extra MiB':>10} {'tempo s':>8}")
+
+    for mode in ("memory", "stream"):
+        out = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--child",
+                mode,
+                "--members",
+                str(args.members),
+                "--roster",
+                str(args.roster),
+                "--chunk-size",
+                str(args.chunk_size),
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        extra = r["peak_mb"] - r["baseline_mb"]
+        print(
+            f"{r['mode']:<8} {r['baseline_mb']:>10.1f} {r['peak_mb']:>10.1f} "
+            f"{extra:>10.1f} {r['seconds']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -31,89 +31,59 @@ def load_env_var(var_name: str) -> str:
     return value
 
 
-def main():
-    # ----------------------------------------------------
-    # Carregar variáveis de ambiente
-    # ----------------------------------------------------
-    try:
-        API_KEY = load_env_var("MHANN_APIKEY")
-        ALLYCODE = load_env_var("ALLYCODE")
-        GCS_BUCKET_NAME = load_env_var("GCS_BUCKET_NAME")
-    except ValueError as e:
-        logger.critical(f"Falha ao carregar variáveis de ambiente: {e}")
-        raise SystemExit(1)
+# ----------------------------------------------------
+# Extrator: calendário de eventos (único, não depende da guild)
+# ----------------------------------------------------
+def fetch(ctx, guild_id=None):
+    mbot = ctx.mhann(API, load_env_var("ALLYCODE"))
+    logger.info("Consultando endpoint EVENTS...")
+    return mbot.fetch_data(endpoint=EndPoint.EVENTS, enums=True)
 
-    # ----------------------------------------------------
-    # Inicializar API
-    # ----------------------------------------------------
-    try:
-        mbot = API(api_key=API_KEY, allycode=ALLYCODE)
-        logger.info("Cliente mhanndalorian_bot inicializado com sucesso.")
-    except Exception as e:
-        logger.critical(f"Erro ao inicializar API: {e}", exc_info=True)
-        raise SystemExit(1)
 
-    # ----------------------------------------------------
-    # Buscar dados
-    # ----------------------------------------------------
-    try:
-        logger.info("Consultando endpoint EVENTS...")
-        resp = mbot.fetch_data(endpoint=EndPoint.EVENTS, enums=True)
-        logger.info("Dados obtidos com sucesso.")
-    except Exception as e:
-        logger.error(f"Erro ao buscar dados dos eventos: {e}", exc_info=True)
-        raise SystemExit(1)
+def validate(resp):
+    if not isinstance(resp, dict):
+        raise ValueError("Resposta da API não é um JSON válido.")
 
-    # ----------------------------------------------------
-    # Validar retorno da API
-    # ----------------------------------------------------
-    try:
-        if not isinstance(resp, dict):
-            raise ValueError("Resposta da API não é um JSON válido.")
+    if "code" not in resp:
+        raise ValueError("Resposta da API não contém o campo 'code'.")
 
-        if "code" not in resp:
-            raise ValueError("Resposta da API não contém o campo 'code'.")
+    if resp["code"] != 0:
+        raise RuntimeError(f"API error: code={resp['code']}, Message={resp.get('message')}")
+    return resp
 
-        if resp["code"] != 0:
-            raise RuntimeError(f"API error: code={resp['code']}, Message={resp.get('message')}")
 
-        logger.info("Validação do campo 'code' concluída – resposta OK.")
+def build_path(guild_id, resp):
+    now = datetime.now(timezone.utc)
+    return utils.calendar_path(now), now
+
+
+EXTRACTOR = utils.register_extractor(
+    utils.Extractor(
+        name="events",
+        fetch=fetch,
+        validate=validate,
+        path=build_path,
+        per_guild=False,
+        # Calendário igual ao último enviado vira cópia no servidor
+        dedup=lambda file_path: "calendar",
+    )
+)
 
-    except Exception as e:
-        logger.critical(f"Resposta inválida da API mhann: {e}", exc_info=True)
-        raise SystemExit(1)
 
+def main():
     # ----------------------------------------------------
-    # Inicializar cliente GCS
+    # Carregar variáveis de ambiente
     # ----------------------------------------------------
     try:
-        gcs = utils.GCSClient(GCS_BUCKET_NAME)
-        logger.info("Cliente GCS inicializado.")
-    except Exception as e:
-        logger.critical(f"Erro ao inicializar o cliente GCS: {e}", exc_info=True)
+        load_env_var("MHANN_APIKEY")
+        load_env_var("ALLYCODE")
+        load_env_var("GCS_BUCKET_NAME")
+    except ValueError as e:
+        logger.critical(f"Falha ao carregar variáveis de ambiente: {e}")
         raise SystemExit(1)
 
-    # ----------------------------------------------------
-    # Caminho do arquivo
-    # ----------------------------------------------------
-    now = datetime.now(timezone.utc)
-    folder_path = f"calendar/{now.year}/{now.month:02}/{now.day:02}"
-    file_path = f"{folder_path}/calendar.json.gz"
-
-    logger.info(f"Caminho final para upload: {file_path}")
-
-    # ----------------------------------------------------
-    # Upload
-    # ----------------------------------------------------
-    try:
-        success = gcs.upload_json_gzip(resp, file_path)
-        if success:
-            logger.info(f"Upload realizado: gs://{GCS_BUCKET_NAME}/{file_path}")
-        else:
-            logger.error("Falha ao enviar arquivo para o GCS.")
-            raise SystemExit(1)
-    except Exception as e:
-        logger.error(f"Erro inesperado ao realizar upload: {e}", exc_info=True)
+    (report,) = utils.run_extractors([EXTRACTOR])
+    if not report.ok:
         raise SystemExit(1)
 
     logger.info("Execução concluída com sucesso.")
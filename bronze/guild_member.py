@@ -1,11 +1,13 @@
+import argparse
 import os
+import time
 import logging
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from swgoh_comlink import SwgohComlink
 import utils
 
-
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
@@ -14,6 +16,15 @@ logger = logging.getLogger("guild_daily")
 
 load_dotenv()
 
+# Máximo de requisições get_player simultâneas (sobrescrito por PLAYER_FETCH_WORKERS)
+DEFAULT_FETCH_WORKERS = 8
+
+# Players gravados em shards entre dois checkpoints parciais (PLAYERS_CHECKPOINT_EVERY)
+DEFAULT_CHECKPOINT_EVERY = 10
+
+# Campos que toda projeção dos players mantém (chave de merge e de retomada)
+PLAYER_KEY_FIELDS = ("playerId",)
+
 
 # ----------------------------------------------------
 # Função utilitária para carregar variáveis de ambiente
@@ -26,48 +37,360 @@ def load_env_var(var_name: str) -> str:
     return value
 
 
-def main():
-    # ----------------------------------------------------
-    # Carregar variáveis de ambiente
-    # ----------------------------------------------------
+def get_fetch_workers() -> int:
+    """Lê PLAYER_FETCH_WORKERS do ambiente, com fallback para o padrão."""
+    raw = os.getenv("PLAYER_FETCH_WORKERS")
+    if not raw:
+        return DEFAULT_FETCH_WORKERS
     try:
-        GUILD_ID = load_env_var("GUILD_ID")
-        GCS_BUCKET_NAME = load_env_var("GCS_BUCKET_NAME")
-    except ValueError as e:
-        logger.critical(f"Falha ao carregar variáveis de ambiente: {e}")
-        raise SystemExit(1)
+        return max(1, int(raw))
+    except ValueError:
+        logger.warning(f"PLAYER_FETCH_WORKERS inválido ({raw}), usando {DEFAULT_FETCH_WORKERS}.")
+        return DEFAULT_FETCH_WORKERS
 
-    # ----------------------------------------------------
-    # Inicializar clientes
-    # ----------------------------------------------------
+
+def get_checkpoint_every() -> int:
+    """Lê PLAYERS_CHECKPOINT_EVERY (shards entre checkpoints parciais; 0 desliga)."""
+    raw = os.getenv("PLAYERS_CHECKPOINT_EVERY")
+    if not raw:
+        return DEFAULT_CHECKPOINT_EVERY
     try:
-        storage = utils.GCSClient(GCS_BUCKET_NAME)
-        logger.info("Cliente GCS inicializado.")
-    except Exception as e:
-        logger.critical(f"Erro ao inicializar cliente GCS: {e}", exc_info=True)
-        raise SystemExit(1)
+        return max(0, int(raw))
+    except ValueError:
+        logger.warning(
+            f"PLAYERS_CHECKPOINT_EVERY inválido ({raw}), usando {DEFAULT_CHECKPOINT_EVERY}."
+        )
+        return DEFAULT_CHECKPOINT_EVERY
+
+
+# ----------------------------------------------------
+# Coleta concorrente dos jogadores
+# ----------------------------------------------------
+def _member_player_ids(members: list) -> list:
+    player_ids = []
+    for member in members:
+        player_id = member.get("playerId")
+        if not player_id:
+            logger.warning("Membro sem playerId encontrado, ignorando.")
+            continue
+        player_ids.append(player_id)
+    return player_ids
+
+
+def get_player(comlink, player_id: str, caller=None):
+    """`comlink.get_player`, passando por `caller` (`utils.ResilientCaller`) se informado."""
+    if caller is None:
+        return comlink.get_player(player_id=player_id)
+    return caller.call(comlink.get_player, player_id=player_id)
+
+
+def fetch_players(
+    comlink, members: list, max_workers: int = DEFAULT_FETCH_WORKERS, caller=None
+) -> list:
+    """
+    Busca os perfis dos membros com no máximo `max_workers` requisições em voo.
+
+    A ordem do retorno segue a ordem dos membros; players com erro (após
+    os retries de `caller`, se houver) são registrados no log e omitidos.
+    """
+    player_ids = _member_player_ids(members)
+
+    def fetch_one(player_id: str):
+        try:
+            player_data = get_player(comlink, player_id, caller)
+            logger.info(f"Player {player_id} coletado.")
+            return True, player_data
+        except Exception as e:
+            logger.error(f"Falha ao buscar player {player_id}: {e}", exc_info=True)
+            return False, None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(fetch_one, player_ids))
+    elapsed = time.perf_counter() - start
+
+    players = [data for ok, data in results if ok]
+    throughput = len(players) / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Coleta finalizada: {len(players)}/{len(player_ids)} players em {elapsed:.2f}s "
+        f"({throughput:.2f} players/s, {max_workers} workers)."
+    )
+    return players
+
+
+def fetch_players_sharded(
+    comlink, members: list, writer, max_workers: int = DEFAULT_FETCH_WORKERS, caller=None
+) -> int:
+    """
+    Variante de `fetch_players` que entrega cada player a `writer.put`
+    (um `utils.ShardedJsonWriter`) assim que é coletado, sem acumular a
+    lista: os uploads correm em paralelo com as requisições restantes.
+
+    Returns:
+        int: Quantidade de players coletados.
+    """
+    player_ids = _member_player_ids(members)
+
+    def fetch_one(player_id: str) -> bool:
+        try:
+            player_data = get_player(comlink, player_id, caller)
+        except Exception as e:
+            logger.error(f"Falha ao buscar player {player_id}: {e}", exc_info=True)
+            return False
+        writer.put(player_id, player_data)
+        logger.info(f"Player {player_id} coletado e enfileirado para upload.")
+        return True
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        fetched = sum(executor.map(fetch_one, player_ids))
+    elapsed = time.perf_counter() - start
+
+    throughput = fetched / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Coleta finalizada: {fetched}/{len(player_ids)} players em {elapsed:.2f}s "
+        f"({throughput:.2f} players/s, {max_workers} workers)."
+    )
+    return fetched
+
+
+# ----------------------------------------------------
+# Coleta incremental (PLAYERS_INCREMENTAL=1)
+# ----------------------------------------------------
+# Campos do membro na resposta da guild que mudam quando o perfil do player muda
+MEMBER_CHANGE_FIELDS = ("lastActivityTime", "galacticPower")
+
+
+def member_fingerprint(member: dict) -> tuple:
+    return tuple(member.get(field) for field in MEMBER_CHANGE_FIELDS)
+
+
+def daily_folder(guild_id: str, day: datetime) -> str:
+    return f"{guild_id}/daily/{day.year}/{day.month:02}/{day.day:02}"
+
+
+def load_players_snapshot(
+    storage, guild_id: str, day: datetime, include_open: bool = False
+) -> dict:
+    """
+    Players já gravados para o dia, por playerId.
+
+    Para players em shards, os valores são as entradas do manifest de
+    shards (referências aos objetos), não os perfis. Com `include_open`,
+    vale também o manifest parcial de uma coleta interrompida (retomada).
+    Vazio se não houver.
+    """
+    shards = utils.load_shard_manifest(
+        storage, f"{daily_folder(guild_id, day)}/players", include_open=include_open
+    )
+    if shards is not None:
+        return dict(shards.get("shards", {}))
+
+    players = utils.PlayersSnapshots(storage, guild_id).read(day) or []
+    return {p.get("playerId"): p for p in players if isinstance(p, dict)}
+
+
+def load_previous_snapshot(storage, guild_id: str, day: datetime):
+    """
+    Membros da guild e players do dia anterior.
+
+    Returns:
+        tuple: (membros, {playerId: player}), como em `load_players_snapshot`.
+        Vazios se o dia anterior não tiver snapshot.
+    """
+    previous_day = day - timedelta(days=1)
+    guild_entry = utils.BronzeManifest(storage, guild_id, previous_day).resolve("guild")
+    guild_path = (
+        guild_entry["path"]
+        if guild_entry
+        else f"{daily_folder(guild_id, previous_day)}/guild.json.gz"
+    )
+    guild = storage.load_json_gzip(
+        guild_path, select={"member[*]": ["playerId", *MEMBER_CHANGE_FIELDS]}
+    )
+    members = (guild or {}).get("member", [])
+    return members, load_players_snapshot(storage, guild_id, previous_day)
+
+
+def split_changed_members(members: list, previous_members: list, previous_players: dict):
+    """
+    Separa os membros cujo perfil pode ter mudado dos que podem ser
+    reaproveitados do dia anterior.
+
+    Um membro é considerado inalterado quando `lastActivityTime` e
+    `galacticPower` são iguais aos da véspera e o player existe no snapshot
+    anterior; na dúvida (campos ausentes, membro novo) o perfil é buscado.
+
+    Returns:
+        tuple: (membros a buscar, {playerId: player anterior} reaproveitados)
+    """
+    previous = {
+        m.get("playerId"): member_fingerprint(m) for m in previous_members if m.get("playerId")
+    }
+    changed, carried = [], {}
+    for member in members:
+        player_id = member.get("playerId")
+        fingerprint = member_fingerprint(member)
+        unchanged = (
+            player_id in previous_players
+            and None not in fingerprint
+            and previous.get(player_id) == fingerprint
+        )
+        if unchanged:
+            carried[player_id] = previous_players[player_id]
+        else:
+            changed.append(member)
+    return changed, carried
+
+
+def split_resumed_members(members: list, collected: set, current_players: dict):
+    """
+    Separa os membros que o checkpoint do dia marca como coletados (e que
+    estão na saída já gravada) dos que faltam ou falharam.
+
+    Returns:
+        tuple: (membros a buscar, {playerId: player já gravado hoje})
+    """
+    missing, done = [], {}
+    for member in members:
+        player_id = member.get("playerId")
+        if player_id in collected and player_id in current_players:
+            done[player_id] = current_players[player_id]
+        else:
+            missing.append(member)
+    return missing, done
+
+
+def is_shard_reference(entry) -> bool:
+    """Entrada de manifest de shards (referência ao objeto), não um perfil."""
+    return isinstance(entry, dict) and "path" in entry and "sha256" in entry
+
+
+def resolve_shard_references(storage, members: list, carried: dict):
+    """
+    Troca as referências a shards em `carried` (dia anterior ou retomada
+    gravados em shards) pelos perfis, para uma saída em arquivo único.
+    Shards que não puderem ser lidos voltam para a lista de busca.
+
+    Returns:
+        tuple: (membros a buscar novamente, {playerId: player})
+    """
+    references = {key: e for key, e in carried.items() if is_shard_reference(e)}
+    if not references:
+        return [], carried
+
+    def load(entry):
+        try:
+            return storage.load_json_gzip(entry["path"])
+        except Exception as e:
+            logger.warning(f"Falha ao ler shard {entry['path']}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=get_fetch_workers()) as executor:
+        loaded = dict(zip(references, executor.map(load, references.values())))
 
+    resolved = {**carried, **{key: p for key, p in loaded.items() if isinstance(p, dict)}}
+    missing = {key for key, p in loaded.items() if not isinstance(p, dict)}
+    for key in missing:
+        del resolved[key]
+    if missing:
+        logger.warning(f"{len(missing)} shards reaproveitados ilegíveis; players serão buscados.")
+    return [m for m in members if m.get("playerId") in missing], resolved
+
+
+def merge_players(members: list, fetched: list, carried: dict) -> list:
+    """Players na ordem dos membros, combinando os buscados e os reaproveitados."""
+    by_id = {**carried, **{p.get("playerId"): p for p in fetched if isinstance(p, dict)}}
+    return [by_id[m["playerId"]] for m in members if m.get("playerId") in by_id]
+
+
+# ----------------------------------------------------
+# Projeção dos players (PLAYERS_PROJECTION) e cópia bruta fria
+# ----------------------------------------------------
+class ProjectingWriter:
+    """
+    Repassa a `writer` cada player já projetado e, se houver `raw_writer`,
+    o payload original, para uso com `fetch_players_sharded`.
+    """
+
+    def __init__(self, writer, projection, raw_writer=None):
+        self.writer = writer
+        self.projection = projection
+        self.raw_writer = raw_writer
+
+    def put(self, key: str, data) -> None:
+        if self.raw_writer is not None:
+            self.raw_writer.put(key, data)
+        self.writer.put(key, self.projection.apply(data))
+
+
+def get_players_projection(serializer=None):
+    """
+    Projeção de PLAYERS_PROJECTION (key paths separados por vírgula ou
+    arquivo com um por linha), ou None para manter o payload bruto. O
+    `playerId` é sempre mantido: é a chave usada por `merge_players`.
+    """
+    return utils.FieldProjection.from_spec(
+        os.getenv("PLAYERS_PROJECTION"), serializer, required=PLAYER_KEY_FIELDS
+    )
+
+
+def raw_players_target(storage, folder_path: str, now: datetime):
+    """
+    Destino da cópia bruta dos players quando PLAYERS_RAW_COLD=1: o bucket
+    PLAYERS_RAW_BUCKET (ou o próprio bucket) sob o prefixo "raw/". O nome
+    leva o horário da execução, para que retomadas não sobrescrevam a cópia.
+
+    Returns:
+        tuple | None: (cliente GCS, path sem extensão)
+    """
+    if not utils.env_flag("PLAYERS_RAW_COLD"):
+        return None
+    bucket = os.getenv("PLAYERS_RAW_BUCKET")
+    raw_storage = utils.GCSClient(bucket) if bucket else storage
+    return raw_storage, f"raw/{folder_path}/players-{now:%H%M%S}"
+
+
+def log_projection(projection) -> None:
+    stats = projection.stats()
+    logger.info(
+        f"Projeção de players: {stats['items']} players, "
+        f"{stats['raw_bytes'] / 1024:.1f} KiB -> {stats['projected_bytes'] / 1024:.1f} KiB "
+        f"(-{stats['reduction']:.1%} de JSON)."
+    )
+
+
+def save_checkpoint(checkpoint, members: list, collected: set) -> None:
+    """Grava no checkpoint os players salvos hoje; os demais membros ficam como falhos."""
+    expected = {m["playerId"] for m in members if m.get("playerId")}
     try:
-        comlink = SwgohComlink()
-        logger.info("Cliente SwgohComlink inicializado.")
+        checkpoint.save(collected=collected & expected, failed=expected - collected)
     except Exception as e:
-        logger.critical(f"Erro ao inicializar SwgohComlink: {e}", exc_info=True)
-        raise SystemExit(1)
+        logger.warning(f"Falha ao gravar checkpoint de players: {e}", exc_info=True)
+
+
+def collect_guild(storage, comlink, guild_id: str, resume: bool = False, caller=None) -> None:
+    """
+    Coleta guild e players de uma guild e grava a partição bronze do dia.
 
+    Os clientes são compartilhados entre as guilds processadas pelo mesmo
+    processo (ver `utils.run_for_guilds`).
+    """
     # ----------------------------------------------------
     # Construir caminho de destino
     # ----------------------------------------------------
     now = datetime.now(timezone.utc)
-    folder_path = f"{GUILD_ID}/daily/{now.year}/{now.month:02}/{now.day:02}"
+    folder_path = daily_folder(guild_id, now)
     logger.info(f"Caminho final para upload: {folder_path}")
+    manifest = utils.BronzeManifest(storage, guild_id, now)
 
     # ----------------------------------------------------
     # Buscar dados da guild
     # ----------------------------------------------------
     try:
-        logger.info("Consultando dados da guild...")
+        logger.info(f"Consultando dados da guild {guild_id}...")
         guild = comlink.get_guild(
-            guild_id=GUILD_ID,
+            guild_id=guild_id,
             include_recent_guild_activity_info=True,
             enums=True,
         )
@@ -83,41 +406,146 @@ def main():
         guild_path = f"{folder_path}/guild.json.gz"
         success = storage.upload_json_gzip(guild, guild_path)
         if success:
-            logger.info(f"Guild salva: gs://{GCS_BUCKET_NAME}/{guild_path}")
+            logger.info(f"Guild salva: gs://{storage.bucket_name}/{guild_path}")
+            manifest.record("guild", guild_path, records=len(guild.get("member", [])))
         else:
             logger.error("Falha ao fazer upload do arquivo da guild.")
     except Exception as e:
         logger.error(f"Erro inesperado ao salvar guild: {e}", exc_info=True)
 
+    # ----------------------------------------------------
+    # Parquet colunar da guild (opcional, BRONZE_PARQUET=1)
+    # ----------------------------------------------------
+    if utils.env_flag("BRONZE_PARQUET"):
+        try:
+            members = guild.get("member", [])
+            tables = {
+                "member": [
+                    utils.flatten_record(m, exclude=["memberContribution"]) for m in members
+                ],
+                "memberContribution": [
+                    {"playerId": m.get("playerId"), **utils.flatten_record(c)}
+                    for m in members
+                    for c in m.get("memberContribution", [])
+                ],
+            }
+            if not utils.upload_bronze_parquet(storage, guild_path, tables):
+                logger.error("Falha ao gravar Parquet da guild.")
+        except Exception as e:
+            logger.error(f"Erro inesperado ao gerar Parquet da guild: {e}", exc_info=True)
+
     # ----------------------------------------------------
     # Buscar dados dos jogadores
     # ----------------------------------------------------
-    players = []
     members = guild.get("member", [])
 
     logger.info(f"Iniciando coleta: {len(members)} membros encontrados.")
 
-    for member in members:
-        player_id = member.get("playerId")
-        if not player_id:
-            logger.warning("Membro sem playerId encontrado, ignorando.")
-            continue
+    checkpoint = utils.CollectionCheckpoint.from_env(
+        storage, f"{folder_path}/_checkpoint/players.json.gz"
+    )
+    to_fetch, carried = members, {}
+    if resume:
+        try:
+            state = checkpoint.load()
+            current_players = load_players_snapshot(storage, guild_id, now, include_open=True)
+            to_fetch, carried = split_resumed_members(members, state["collected"], current_players)
+            logger.info(
+                f"Retomada: {len(carried)} players já coletados hoje, {len(to_fetch)} a buscar."
+            )
+        except Exception as e:
+            logger.warning(f"Checkpoint indisponível, coletando todos: {e}", exc_info=True)
+            to_fetch, carried = members, {}
 
+    if utils.env_flag("PLAYERS_INCREMENTAL"):
         try:
-            player_data = comlink.get_player(player_id=player_id)
-            players.append(player_data)
-            logger.info(f"Player {player_id} coletado.")
+            previous_members, previous_players = load_previous_snapshot(storage, guild_id, now)
+            to_fetch, unchanged = split_changed_members(
+                to_fetch, previous_members, previous_players
+            )
+            carried.update(unchanged)
+            logger.info(
+                f"Coleta incremental: {len(unchanged)} players inalterados reaproveitados, "
+                f"{len(to_fetch)} a buscar."
+            )
         except Exception as e:
-            logger.error(f"Falha ao buscar player {player_id}: {e}", exc_info=True)
+            logger.warning(f"Snapshot anterior indisponível, coletando todos: {e}", exc_info=True)
+
+    projection = get_players_projection(storage.serializer)
+    raw_target = raw_players_target(storage, folder_path, now) if projection else None
+
+    if utils.env_flag("PLAYERS_SHARDED"):
+        # Um objeto por player, enviado enquanto os demais ainda são buscados
+        try:
+            # Manifest parcial e checkpoint a cada N shards: uma queda no meio
+            # da coleta não obriga a retomada a buscar tudo de novo
+            writer = utils.ShardedJsonWriter(
+                storage,
+                f"{folder_path}/players",
+                flush_every=get_checkpoint_every(),
+                on_flush=lambda keys: save_checkpoint(checkpoint, members, keys),
+            )
+            for player_id, entry in carried.items():
+                if is_shard_reference(entry):
+                    writer.reference(player_id, entry)
+                else:
+                    writer.put(player_id, projection.apply(entry) if projection else entry)
+            target, raw_writer = writer, None
+            if projection is not None:
+                if raw_target is not None:
+                    raw_writer = utils.ShardedJsonWriter(*raw_target)
+                target = ProjectingWriter(writer, projection, raw_writer)
+            fetched = fetch_players_sharded(
+                comlink, to_fetch, target, max_workers=get_fetch_workers(), caller=caller
+            )
+            if raw_writer is not None:
+                raw_writer.close()
+            if projection is not None:
+                log_projection(projection)
+            shards = writer.close(extra={"expected": len(members)})
+            save_checkpoint(checkpoint, members, set(shards["shards"]))
+            if shards["complete"]:
+                manifest.record("players", writer.manifest_path, records=fetched + len(carried))
+            else:
+                logger.error(f"Shards de players com falha: {sorted(shards['errors'])}")
+        except Exception as e:
+            logger.error(f"Erro inesperado ao salvar shards dos jogadores: {e}", exc_info=True)
+        return
+
+    # Referências a shards só valem num manifest de shards: aqui viram perfis
+    refetch, carried = resolve_shard_references(storage, members, carried)
+    to_fetch = to_fetch + refetch
+    players = fetch_players(comlink, to_fetch, max_workers=get_fetch_workers(), caller=caller)
+    if projection is not None:
+        if raw_target is not None:
+            raw_storage, raw_path = raw_target
+            if raw_storage.upload_json_gzip(players, f"{raw_path}.json.gz", stream=True):
+                logger.info(
+                    f"Players brutos salvos: gs://{raw_storage.bucket_name}/{raw_path}.json.gz"
+                )
+            else:
+                logger.error("Falha ao salvar a cópia bruta dos players.")
+        players = [projection.apply(p) for p in players]
+        log_projection(projection)
+    if carried:
+        players = merge_players(members, players, carried)
 
     # ----------------------------------------------------
     # Upload dos players
     # ----------------------------------------------------
     try:
-        players_path = f"{folder_path}/players.json.gz"
-        success = storage.upload_json_gzip(players, players_path)
+        if utils.env_flag("PLAYERS_DELTA"):
+            # Base completa periódica + delta diário por player
+            snapshots = utils.PlayersSnapshots.from_env(storage, guild_id)
+            players_path = snapshots.write(now, players)
+            success = True
+        else:
+            players_path = f"{folder_path}/players.json.gz"
+            success = storage.upload_json_gzip(players, players_path, stream=True)
         if success:
-            logger.info(f"Jogadores salvos: gs://{GCS_BUCKET_NAME}/{players_path}")
+            logger.info(f"Jogadores salvos: gs://{storage.bucket_name}/{players_path}")
+            manifest.record("players", players_path, records=len(players))
+            save_checkpoint(checkpoint, members, {p.get("playerId") for p in players})
         else:
             logger.error("Falha ao fazer upload do arquivo de players.")
     except Exception as e:
@@ -126,11 +554,105 @@ def main():
             exc_info=True,
         )
 
+
+# ----------------------------------------------------
+# Extrator: clientes compartilhados e coleta por guild
+# ----------------------------------------------------
+def comlink_client(ctx):
+    return ctx.client(
+        "comlink",
+        lambda: utils.RateLimitedClient(SwgohComlink(), utils.get_rate_limiter("comlink")),
+    )
+
+
+def player_caller(ctx):
+    """Retry/timeout/hedging do get_player (PLAYER_FETCH_RETRIES, _TIMEOUT, _HEDGE...)."""
+
+    def create():
+        guild_workers = utils.get_guild_workers(len(utils.guild_ids_from_env()))
+        return utils.ResilientCaller(
+            utils.RetryPolicy.from_env("PLAYER_FETCH"),
+            name="get_player",
+            pool_size=2 * get_fetch_workers() * guild_workers,
+        )
+
+    return ctx.client("get_player", create)
+
+
+def run(ctx, guild_id: str) -> None:
+    try:
+        storage = ctx.gcs
+        logger.info("Cliente GCS inicializado.")
+    except Exception as e:
+        logger.critical(f"Erro ao inicializar cliente GCS: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    try:
+        comlink = comlink_client(ctx)
+        logger.info("Cliente SwgohComlink inicializado.")
+    except Exception as e:
+        logger.critical(f"Erro ao inicializar SwgohComlink: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    collect_guild(storage, comlink, guild_id, ctx.options.get("resume", False), player_caller(ctx))
+
+
+EXTRACTOR = utils.register_extractor(utils.Extractor(name="guild", run=run))
+
+
+def main(resume: bool = False):
+    """
+    Args:
+        resume (bool): Busca só os players ausentes ou com falha no
+            checkpoint do dia, mantendo os já gravados.
+    """
+    # ----------------------------------------------------
+    # Carregar variáveis de ambiente
+    # ----------------------------------------------------
+    try:
+        utils.guild_ids_from_env()
+        load_env_var("GCS_BUCKET_NAME")
+    except ValueError as e:
+        logger.critical(f"Falha ao carregar variáveis de ambiente: {e}")
+        raise SystemExit(1)
+
+    # ----------------------------------------------------
+    # Coletar cada guild (em paralelo, clientes compartilhados)
+    # ----------------------------------------------------
+    ctx = utils.ExtractorContext(resume=resume)
+    try:
+        (report,) = utils.run_extractors([EXTRACTOR], ctx)
+    finally:
+        ctx.close()
+    log_client_stats(ctx)
+    if not report.ok:
+        raise SystemExit(1)
+
     logger.info("Execução concluída com sucesso.")
 
 
+def log_client_stats(ctx) -> None:
+    """Estado do limitador do comlink e latências do get_player ao fim da execução."""
+    comlink = ctx.get("comlink")
+    if comlink is not None:
+        logger.info(f"Limitador comlink: {comlink.limiter.stats()}")
+    caller = ctx.get("get_player")
+    if caller is not None:
+        logger.info(f"Latência get_player: {caller.stats()}")
+
+
 # ----------------------------------------------------
 # Execução
 # ----------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Coleta diária da guild e dos jogadores.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Busca apenas os players ausentes ou com falha no checkpoint do dia.",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    main(resume=parse_args().resume)
@@ -0,0 +1,120 @@
+import argparse
+import importlib
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+logger = logging.getLogger("bronze_run")
+
+load_dotenv()
+
+
+# ----------------------------------------------------
+# Extratores disponíveis (módulos que registram um EXTRACTOR)
+# ----------------------------------------------------
+EXTRACTOR_MODULES = (
+    "bronze.events",
+    "bronze.tw_leaderboard",
+    "bronze.tb_leaderboard",
+    "bronze.guild_member",
+)
+
+
+def import_extractors(modules=EXTRACTOR_MODULES) -> Tuple[Dict[str, float], float]:
+    """
+    Importa a biblioteca compartilhada (`utils`, que carrega google-cloud,
+    requests etc.) e os módulos dos extratores, registrando-os em
+    `utils.EXTRACTORS`. `utils` só é importado aqui, para que o seu custo,
+    o maior do cold start, entre na medição.
+
+    Returns:
+        tuple: (tempo de import (s) por nome de extrator, tempo do import
+        compartilhado).
+    """
+    start = time.perf_counter()
+    importlib.import_module("utils")
+    shared_s = time.perf_counter() - start
+
+    import_times = {}
+    for module_name in modules:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        import_times[module.EXTRACTOR.name] = time.perf_counter() - start
+    return import_times, shared_s
+
+
+def main(names: Optional[List[str]] = None, resume: bool = False, force: bool = False):
+    """
+    Executa vários extratores num único processo, compartilhando os
+    clientes (GCS, comlink, mhann) entre eles.
+
+    Args:
+        names (list): Extratores a executar, na ordem dada (padrão: todos).
+        resume (bool): Repassado ao extrator da guild (ver guild_member).
+        force (bool): TW/TB buscam mesmo instâncias já registradas.
+    """
+    try:
+        import_times, shared_s = import_extractors()
+    except Exception as e:
+        logger.critical(f"Erro ao importar extratores: {e}", exc_info=True)
+        raise SystemExit(1)
+    import utils
+
+    names = names or list(import_times)
+    logger.info(f"Imports compartilhados (utils) em {shared_s:.2f}s.")
+    # O primeiro extrator arca com o import compartilhado, como arcaria
+    # num processo isolado
+    if names[0] in import_times:
+        import_times[names[0]] += shared_s
+    unknown = [name for name in names if name not in utils.EXTRACTORS]
+    if unknown:
+        logger.critical(f"Extratores desconhecidos: {unknown}")
+        raise SystemExit(1)
+
+    ctx = utils.ExtractorContext(resume=resume, force=force)
+    try:
+        reports = utils.run_extractors(
+            [utils.EXTRACTORS[name] for name in names], ctx, import_times
+        )
+    finally:
+        ctx.close()
+
+    failed = [report.name for report in reports if not report.ok]
+    if failed:
+        logger.critical(f"Extratores com falha: {failed}")
+        raise SystemExit(1)
+
+    logger.info("Execução concluída com sucesso.")
+
+
+# ----------------------------------------------------
+# Execução
+# ----------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Executa os extratores bronze num único processo.")
+    parser.add_argument(
+        "extractors",
+        nargs="*",
+        help="Nomes dos extratores (events, twleaderboard, tbleaderboard, guild). Padrão: todos.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Coleta de players retoma do checkpoint do dia.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="TW/TB buscam e gravam mesmo instâncias já registradas.",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.extractors, resume=args.resume, force=args.force)
@@ -1,3 +1,4 @@
+import argparse
 import os
 import re
 import logging
@@ -30,114 +31,164 @@ def load_env_var(var_name: str) -> str:
     return value
 
 
-def main():
+# ----------------------------------------------------
+# Extrator: busca, validação e caminho do TB
+# ----------------------------------------------------
+def fetch(ctx, guild_id: str):
+    allycode = utils.allycodes_for_guilds(utils.guild_ids_from_env())[guild_id]
+    mbot = ctx.mhann(API, allycode)
+    logger.info(f"Consultando endpoint TB da guild {guild_id}...")
+    return mbot.fetch_data(endpoint=EndPoint.TB, enums=True)
+
+
+def validate(resp):
+    """Confere a resposta e devolve o `territoryBattleStatus`, que é o que se grava."""
+    if not isinstance(resp, dict):
+        raise ValueError("Resposta da API não é um JSON válido.")
+
+    if "territoryBattleStatus" not in resp:
+        raise ValueError("Resposta da API não contém o campo 'territoryBattleStatus'.")
+    return resp.get("territoryBattleStatus")
+
+
+def tb_date_from(resp) -> datetime:
+    """Data do TB, extraída do timestamp (ms) embutido no instanceId."""
+    match = re.search(r"O(\d+)", resp.get("instanceId"))
+    if not match:
+        raise ValueError(f"Erro inesperado no instanceId: {resp.get('instanceId')}")
+
+    tb_timestamp_ms = int(match.group(1))
+    tb_date = datetime.fromtimestamp(tb_timestamp_ms // 1000, tz=timezone.utc)
+    logger.info(f"TW detectado na data: {tb_date.isoformat()}")
+    return tb_date
+
+
+def build_path(guild_id: str, resp):
+    tb_date = tb_date_from(resp)
+    folder_path = f"{guild_id}/events/tb/{tb_date.strftime('%Y%m%d')}"
+    return f"{folder_path}/tbleaderboard.json.gz", tb_date
+
+
+ZONE_LISTS = ("conflictZoneStatus", "strikeZoneStatus", "reconZoneStatus", "covertZoneStatus")
+
+
+def progress(resp) -> dict:
+    """Métricas do poll: fase atual, score por zona e score total por membro."""
+    zones = {}
+    for name in ZONE_LISTS:
+        for zone in resp.get(name) or []:
+            status = zone.get("zoneStatus") or {}
+            if status.get("zoneId"):
+                zones[status["zoneId"]] = int(status.get("score") or 0)
+
+    summary = next(
+        (s for s in resp.get("currentStat") or [] if s.get("mapStatId") == "summary"), {}
+    )
+    return {
+        "currentRound": resp.get("currentRound"),
+        "zones": zones,
+        "members": {
+            row.get("memberId"): int(row.get("score") or 0)
+            for row in summary.get("playerStat") or []
+        },
+    }
+
+
+EXTRACTOR = utils.register_extractor(
+    utils.Extractor(
+        name="tbleaderboard",
+        fetch=fetch,
+        validate=validate,
+        path=build_path,
+        # Reexecuções com o mesmo payload não reenviam o arquivo
+        dedup=lambda file_path: file_path,
+        records=lambda resp: len(resp.get("currentStat", [])),
+        event_id=lambda resp: resp.get("instanceId"),
+        event_type="TERRITORY_BATTLE_EVENT",
+        progress=progress,
+    )
+)
 
+
+def main(force: bool = False, instance_id=None, poll: bool = False, interval=None, max_polls=None):
+    """
+    Args:
+        force (bool): Busca e grava mesmo se a instância já estiver registrada.
+        instance_id (str): Instância esperada (ex. "O1700000000000"); se
+            omitida, a em andamento no calendário do dia.
+        poll (bool): Acompanha o evento ao vivo: consulta a cada `interval`
+            segundos (POLL_INTERVAL_SECONDS) até o fim da instância ou
+            `max_polls`, gravando só as mudanças (ver utils.LiveSnapshots).
+    """
     # ----------------------------------------------------
     # Carregar variáveis de ambiente
     # ----------------------------------------------------
     try:
-        API_KEY = load_env_var("MHANN_APIKEY")
-        ALLYCODE = load_env_var("ALLYCODE")
-        GUILD_ID = load_env_var("GUILD_ID")
-        GCS_BUCKET_NAME = load_env_var("GCS_BUCKET_NAME")
+        load_env_var("MHANN_APIKEY")
+        load_env_var("GCS_BUCKET_NAME")
+        utils.allycodes_for_guilds(utils.guild_ids_from_env())
     except ValueError as e:
         logger.critical(f"Falha ao carregar variáveis de ambiente: {e}")
         raise SystemExit(1)
 
     # ----------------------------------------------------
-    # Inicializar API
-    # ----------------------------------------------------
-    try:
-        mbot = API(api_key=API_KEY, allycode=ALLYCODE)
-        logger.info("Cliente mhanndalorian_bot inicializado com sucesso.")
-    except Exception as e:
-        logger.critical(f"Erro ao inicializar API: {e}", exc_info=True)
-        raise SystemExit(1)
-
-    # ----------------------------------------------------
-    # Consultar TW Leaderboard
-    # ----------------------------------------------------
-    try:
-        logger.info("Consultando endpoint TB...")
-        resp = mbot.fetch_data(endpoint=EndPoint.TB, enums=True)
-        logger.info("Dados obtidos com sucesso.")
-    except Exception as e:
-        logger.error(f"Erro ao buscar dados do TB: {e}", exc_info=True)
-        raise SystemExit(1)
-
-    """import json
-    with open("resp_debug2.json", "w") as f:
-        json.dump(resp, f, indent=2)
-    exit(0)"""
-    # ----------------------------------------------------
-    # Validar retorno da API
-    # ----------------------------------------------------
-    try:
-        if not isinstance(resp, dict):
-            raise ValueError("Resposta da API não é um JSON válido.")
-
-        if "territoryBattleStatus" not in resp:
-            raise ValueError("Resposta da API não contém o campo 'territoryBattleStatus'.")
-
-        logger.info("Validação do retorno concluída – resposta OK.")
-    except Exception as e:
-        logger.critical(f"Resposta inválida da API mhann: {e}", exc_info=True)
-        raise SystemExit(1)
-
-    resp = resp.get("territoryBattleStatus")
-    # ----------------------------------------------------
-    # Extrair timestamp do TW
+    # Processar cada guild (em paralelo, clientes compartilhados)
     # ----------------------------------------------------
-    try:
-        match = re.search(r"O(\d+)", resp.get("instanceId"))
-        if not match:
-            raise ValueError(f"Erro inesperado no instanceId: {resp.get('instanceId')}")
-
-        tb_timestamp_ms = int(match.group(1))
-        tb_date = datetime.fromtimestamp(tb_timestamp_ms // 1000, tz=timezone.utc)
-        logger.info(f"TW detectado na data: {tb_date.isoformat()}")
-
-    except Exception as e:
-        logger.error(f"Erro ao processar instanceId: {e}", exc_info=True)
-        raise SystemExit(1)
-
-    # ----------------------------------------------------
-    # Inicializar cliente GCS
-    # ----------------------------------------------------
-    try:
-        gcs = utils.GCSClient(GCS_BUCKET_NAME)
-        logger.info("Cliente GCS inicializado com sucesso.")
-    except Exception as e:
-        logger.critical(f"Erro ao inicializar o cliente GCS: {e}", exc_info=True)
-        raise SystemExit(1)
+    ctx = utils.ExtractorContext(force=force, instance_id=instance_id)
+    if poll:
+        run_poll(ctx, utils.get_poll_interval() if interval is None else interval, max_polls)
+    else:
+        (report,) = utils.run_extractors([EXTRACTOR], ctx)
+        if not report.ok:
+            raise SystemExit(1)
 
-    # ----------------------------------------------------
-    # Construir caminho de upload
-    # ----------------------------------------------------
-    folder_path = f"{GUILD_ID}/events/tb/{tb_date.strftime('%Y%m%d')}"
-    file_path = f"{folder_path}/tbleaderboard.json.gz"
+    logger.info("Execução concluída com sucesso.")
 
-    logger.info(f"Caminho final para upload: {file_path}")
 
-    # ----------------------------------------------------
-    # Upload para o GCS
-    # ----------------------------------------------------
-    try:
-        success = gcs.upload_json_gzip(resp, file_path)
-        if success:
-            logger.info(f"Upload realizado: gs://{GCS_BUCKET_NAME}/{file_path}")
-        else:
-            logger.error("Falha ao enviar arquivo para o GCS.")
-            raise SystemExit(1)
-    except Exception as e:
-        logger.error(f"Erro inesperado ao realizar upload: {e}", exc_info=True)
+def run_poll(ctx, interval: float, max_polls=None) -> None:
+    """Modo poll: todas as guilds acompanhadas em paralelo até o fim do TB."""
+    guild_ids = utils.guild_ids_from_env()
+    runs = utils.run_for_guilds(
+        guild_ids,
+        lambda guild_id: utils.poll_extractor(EXTRACTOR, ctx, guild_id, interval, max_polls),
+        max_workers=len(guild_ids),
+    )
+    if not all(run.ok for run in runs.values()):
         raise SystemExit(1)
 
-    logger.info("Execução concluída com sucesso.")
-
 
 # ----------------------------------------------------
 # Execução
 # ----------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Coleta do leaderboard de TB de cada guild.")
+    parser.add_argument(
+        "--instance-id",
+        help="Instância do evento no calendário; já registrada, a execução termina sem buscar.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Busca e grava mesmo se a instância já tiver sido registrada.",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Acompanha o evento ao vivo, gravando só as mudanças entre consultas.",
+    )
+    parser.add_argument(
+        "--interval", type=float, help="Segundos entre consultas no modo poll (padrão: 300)."
+    )
+    parser.add_argument("--max-polls", type=int, help="Encerra o poll após N consultas.")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(
+        force=args.force,
+        instance_id=args.instance_id,
+        poll=args.poll,
+        interval=args.interval,
+        max_polls=args.max_polls,
+    )
@@ -1,3 +1,4 @@
+import argparse
 import os
 import re
 import logging
@@ -18,6 +19,9 @@ logger = logging.getLogger("twleaderboard")
 
 load_dotenv()
 
+# Arrays de data achatados em Parquet quando BRONZE_PARQUET=1
+TW_HOT_ARRAYS = ["totalBanners", "attackBanners", "defenseBanners", "rogueActions"]
+
 
 # ----------------------------------------------------
 # Função utilitária para carregar variáveis de ambiente
@@ -30,109 +34,170 @@ def load_env_var(var_name: str) -> str:
     return value
 
 
-def main():
+# ----------------------------------------------------
+# Extrator: busca, validação e caminho do TW
+# ----------------------------------------------------
+def fetch(ctx, guild_id: str):
+    allycode = utils.allycodes_for_guilds(utils.guild_ids_from_env())[guild_id]
+    mbot = ctx.mhann(API, allycode)
+    logger.info(f"Consultando endpoint TWLEADERBOARD da guild {guild_id}...")
+    return mbot.fetch_data(endpoint=EndPoint.TWLEADERBOARD)
+
+
+def validate(resp):
+    if not isinstance(resp, dict):
+        raise ValueError("Resposta da API não é um JSON válido.")
+
+    if "territoryMapId" not in resp:
+        raise ValueError("Resposta da API não contém o campo 'territoryMapId'.")
+    return resp
+
+
+def tw_date_from(resp) -> datetime:
+    """Data do TW, extraída do timestamp (ms) embutido no territoryMapId."""
+    match = re.search(r"O(\d+)", resp.get("territoryMapId", ""))
+    if not match:
+        raise ValueError(f"Erro inesperado no territoryMapId: {resp.get('territoryMapId')}")
+
+    tw_timestamp_ms = int(match.group(1))
+    tw_date = datetime.fromtimestamp(tw_timestamp_ms // 1000, tz=timezone.utc)
+    logger.info(f"TW detectado na data: {tw_date.isoformat()}")
+    return tw_date
+
+
+def build_path(guild_id: str, resp):
+    tw_date = tw_date_from(resp)
+    folder_path = f"{guild_id}/events/tw/{tw_date.strftime('%Y%m%d')}"
+    return f"{folder_path}/twleaderboard.json.gz", tw_date
+
+
+def upload_parquet(ctx, guild_id: str, resp, file_path: str) -> None:
+    """Parquet colunar dos arrays quentes (opcional, BRONZE_PARQUET=1)."""
+    if not utils.env_flag("BRONZE_PARQUET"):
+        return
+    data = resp.get("data") or {}
+    tables = {
+        name: [utils.flatten_record(row) for row in data.get(name, [])] for name in TW_HOT_ARRAYS
+    }
+    if not utils.upload_bronze_parquet(ctx.gcs, file_path, tables):
+        logger.error("Falha ao gravar Parquet do TW.")
+
+
+def progress(resp) -> dict:
+    """Métricas do poll: banners somados da guild e total por membro."""
+    data = resp.get("data") or {}
+
+    def total(name: str, field: str = "banners") -> int:
+        return sum(int(row.get(field) or 0) for row in data.get(name, []))
+
+    return {
+        "totalBanners": total("totalBanners"),
+        "attackBanners": total("attackBanners"),
+        "defenseBanners": total("defenseBanners"),
+        "rogueActions": total("rogueActions", "rogueActions"),
+        "members": {
+            row.get("memberId"): int(row.get("banners") or 0)
+            for row in data.get("totalBanners", [])
+        },
+    }
+
+
+EXTRACTOR = utils.register_extractor(
+    utils.Extractor(
+        name="twleaderboard",
+        fetch=fetch,
+        validate=validate,
+        path=build_path,
+        # Reexecuções com o mesmo payload não reenviam o arquivo
+        dedup=lambda file_path: file_path,
+        records=lambda resp: len((resp.get("data") or {}).get("totalBanners", [])),
+        event_id=lambda resp: resp.get("territoryMapId"),
+        after_upload=upload_parquet,
+        event_type="TERRITORY_WAR_EVENT",
+        progress=progress,
+    )
+)
+
 
+def main(force: bool = False, instance_id=None, poll: bool = False, interval=None, max_polls=None):
+    """
+    Args:
+        force (bool): Busca e grava mesmo se a instância já estiver registrada.
+        instance_id (str): Instância esperada (ex. "O1700000000000"); se
+            omitida, a em andamento no calendário do dia.
+        poll (bool): Acompanha o evento ao vivo: consulta a cada `interval`
+            segundos (POLL_INTERVAL_SECONDS) até o fim da instância ou
+            `max_polls`, gravando só as mudanças (ver utils.LiveSnapshots).
+    """
     # ----------------------------------------------------
     # Carregar variáveis de ambiente
     # ----------------------------------------------------
     try:
-        API_KEY = load_env_var("MHANN_APIKEY")
-        ALLYCODE = load_env_var("ALLYCODE")
-        GUILD_ID = load_env_var("GUILD_ID")
-        GCS_BUCKET_NAME = load_env_var("GCS_BUCKET_NAME")
+        load_env_var("MHANN_APIKEY")
+        load_env_var("GCS_BUCKET_NAME")
+        utils.allycodes_for_guilds(utils.guild_ids_from_env())
     except ValueError as e:
         logger.critical(f"Falha ao carregar variáveis de ambiente: {e}")
         raise SystemExit(1)
 
     # ----------------------------------------------------
-    # Inicializar API
-    # ----------------------------------------------------
-    try:
-        mbot = API(api_key=API_KEY, allycode=ALLYCODE)
-        logger.info("Cliente mhanndalorian_bot inicializado com sucesso.")
-    except Exception as e:
-        logger.critical(f"Erro ao inicializar API: {e}", exc_info=True)
-        raise SystemExit(1)
-
-    # ----------------------------------------------------
-    # Consultar TW Leaderboard
-    # ----------------------------------------------------
-    try:
-        logger.info("Consultando endpoint TWLEADERBOARD...")
-        resp = mbot.fetch_data(endpoint=EndPoint.TWLEADERBOARD)
-        logger.info("Dados obtidos com sucesso.")
-    except Exception as e:
-        logger.error(f"Erro ao buscar dados do TW Leaderboard: {e}", exc_info=True)
-        raise SystemExit(1)
-
-    # ----------------------------------------------------
-    # Validar retorno da API
-    # ----------------------------------------------------
-    try:
-        if not isinstance(resp, dict):
-            raise ValueError("Resposta da API não é um JSON válido.")
-
-        if "territoryMapId" not in resp:
-            raise ValueError("Resposta da API não contém o campo 'territoryMapId'.")
-
-        logger.info("Validação do retorno concluída – resposta OK.")
-    except Exception as e:
-        logger.critical(f"Resposta inválida da API mhann: {e}", exc_info=True)
-        raise SystemExit(1)
-
-    # ----------------------------------------------------
-    # Extrair timestamp do TW
+    # Processar cada guild (em paralelo, clientes compartilhados)
     # ----------------------------------------------------
-    try:
-        match = re.search(r"O(\d+)", resp.get("territoryMapId", ""))
-        if not match:
-            raise ValueError(f"Erro inesperado no territoryMapId: {resp.get('territoryMapId')}")
-
-        tw_timestamp_ms = int(match.group(1))
-        tw_date = datetime.fromtimestamp(tw_timestamp_ms // 1000, tz=timezone.utc)
-        logger.info(f"TW detectado na data: {tw_date.isoformat()}")
-
-    except Exception as e:
-        logger.error(f"Erro ao processar territoryMapId: {e}", exc_info=True)
-        raise SystemExit(1)
-
-    # ----------------------------------------------------
-    # Inicializar cliente GCS
-    # ----------------------------------------------------
-    try:
-        gcs = utils.GCSClient(GCS_BUCKET_NAME)
-        logger.info("Cliente GCS inicializado com sucesso.")
-    except Exception as e:
-        logger.critical(f"Erro ao inicializar o cliente GCS: {e}", exc_info=True)
-        raise SystemExit(1)
+    ctx = utils.ExtractorContext(force=force, instance_id=instance_id)
+    if poll:
+        run_poll(ctx, utils.get_poll_interval() if interval is None else interval, max_polls)
+    else:
+        (report,) = utils.run_extractors([EXTRACTOR], ctx)
+        if not report.ok:
+            raise SystemExit(1)
 
-    # ----------------------------------------------------
-    # Construir caminho de upload
-    # ----------------------------------------------------
-    folder_path = f"{GUILD_ID}/events/tw/{tw_date.strftime('%Y%m%d')}"
-    file_path = f"{folder_path}/twleaderboard.json.gz"
+    logger.info("Execução concluída com sucesso.")
 
-    logger.info(f"Caminho final para upload: {file_path}")
 
-    # ----------------------------------------------------
-    # Upload para o GCS
-    # ----------------------------------------------------
-    try:
-        success = gcs.upload_json_gzip(resp, file_path)
-        if success:
-            logger.info(f"Upload realizado: gs://{GCS_BUCKET_NAME}/{file_path}")
-        else:
-            logger.error("Falha ao enviar arquivo para o GCS.")
-            raise SystemExit(1)
-    except Exception as e:
-        logger.error(f"Erro inesperado ao realizar upload: {e}", exc_info=True)
+def run_poll(ctx, interval: float, max_polls=None) -> None:
+    """Modo poll: todas as guilds acompanhadas em paralelo até o fim do TW."""
+    guild_ids = utils.guild_ids_from_env()
+    runs = utils.run_for_guilds(
+        guild_ids,
+        lambda guild_id: utils.poll_extractor(EXTRACTOR, ctx, guild_id, interval, max_polls),
+        max_workers=len(guild_ids),
+    )
+    if not all(run.ok for run in runs.values()):
         raise SystemExit(1)
 
-    logger.info("Execução concluída com sucesso.")
-
 
 # ----------------------------------------------------
 # Execução
 # ----------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Coleta do leaderboard de TW de cada guild.")
+    parser.add_argument(
+        "--instance-id",
+        help="Instância do evento no calendário; já registrada, a execução termina sem buscar.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Busca e grava mesmo se a instância já tiver sido registrada.",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Acompanha o evento ao vivo, gravando só as mudanças entre consultas.",
+    )
+    parser.add_argument(
+        "--interval", type=float, help="Segundos entre consultas no modo poll (padrão: 300)."
+    )
+    parser.add_argument("--max-polls", type=int, help="Encerra o poll após N consultas.")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(
+        force=args.force,
+        instance_id=args.instance_id,
+        poll=args.poll,
+        interval=args.interval,
+        max_polls=args.max_polls,
+    )
@@ -33,9 +33,11 @@ def load_env_var(var_name: str) -> str:
 # ----------------------------------------------------
 # Atualizar cron
 # ----------------------------------------------------
-def update_cron(job_name: str, cron_expr: str, script_path: str):
+def update_cron(job_name: str, cron_expr: str, script_path: str, args=()):
     """
     Atualiza o crontab para adicionar ou substituir um job identificado por job_name.
+
+    `args` são acrescentados ao comando (ex. --instance-id do evento).
     """
 
     try:
@@ -51,7 +53,8 @@ def update_cron(job_name: str, cron_expr: str, script_path: str):
         lines = [line for line in lines if not line.strip().endswith(f"# {job_name}")]
 
         # Adicionar entrada nova
-        entry = f"{cron_expr} {os.getenv('BIN_PATH')} {script_path} # {job_name}"
+        command = " ".join([script_path, *args])
+        entry = f"{cron_expr} {os.getenv('BIN_PATH')} {command} # {job_name}"
         lines.append(entry)
 
         new_cron = "\n".join(lines) + "\n"
@@ -69,37 +72,37 @@ def update_cron(job_name: str, cron_expr: str, script_path: str):
         return False
 
 
+# ----------------------------------------------------
+# Eventos acompanhados: tipo -> (rótulo, job do cron, pipeline)
+# ----------------------------------------------------
+TRACKED_EVENTS = {
+    "TERRITORY_WAR_EVENT": ("TW", "TW_EVENT", "pipelines/tw_leaderboard.py"),
+    "TERRITORY_BATTLE_EVENT": ("TB", "TB_EVENT", "pipelines/tb_leaderboard.py"),
+}
+
+
 # ----------------------------------------------------
 # Função para extrair horário do evento
 # ----------------------------------------------------
-def get_event_schedule(event_type: str, gcs_client: utils.GCSClient, file_path: str):
+def instance_args(instance):
+    """`--instance-id` da instância agendada, para o bronze pular reexecuções."""
+    return ["--instance-id", instance["id"]] if instance and instance.get("id") else []
+
+
+def get_event_schedule(event_type: str, instance):
     """
     Retorna a expressão cron correspondente ao evento.
-    """
-
-    try:
-        events_raw = gcs_client.load_json_gzip(file_path)
-        if not events_raw:
-            logger.warning(f"Arquivo vazio ou inexistente: {file_path}")
-            return None
-    except Exception as e:
-        logger.error(f"Erro ao carregar arquivo {file_path}: {e}", exc_info=True)
-        return None
 
-    events = events_raw.get("events", [])
-    target_event = next((e for e in events if e.get("type") == event_type), None)
+    Recebe a instância já resolvida pelo `utils.CalendarIndex`, para que
+    todos os tipos de evento saiam de uma única leitura do calendário.
+    """
 
-    if not target_event:
-        logger.info(f"Nenhum evento encontrado para {event_type}")
+    if not instance:
+        logger.info(f"Nenhuma instância encontrada para {event_type}")
         return None
 
     try:
-        instance_list = target_event.get("instance", [])
-        if not instance_list:
-            logger.info(f"Nenhuma instância encontrada para {event_type}")
-            return None
-
-        end_time_ms = int(instance_list[0].get("endTime"))
+        end_time_ms = int(instance.get("endTime"))
         end_datetime = datetime.fromtimestamp(end_time_ms / 1000, tz=timezone.utc)
 
         cron_dt = end_datetime - timedelta(minutes=1)
@@ -140,33 +143,30 @@ def main():
     # Carregar arquivo do calendário
     # ----------------------------------------------------
     now = datetime.now(timezone.utc)
-    file_path = f"calendar/{now.year}/{now.month:02}/{now.day:02}/calendar.json.gz"
+    file_path = utils.calendar_path(now)
 
     logger.info(f"Arquivo de calendário: {file_path}")
 
-    # ----------------------------------------------------
-    # TERRITORY WAR
-    # ----------------------------------------------------
-    logger.info("Processando evento: TERRITORY_WAR_EVENT")
-    tw_cron = get_event_schedule("TERRITORY_WAR_EVENT", gcs, file_path)
-
-    if tw_cron:
-        script_path = f"{RELATIVE_PATH}/pipelines/tw_leaderboard.py"
-        update_cron("TW_EVENT", tw_cron, script_path)
-    else:
-        logger.info("Nenhum evento TW encontrado.")
+    try:
+        index = utils.CalendarIndex.load(gcs, file_path)
+    except Exception as e:
+        logger.error(f"Erro ao carregar arquivo {file_path}: {e}", exc_info=True)
+        index = utils.CalendarIndex()
 
     # ----------------------------------------------------
-    # TERRITORY BATTLE
+    # Agendar cada evento acompanhado (uma consulta ao índice)
     # ----------------------------------------------------
-    logger.info("Processando evento: TERRITORY_BATTLE_EVENT")
-    tb_cron = get_event_schedule("TERRITORY_BATTLE_EVENT", gcs, file_path)
-
-    if tb_cron:
-        script_path = f"{RELATIVE_PATH}/pipelines/tb_leaderboard.py"
-        update_cron("TB_EVENT", tb_cron, script_path)
-    else:
-        logger.info("Nenhum evento TB encontrado.")
+    instances = index.resolve(TRACKED_EVENTS, now)
+    for event_type, (label, job_name, pipeline) in TRACKED_EVENTS.items():
+        logger.info(f"Processando evento: {event_type}")
+        instance = instances[event_type]
+        cron_expr = get_event_schedule(event_type, instance)
+
+        if cron_expr:
+            script_path = f"{RELATIVE_PATH}/{pipeline}"
+            update_cron(job_name, cron_expr, script_path, instance_args(instance))
+        else:
+            logger.info(f"Nenhum evento {label} encontrado.")
 
     logger.info("Execução concluída com sucesso.")
 
@@ -0,0 +1,5 @@
+"""
+Biblioteca compartilhada pelos jobs bronze/silver: storage, manifests,
+extratores e resiliência. Os scripts a usam pelo módulo `utils`, que
+reexporta a API pública dos submódulos.
+"""
@@ -0,0 +1,170 @@
+"""Índice do calendário de eventos da guild (TW/TB por tipo)."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from crosshair.storage import GCSClient, _atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Calendário de eventos (índice por tipo)
+# ----------------------------------------
+CALENDAR_INDEX_FORMAT = "calendar-index/1"
+
+
+def calendar_path(day: Union[date, datetime]) -> str:
+    """Path do calendário de eventos gravado por bronze/events.py no dia."""
+    return f"calendar/{day.year}/{day.month:02}/{day.day:02}/calendar.json.gz"
+
+
+_LOAD_LOCKS: Dict[str, threading.Lock] = {}
+_LOAD_LOCKS_LOCK = threading.Lock()
+
+
+def _load_lock(key: str) -> threading.Lock:
+    """Lock do carregamento do índice para um cache (ou calendário) específico."""
+    with _LOAD_LOCKS_LOCK:
+        return _LOAD_LOCKS.setdefault(key, threading.Lock())
+
+
+def _parse_ms(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CalendarIndex:
+    """
+    Calendário de eventos indexado por tipo: cada tipo aponta para suas
+    instâncias (na ordem do calendário) com a janela startTime/endTime já
+    convertida para ms. Montado numa única passada sobre o calendar.json.gz,
+    resolve qualquer tipo sem reler nem percorrer a lista de eventos.
+
+    `load` guarda o índice num arquivo local junto da generation do
+    calendário; nas execuções seguintes o GCS é consultado de forma
+    condicional e o calendário só é baixado e reindexado se a generation
+    mudou.
+    """
+
+    def __init__(
+        self,
+        by_type: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        generation: Optional[int] = None,
+    ):
+        self.by_type = by_type or {}
+        self.generation = generation
+
+    @classmethod
+    def build(cls, events_raw: Any, generation: Optional[int] = None) -> "CalendarIndex":
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        events = events_raw.get("events", []) if isinstance(events_raw, dict) else []
+        for event in events:
+            instances = by_type.setdefault(event.get("type"), [])
+            for instance in event.get("instance") or []:
+                instances.append(
+                    {
+                        "id": instance.get("id"),
+                        "eventId": event.get("id"),
+                        "startTime": instance.get("startTime"),
+                        "endTime": instance.get("endTime"),
+                        "start": _parse_ms(instance.get("startTime")),
+                        "end": _parse_ms(instance.get("endTime")),
+                    }
+                )
+        return cls(by_type, generation)
+
+    def instance(self, event_type: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Instância do evento `event_type` em andamento em `now` (startTime <=
+        now <= endTime); sem nenhuma em andamento, a primeira listada.
+        """
+        instances = self.by_type.get(event_type) or []
+        if not instances:
+            return None
+        now_ms = int((now or datetime.now(timezone.utc)).timestamp() * 1000)
+        for instance in instances:
+            if None not in (instance["start"], instance["end"]):
+                if instance["start"] <= now_ms <= instance["end"]:
+                    return instance
+        return instances[0]
+
+    def resolve(
+        self, event_types: Iterable[str], now: Optional[datetime] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Instância de cada tipo acompanhado, numa única consulta ao índice."""
+        now = now or datetime.now(timezone.utc)
+        return {event_type: self.instance(event_type, now) for event_type in event_types}
+
+    @staticmethod
+    def cache_path_from_env() -> Optional[str]:
+        """CALENDAR_INDEX_CACHE ou, com GCS_CACHE_DIR, `calendar_index.json` nele."""
+        path = os.getenv("CALENDAR_INDEX_CACHE")
+        if path:
+            return path
+        directory = os.getenv("GCS_CACHE_DIR")
+        return os.path.join(directory, "calendar_index.json") if directory else None
+
+    @classmethod
+    def load(cls, gcs: "GCSClient", path: str, cache_path: Optional[str] = None) -> "CalendarIndex":
+        """
+        Índice do calendário em `path`, reaproveitando o índice em cache se
+        a generation do objeto não mudou. Calendário ausente ou ilegível
+        resulta num índice vazio.
+        """
+        cache_path = cache_path or cls.cache_path_from_env()
+        key = f"{gcs.bucket_name}/{path}"
+        # Threads do mesmo processo (ex. guilds em paralelo) esperam quem
+        # já está carregando, e leem o cache que ela acabou de gravar
+        with _load_lock(cache_path or key):
+            return cls._load(gcs, path, key, cache_path)
+
+    @classmethod
+    def _load(
+        cls, gcs: "GCSClient", path: str, key: str, cache_path: Optional[str]
+    ) -> "CalendarIndex":
+        cached = None
+        if cache_path:
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                if cached.get("format") != CALENDAR_INDEX_FORMAT or cached.get("key") != key:
+                    cached = None
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Cache do índice do calendário ilegível ({cache_path}): {e}")
+                cached = None
+
+        generation = cached.get("generation") if cached else None
+        result = gcs.fetch_json_gzip(path, if_generation_not_match=generation)
+        if cached and result.not_modified:
+            logger.info(f"Índice do calendário reaproveitado (generation {generation}).")
+            return cls(cached["index"], generation)
+        if result.data is None:
+            logger.warning(f"Calendário indisponível: {path}")
+            return cls()
+
+        index = cls.build(result.data, result.generation)
+        if cache_path and result.generation is not None:
+            cache = {
+                "format": CALENDAR_INDEX_FORMAT,
+                "key": key,
+                "generation": result.generation,
+                "index": index.by_type,
+            }
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+                # Temporário + rename: outro processo nunca lê um cache pela metade
+                _atomic_write(cache_path, json.dumps(cache).encode("utf-8"))
+            except OSError as e:
+                logger.warning(f"Falha ao gravar cache do índice do calendário: {e}")
+        return index
@@ -0,0 +1,16 @@
+"""Leitura de variáveis de ambiente opcionais."""
+
+from __future__ import annotations
+
+import os
+from typing import List
+
+
+def env_list(var_name: str) -> List[str]:
+    """Lê uma variável de ambiente como lista separada por vírgulas (sem vazios)."""
+    return [item.strip() for item in os.getenv(var_name, "").split(",") if item.strip()]
+
+
+def env_flag(var_name: str) -> bool:
+    """Interpreta uma variável de ambiente opcional como booleano."""
+    return os.getenv(var_name, "").strip().lower() in {"1", "true", "yes", "on"}
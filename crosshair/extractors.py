@@ -0,0 +1,340 @@
+"""Extratores bronze: registro, contexto compartilhado e execução."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from crosshair.calendar import CalendarIndex, calendar_path
+from crosshair.guilds import GuildRun, guild_ids_from_env, run_for_guilds
+from crosshair.manifests import BronzeManifest, InstanceRegistry, instance_key
+from crosshair.resilience import RateLimitedClient, get_rate_limiter
+from crosshair.storage import GCSClient
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Extratores bronze (registro e execução em processo)
+# ----------------------------------------
+@dataclass
+class Extractor:
+    """
+    Declaração de uma fonte bronze: cada script informa só o que é próprio
+    dele (busca, validação e caminho); carregar ambiente, criar clientes,
+    fazer upload, registrar no manifest e isolar falhas por guild ficam a
+    cargo de `run_extractor`.
+
+    Attributes:
+        name: Nome no registro e, se `manifest_name` for omitido, no manifest.
+        fetch: `(ctx, guild_id) -> resposta` da API.
+        validate: `resposta -> payload` a gravar; levanta exceção se inválida.
+        path: `(guild_id, payload) -> (path, data da partição)`.
+        per_guild: Executa uma vez por guild (GUILD_IDS) ou uma única vez.
+        dedup: `path -> dedup_key` para `upload_json_gzip`, opcional.
+        records / event_id: Metadados do payload gravados no manifest.
+        after_upload: `(ctx, guild_id, payload, path)`, ex. Parquet; erros
+            são registrados sem falhar a execução.
+        run: `(ctx, guild_id)` que substitui todo o fluxo acima, para fontes
+            que não cabem nele (ex. guild + players).
+        event_type: Tipo do evento no calendário (ex. "TERRITORY_WAR_EVENT").
+            Ativa o `InstanceRegistry`: instância já gravada não é buscada
+            de novo, salvo com a opção `force`.
+        progress: `payload -> dict` com as métricas de progresso gravadas
+            na série temporal do modo poll (`poll_extractor`).
+    """
+
+    name: str
+    fetch: Optional[Callable[["ExtractorContext", Optional[str]], Any]] = None
+    validate: Callable[[Any], Any] = lambda resp: resp
+    path: Optional[Callable[[Optional[str], Any], Tuple[str, datetime]]] = None
+    per_guild: bool = True
+    manifest_name: Optional[str] = None
+    dedup: Optional[Callable[[str], str]] = None
+    records: Optional[Callable[[Any], Optional[int]]] = None
+    event_id: Optional[Callable[[Any], Optional[str]]] = None
+    after_upload: Optional[Callable[["ExtractorContext", Optional[str], Any, str], None]] = None
+    run: Optional[Callable[["ExtractorContext", Optional[str]], None]] = None
+    event_type: Optional[str] = None
+    progress: Optional[Callable[[Any], Dict[str, Any]]] = None
+
+
+class ExtractorReport(NamedTuple):
+    """Resultado de um extrator: tempos de inicialização (cold start) e de execução."""
+
+    name: str
+    ok: bool
+    import_s: float
+    client_init_s: float
+    run_s: float
+    guilds: Dict[str, GuildRun]
+
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(extractor: Extractor) -> Extractor:
+    """Adiciona (ou substitui) o extrator no registro do processo."""
+    EXTRACTORS[extractor.name] = extractor
+    return extractor
+
+
+class ExtractorContext:
+    """
+    Clientes compartilhados pelos extratores de um processo.
+
+    Cada cliente é criado uma única vez, na primeira chamada a `client`, e
+    reaproveitado (já aquecido, com pool de conexões) pelos extratores e
+    guilds seguintes. O tempo de cada criação é atribuído ao extrator em
+    execução, compondo o custo de cold start do relatório.
+    """
+
+    def __init__(self, **options: Any):
+        """
+        Args:
+            **options: Opções da execução lidas pelos extratores (ex. resume=True).
+        """
+        self.options = options
+        self._clients: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._init_times: Dict[str, float] = {}
+        self._calendar: Optional["CalendarIndex"] = None
+        self._calendar_lock = threading.Lock()
+        self.current: Optional[str] = None
+
+    def client(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Retorna o cliente `name`, criando-o com `factory` na primeira vez."""
+        with self._lock:
+            if name in self._clients:
+                return self._clients[name]
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._clients:
+                start = time.perf_counter()
+                client = factory()
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._clients[name] = client
+                    key = self.current or ""
+                    self._init_times[key] = self._init_times.get(key, 0.0) + elapsed
+                logger.info(f"Cliente {name} inicializado em {elapsed:.2f}s.")
+            return self._clients[name]
+
+    def get(self, name: str) -> Optional[Any]:
+        """Cliente `name` se já tiver sido criado, sem criá-lo."""
+        with self._lock:
+            return self._clients.get(name)
+
+    def close(self) -> None:
+        """Fecha os clientes que têm `close` próprio (ex. pools de `ResilientCaller`)."""
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            if callable(getattr(type(client), "close", None)):
+                client.close()
+
+    def init_time(self, extractor_name: str) -> float:
+        with self._lock:
+            return self._init_times.get(extractor_name, 0.0)
+
+    def env(self, var_name: str) -> str:
+        """Variável de ambiente obrigatória (ValueError se ausente)."""
+        value = os.getenv(var_name)
+        if not value:
+            logger.error(f"Variável de ambiente ausente: {var_name}")
+            raise ValueError(f"A variável {var_name} não está definida no .env")
+        return value
+
+    @property
+    def gcs(self) -> "GCSClient":
+        """
+        Cliente do bucket GCS_BUCKET_NAME; backend, cache, serializador e
+        níveis de compressão vêm do ambiente (STORAGE_BACKEND, GCS_CACHE_DIR,
+        JSON_SERIALIZER, GCS_COMPRESSION_LEVEL).
+        """
+        return self.client("gcs", lambda: GCSClient(self.env("GCS_BUCKET_NAME")))
+
+    def calendar(self) -> "CalendarIndex":
+        """Índice do calendário de eventos do dia, carregado uma vez por processo."""
+        # Lock próprio: guilds em paralelo esperam o primeiro carregamento em
+        # vez de cada uma baixar e indexar o calendário
+        with self._calendar_lock:
+            if self._calendar is None:
+                self._calendar = CalendarIndex.load(
+                    self.gcs, calendar_path(datetime.now(timezone.utc))
+                )
+            return self._calendar
+
+    def instance_id(self, event_type: str) -> Optional[str]:
+        """
+        Instância esperada do evento: a opção `instance_id` (--instance-id,
+        repassado pelo cron_events) ou a em andamento no calendário do dia.
+        """
+        if self.options.get("instance_id"):
+            return self.options["instance_id"]
+        instance = self.calendar().instance(event_type)
+        return instance.get("id") if instance else None
+
+    def mhann(self, api_cls: Callable[..., Any], allycode: str) -> RateLimitedClient:
+        """
+        Cliente mhanndalorian_bot do ally code (a API é autenticada por
+        ally code), sob o limitador "mhann" compartilhado. `api_cls` vem do
+        script chamador, para que testes possam substituí-lo.
+        """
+        return self.client(
+            f"mhann:{allycode}",
+            lambda: RateLimitedClient(
+                api_cls(api_key=self.env("MHANN_APIKEY"), allycode=allycode),
+                get_rate_limiter("mhann", rate=5.0, max_rate=10.0),
+            ),
+        )
+
+
+def _extract_once(extractor: Extractor, ctx: ExtractorContext, guild_id: Optional[str]) -> None:
+    """Busca, valida e grava uma fonte; aborta com `SystemExit(1)` como os scripts."""
+    if extractor.run is not None:
+        extractor.run(ctx, guild_id)
+        return
+
+    instance_id = None
+    registry = None
+    if extractor.event_type is not None and guild_id is not None:
+        try:
+            registry = InstanceRegistry(ctx.gcs, guild_id)
+            instance_id = ctx.instance_id(extractor.event_type)
+            entry = None if ctx.options.get("force") else registry.get(extractor.name, instance_id)
+        except Exception as e:
+            logger.critical(f"Erro ao consultar o registro de instâncias: {e}", exc_info=True)
+            raise SystemExit(1)
+        if entry is not None:
+            logger.info(
+                f"[{extractor.name}] Instância {instance_id} já gravada em {entry.get('path')}; "
+                "nada a buscar (use --force para refazer)."
+            )
+            return
+
+    try:
+        resp = extractor.fetch(ctx, guild_id)
+        logger.info(f"[{extractor.name}] Dados obtidos com sucesso.")
+    except Exception as e:
+        logger.error(f"[{extractor.name}] Erro ao buscar dados: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    try:
+        payload = extractor.validate(resp)
+        logger.info(f"[{extractor.name}] Validação do retorno concluída – resposta OK.")
+    except Exception as e:
+        logger.critical(f"[{extractor.name}] Resposta inválida da API: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    try:
+        path, day = extractor.path(guild_id, payload)
+        logger.info(f"[{extractor.name}] Caminho final para upload: {path}")
+    except Exception as e:
+        logger.error(f"[{extractor.name}] Erro ao montar o caminho: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    try:
+        gcs = ctx.gcs
+    except Exception as e:
+        logger.critical(f"Erro ao inicializar o cliente GCS: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    try:
+        dedup_key = extractor.dedup(path) if extractor.dedup else None
+        if not gcs.upload_json_gzip(payload, path, dedup_key=dedup_key):
+            logger.error(f"[{extractor.name}] Falha ao enviar arquivo para o GCS.")
+            raise SystemExit(1)
+        logger.info(f"[{extractor.name}] Upload realizado: gs://{gcs.bucket_name}/{path}")
+        if guild_id is not None:
+            BronzeManifest(gcs, guild_id, day).record(
+                extractor.manifest_name or extractor.name,
+                path,
+                records=extractor.records(payload) if extractor.records else None,
+                event_id=extractor.event_id(payload) if extractor.event_id else None,
+            )
+        if registry is not None:
+            # Só a instância do payload é marcada: a esperada (ex. a próxima do
+            # calendário, fora da janela do evento) pode ser outra
+            event_id = extractor.event_id(payload) if extractor.event_id else None
+            if instance_id is not None and instance_key(instance_id) != instance_key(event_id):
+                logger.warning(
+                    f"[{extractor.name}] Payload da instância {instance_key(event_id)}, "
+                    f"esperada {instance_key(instance_id)}; só a do payload é registrada."
+                )
+            registry.record(extractor.name, [event_id], path, eventId=event_id)
+    except SystemExit:
+        raise
+    except Exception as e:
+        logger.error(f"[{extractor.name}] Erro inesperado ao realizar upload: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    if extractor.after_upload is not None:
+        try:
+            extractor.after_upload(ctx, guild_id, payload, path)
+        except Exception as e:
+            logger.error(f"[{extractor.name}] Erro no pós-processamento: {e}", exc_info=True)
+
+
+def run_extractor(
+    extractor: Extractor, ctx: ExtractorContext, import_s: float = 0.0
+) -> ExtractorReport:
+    """
+    Executa um extrator (por guild, em paralelo, quando `per_guild`) e
+    retorna o relatório com cold start (import + criação de clientes) e
+    tempo de execução.
+    """
+    ctx.current = extractor.name
+    start = time.perf_counter()
+    try:
+        if extractor.per_guild:
+            try:
+                guild_ids = guild_ids_from_env()
+            except ValueError as e:
+                logger.critical(f"Falha ao carregar variáveis de ambiente: {e}")
+                guilds = {"*": GuildRun("*", False, 0.0, repr(e))}
+            else:
+                guilds = run_for_guilds(
+                    guild_ids, lambda guild_id: _extract_once(extractor, ctx, guild_id)
+                )
+        else:
+            guilds = run_for_guilds(["*"], lambda _: _extract_once(extractor, ctx, None))
+    finally:
+        ctx.current = None
+    return ExtractorReport(
+        extractor.name,
+        all(run.ok for run in guilds.values()),
+        import_s,
+        ctx.init_time(extractor.name),
+        time.perf_counter() - start,
+        guilds,
+    )
+
+
+def log_extractor_reports(reports: Sequence[ExtractorReport]) -> None:
+    """Resumo por extrator: import, criação de clientes (cold start) e execução."""
+    lines = "\n".join(
+        f"  {r.name:<16} {'ok' if r.ok else 'FALHA':<6} import {r.import_s:>6.2f}s  "
+        f"clientes {r.client_init_s:>6.2f}s  execução {r.run_s:>7.2f}s"
+        for r in reports
+    )
+    logger.info(f"Resumo dos extratores:\n{lines}")
+
+
+def run_extractors(
+    extractors: Sequence[Extractor],
+    ctx: Optional[ExtractorContext] = None,
+    import_times: Optional[Mapping[str, float]] = None,
+) -> List[ExtractorReport]:
+    """Executa os extratores em sequência no mesmo contexto e registra o resumo."""
+    ctx = ctx or ExtractorContext()
+    import_times = import_times or {}
+    reports = [run_extractor(e, ctx, import_times.get(e.name, 0.0)) for e in extractors]
+    log_extractor_reports(reports)
+    return reports
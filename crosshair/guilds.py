@@ -0,0 +1,120 @@
+"""Execução de um job em várias guilds (fan-out)."""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from crosshair.config import env_list
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Execução em várias guilds (fan-out)
+# ----------------------------------------
+# Guilds processadas ao mesmo tempo quando GUILD_WORKERS não é definido
+DEFAULT_GUILD_WORKERS = 4
+
+
+class GuildRun(NamedTuple):
+    """Resultado do processamento de uma guild em `run_for_guilds`."""
+
+    guild_id: str
+    ok: bool
+    elapsed: float
+    error: Optional[str] = None
+
+
+def guild_ids_from_env() -> List[str]:
+    """
+    Guilds a processar: GUILD_IDS (separadas por vírgula) ou, na ausência,
+    o GUILD_ID único de sempre. Duplicatas são ignoradas.
+
+    Raises:
+        ValueError: Se nenhuma das duas variáveis estiver definida.
+    """
+    guild_ids = list(dict.fromkeys(env_list("GUILD_IDS") or env_list("GUILD_ID")))
+    if not guild_ids:
+        logger.error("Variável de ambiente ausente: GUILD_IDS ou GUILD_ID")
+        raise ValueError("Defina GUILD_IDS (lista) ou GUILD_ID no .env")
+    return guild_ids
+
+
+def allycodes_for_guilds(guild_ids: Sequence[str]) -> Dict[str, str]:
+    """
+    Ally code usado para autenticar cada guild: ALLYCODES, na mesma ordem
+    de GUILD_IDS, ou o ALLYCODE único de sempre.
+
+    Raises:
+        ValueError: Se a quantidade de ally codes não bater com a de guilds.
+    """
+    allycodes = env_list("ALLYCODES") or env_list("ALLYCODE")
+    if len(allycodes) != len(guild_ids):
+        logger.error(f"{len(allycodes)} ally codes para {len(guild_ids)} guilds")
+        raise ValueError("ALLYCODES deve ter um ally code por guild de GUILD_IDS")
+    return dict(zip(guild_ids, allycodes))
+
+
+def get_guild_workers(guild_count: int) -> int:
+    """Lê GUILD_WORKERS do ambiente, limitado à quantidade de guilds."""
+    raw = os.getenv("GUILD_WORKERS")
+    try:
+        workers = int(raw) if raw else DEFAULT_GUILD_WORKERS
+    except ValueError:
+        logger.warning(f"GUILD_WORKERS inválido ({raw}), usando {DEFAULT_GUILD_WORKERS}.")
+        workers = DEFAULT_GUILD_WORKERS
+    return max(1, min(workers, guild_count))
+
+
+def run_for_guilds(
+    guild_ids: Sequence[str],
+    func: Callable[[str], Any],
+    max_workers: Optional[int] = None,
+) -> Dict[str, GuildRun]:
+    """
+    Executa `func(guild_id)` para cada guild em paralelo, no mesmo processo.
+
+    Clientes e limitadores de taxa criados antes da chamada são
+    compartilhados por todas as guilds. A falha de uma guild (exceção ou
+    `SystemExit`, usado pelos scripts para abortar) não interrompe as
+    demais; ao final é registrado um resumo com o tempo de cada uma.
+
+    Returns:
+        dict: `GuildRun` por guild, na ordem de `guild_ids`.
+    """
+    max_workers = max_workers or get_guild_workers(len(guild_ids))
+
+    def run_one(guild_id: str) -> GuildRun:
+        start = time.perf_counter()
+        try:
+            func(guild_id)
+            return GuildRun(guild_id, True, time.perf_counter() - start)
+        except (Exception, SystemExit) as e:
+            if not isinstance(e, SystemExit):
+                logger.error(f"Falha ao processar guild {guild_id}: {e}", exc_info=True)
+            return GuildRun(guild_id, False, time.perf_counter() - start, repr(e))
+
+    start = time.perf_counter()
+    if len(guild_ids) == 1:
+        results = [run_one(guild_ids[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="guild") as executor:
+            results = list(executor.map(run_one, guild_ids))
+    elapsed = time.perf_counter() - start
+
+    runs = {run.guild_id: run for run in results}
+    failed = [run.guild_id for run in results if not run.ok]
+    summary = "\n".join(
+        f"  {run.guild_id:<24} {'ok' if run.ok else 'FALHA':<6} {run.elapsed:>8.2f}s"
+        + (f"  {run.error}" if run.error else "")
+        for run in results
+    )
+    logger.info(
+        f"{len(results) - len(failed)}/{len(results)} guilds concluídas em {elapsed:.2f}s "
+        f"({max_workers} em paralelo):\n{summary}"
+    )
+    return runs
@@ -0,0 +1,371 @@
+"""Leitura JSON em streaming por key path e projeção de campos."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from crosshair.serialization import JsonSerializer
+
+# ----------------------------------------
+# Leitura JSON em streaming (projeção por key path)
+# ----------------------------------------
+_EACH = object()  # passo "[*]" de um key path
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def parse_key_path(key_path: str) -> Tuple[Any, ...]:
+    """
+    Converte um key path em passos de navegação.
+
+    Exemplos: "member[*]" -> ("member", EACH); "data.totalBanners[*]" ->
+    ("data", "totalBanners", EACH); "[*]" -> (EACH,) para listas na raiz.
+    """
+    steps: List[Any] = []
+    for part in key_path.split("."):
+        name, _, rest = part.partition("[")
+        if name:
+            steps.append(name)
+        while rest:
+            if not rest.startswith("*]"):
+                raise ValueError(f"Key path inválido: {key_path}")
+            steps.append(_EACH)
+            rest = rest[2:].lstrip("[")
+    if not steps:
+        raise ValueError(f"Key path vazio: {key_path!r}")
+    return tuple(steps)
+
+
+class _JsonStream:
+    """
+    Tokenizador incremental sobre um stream de texto JSON.
+
+    A estrutura até os valores selecionados é navegada em Python; os valores
+    em si são decodificados via `raw_decode` (em C).
+    """
+
+    def __init__(self, reader: IO[str], chunk_size: int = 1024 * 1024):
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, min_size: int = 0) -> bool:
+        if self.eof:
+            return False
+        chunk = self.reader.read(max(self.chunk_size, min_size))
+        if not chunk:
+            self.eof = True
+            return False
+        start = self.pos
+        self.buf = self.buf[start:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Retorna o próximo caractere não-branco ('' no fim do stream)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON inválido: esperado {char!r}, encontrado {found!r}")
+        self.pos += 1
+
+    def read_value(self) -> Any:
+        """Decodifica o próximo valor JSON completo."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # Um número no fim do buffer pode continuar no próximo bloco
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Cresce geometricamente para manter o custo linear em itens grandes
+            self._fill(min_size=len(self.buf) - self.pos)
+
+    def skip_value(self) -> None:
+        """
+        Avança sobre o próximo valor sem mantê-lo.
+
+        Containers são percorridos filho a filho, cada um decodificado em C e
+        descartado: bem mais rápido que varrer caractere a caractere em
+        Python, e a memória fica limitada ao maior filho, não ao container.
+        """
+        char = self.peek()
+        if char not in "[{":
+            self.read_value()
+            return
+
+        closing = "]" if char == "[" else "}"
+        self.pos += 1
+        if self.peek() == closing:
+            self.pos += 1
+            return
+        while True:
+            if closing == "}":
+                self.read_value()
+                self.expect(":")
+            self.read_value()
+            char = self.peek()
+            self.pos += 1
+            if char == closing:
+                return
+            if char != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou {closing!r}, encontrado {char!r}")
+
+
+def _build_path_trie(key_paths: Iterable[str]) -> Dict[str, Any]:
+    root: Dict[str, Any] = {"leaf": [], "keys": {}, "each": None}
+    for key_path in key_paths:
+        node = root
+        for step in parse_key_path(key_path):
+            if step is _EACH:
+                if node["each"] is None:
+                    node["each"] = {"leaf": [], "keys": {}, "each": None}
+                node = node["each"]
+            else:
+                node = node["keys"].setdefault(step, {"leaf": [], "keys": {}, "each": None})
+        node["leaf"].append(key_path)
+    return root
+
+
+def _walk_json(
+    stream: _JsonStream, node: Dict[str, Any], seen_arrays: Set[str]
+) -> Iterator[Tuple[str, Any]]:
+    if node["leaf"]:
+        value = stream.read_value()
+        for key_path in node["leaf"]:
+            yield key_path, value
+        return
+
+    char = stream.peek()
+    if char == "{" and node["keys"]:
+        stream.pos += 1
+        if stream.peek() == "}":
+            stream.pos += 1
+            return
+        while True:
+            key = stream.read_value()
+            stream.expect(":")
+            child = node["keys"].get(key)
+            if child is not None:
+                yield from _walk_json(stream, child, seen_arrays)
+            else:
+                stream.skip_value()
+            char = stream.peek()
+            stream.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou '}}', encontrado {char!r}")
+    elif char == "[" and node["each"] is not None:
+        seen_arrays.update(node["each"]["leaf"])
+        stream.pos += 1
+        if stream.peek() == "]":
+            stream.pos += 1
+            return
+        while True:
+            yield from _walk_json(stream, node["each"], seen_arrays)
+            char = stream.peek()
+            stream.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou ']', encontrado {char!r}")
+    else:
+        stream.skip_value()
+
+
+def iter_json_paths(
+    reader: IO[str], key_paths: Iterable[str], seen_arrays: Optional[Set[str]] = None
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Percorre um documento JSON uma única vez e gera `(key_path, item)` para
+    cada valor que casa com algum dos key paths, na ordem do documento.
+
+    Args:
+        reader: Stream de texto com o JSON.
+        key_paths: Caminhos no formato "data.totalBanners[*]".
+        seen_arrays: Se informado, recebe os key paths cujos arrays foram
+            encontrados (mesmo vazios), para distinguir "vazio" de "ausente".
+    """
+    stream = _JsonStream(reader)
+    seen = seen_arrays if seen_arrays is not None else set()
+    yield from _walk_json(stream, _build_path_trie(key_paths), seen)
+
+
+def _project(item: Any, fields: Optional[Sequence[str]]) -> Any:
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {k: item[k] for k in fields if k in item}
+
+
+def _assemble_selection(
+    items: Iterable[Tuple[str, Any]], key_paths: Sequence[str], seen_arrays: Set[str]
+) -> Any:
+    """Remonta a árvore podada a partir dos itens gerados por `iter_json_paths`."""
+    parsed = {p: parse_key_path(p) for p in key_paths}
+    for key_path, steps in parsed.items():
+        if _EACH in steps[:-1]:
+            raise ValueError(f"select aceita '[*]' apenas no fim do caminho: {key_path}")
+
+    root: Any = None
+
+    def container(steps: Tuple[Any, ...]) -> Any:
+        nonlocal root
+        if steps[0] is _EACH:
+            root = [] if root is None else root
+            return root
+        root = {} if root is None else root
+        node = root
+        for step in steps[:-1]:
+            node = node.setdefault(step, {})
+        return node
+
+    for key_path, item in items:
+        steps = parsed[key_path]
+        if steps[-1] is _EACH:
+            if steps[0] is _EACH:
+                container(steps).append(item)
+            else:
+                container(steps[:-1]).setdefault(steps[-2], []).append(item)
+        else:
+            container(steps)[steps[-1]] = item
+
+    # Arrays encontrados porém vazios continuam presentes no resultado
+    for key_path in seen_arrays.intersection(key_paths):
+        steps = parsed[key_path]
+        if steps[0] is _EACH:
+            container(steps)
+        else:
+            container(steps[:-1]).setdefault(steps[-2], [])
+
+    return root
+
+
+# ----------------------------------------
+# Projeção de campos (poda de payloads antes do upload)
+# ----------------------------------------
+def _projection_tree(key_paths: Iterable[str]) -> Dict[Any, Any]:
+    """Árvore de passos dos key paths; None marca um campo mantido inteiro."""
+    tree: Dict[Any, Any] = {}
+    for key_path in key_paths:
+        steps = parse_key_path(key_path)
+        node: Optional[Dict[Any, Any]] = tree
+        for step in steps[:-1]:
+            child = node.setdefault(step, {})
+            if child is None:  # um prefixo já mantém o campo inteiro
+                node = None
+                break
+            node = child
+        if node is not None:
+            node[steps[-1]] = None
+    return tree
+
+
+def _apply_projection(data: Any, tree: Optional[Dict[Any, Any]]) -> Any:
+    if tree is None:
+        return data
+    if isinstance(data, list):
+        # "[*]" é opcional: campos pedidos sobre uma lista valem para cada item
+        item_tree = tree[_EACH] if _EACH in tree else tree
+        return [_apply_projection(item, item_tree) for item in data]
+    if isinstance(data, dict):
+        return {k: _apply_projection(v, tree[k]) for k, v in data.items() if k in tree}
+    return data
+
+
+class FieldProjection:
+    """
+    Mantém de um payload apenas os campos declarados, na sintaxe de key
+    path do `select` (ex. "name", "rosterUnit[*].definitionId",
+    "rosterUnit[*].relic"). Campos declarados são mantidos inteiros; o
+    resto é descartado. A ordem das chaves do original é preservada.
+
+    `required` são campos-chave (ex. "playerId") sempre mantidos, mesmo
+    que o spec os omita: sem eles o payload projetado não pode mais ser
+    associado ao seu registro.
+
+    Com `serializer`, acumula o tamanho em JSON antes e depois da poda
+    (ver `stats`), ao custo de uma serialização extra por item.
+    """
+
+    def __init__(
+        self,
+        key_paths: Sequence[str],
+        serializer: Optional[JsonSerializer] = None,
+        required: Sequence[str] = (),
+    ):
+        if not key_paths:
+            raise ValueError("A projeção precisa de ao menos um key path")
+        self.key_paths = list(key_paths) + [p for p in required if p not in key_paths]
+        self.serializer = serializer
+        self._tree = _projection_tree(self.key_paths)
+        self._lock = threading.Lock()
+        self._items = 0
+        self._raw_bytes = 0
+        self._projected_bytes = 0
+
+    @classmethod
+    def from_spec(
+        cls,
+        spec: Optional[str],
+        serializer: Optional[JsonSerializer] = None,
+        required: Sequence[str] = (),
+    ) -> Optional["FieldProjection"]:
+        """
+        Cria a projeção a partir de key paths separados por vírgula ou do
+        caminho de um arquivo (lista JSON, ou um key path por linha, com
+        comentários "#"). Retorna None se `spec` estiver vazio.
+        """
+        if not spec or not spec.strip():
+            return None
+        if os.path.isfile(spec):
+            with open(spec, encoding="utf-8") as f:
+                text = f.read()
+            if text.lstrip().startswith("["):
+                key_paths = json.loads(text)
+            else:
+                key_paths = [line.split("#", 1)[0].strip() for line in text.splitlines()]
+        else:
+            key_paths = spec.split(",")
+        return cls([p.strip() for p in key_paths if p.strip()], serializer, required)
+
+    def apply(self, data: Any) -> Any:
+        """Retorna uma cópia rasa de `data` só com os campos declarados."""
+        projected = _apply_projection(data, self._tree)
+        if self.serializer is not None:
+            raw_size = len(self.serializer.dumps(data))
+            projected_size = len(self.serializer.dumps(projected))
+            with self._lock:
+                self._items += 1
+                self._raw_bytes += raw_size
+                self._projected_bytes += projected_size
+        return projected
+
+    def stats(self) -> Dict[str, Any]:
+        """Itens projetados e bytes de JSON antes/depois (requer `serializer`)."""
+        with self._lock:
+            raw, projected = self._raw_bytes, self._projected_bytes
+            items = self._items
+        return {
+            "items": items,
+            "raw_bytes": raw,
+            "projected_bytes": projected,
+            "reduction": round(1 - projected / raw, 4) if raw else 0.0,
+        }
@@ -0,0 +1,251 @@
+"""Acompanhamento ao vivo de eventos (poll + snapshots em delta)."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from crosshair.extractors import Extractor, ExtractorContext
+from crosshair.manifests import instance_key
+from crosshair.snapshots import apply_json_delta, json_delta
+from crosshair.storage import GCSClient
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Acompanhamento ao vivo de eventos (poll + deltas)
+# ----------------------------------------
+LIVE_DELTA_FORMAT = "live-delta/1"
+# Segundos entre consultas quando POLL_INTERVAL_SECONDS não é definido
+DEFAULT_POLL_INTERVAL = 300
+# Polls por trecho (uma base completa + deltas) quando LIVE_BASE_EVERY não é definido
+DEFAULT_LIVE_BASE_EVERY = 48
+# Falhas seguidas de consulta até o poll desistir
+POLL_MAX_FAILURES = 5
+
+
+class LiveSnapshots:
+    """
+    Snapshots sucessivos de um evento em andamento, gravados como base +
+    deltas sob `prefix`:
+
+    - `base-NNNNN.json.gz`: snapshot completo, no primeiro poll de cada
+      trecho de `base_every` polls;
+    - `delta-NNNNN.json.gz`: só o que mudou desde o poll anterior
+      (`json_delta`); polls sem mudança não gravam objeto;
+    - `series-NNNNN.json.gz`: pontos {t, seq, object, metrics} do trecho,
+      a série temporal compacta do progresso;
+    - `_head.json.gz`: último seq gravado, para retomar após reinício.
+
+    O snapshot anterior fica em memória, então cada poll grava no máximo um
+    delta, o trecho corrente da série e o head, sem reler nada: o custo por
+    poll não cresce com a duração do evento. Reconstruir qualquer poll exige
+    uma base e no máximo `base_every - 1` deltas.
+    """
+
+    HEAD_NAME = "_head.json.gz"
+
+    def __init__(self, gcs: "GCSClient", prefix: str, base_every: int = DEFAULT_LIVE_BASE_EVERY):
+        self.gcs = gcs
+        self.prefix = prefix.rstrip("/")
+        self.base_every = max(1, base_every)
+        self.seq = -1
+        self.previous: Any = None
+        self.points: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_env(cls, gcs: "GCSClient", prefix: str) -> "LiveSnapshots":
+        """Tamanho do trecho de LIVE_BASE_EVERY (padrão 48 polls)."""
+        raw = os.getenv("LIVE_BASE_EVERY")
+        try:
+            base_every = int(raw) if raw else DEFAULT_LIVE_BASE_EVERY
+        except ValueError:
+            logger.warning(f"LIVE_BASE_EVERY inválido: {raw}")
+            base_every = DEFAULT_LIVE_BASE_EVERY
+        return cls(gcs, prefix, base_every)
+
+    def path(self, kind: str, number: int) -> str:
+        return f"{self.prefix}/{kind}-{number:05d}.json.gz"
+
+    def series(self, chunk: int) -> List[Dict[str, Any]]:
+        """Pontos gravados no trecho `chunk` (polls chunk*base_every em diante)."""
+        points = self.gcs.load_json_gzip_if_exists(self.path("series", chunk))
+        return points if isinstance(points, list) else []
+
+    def iter_series(self) -> Iterator[Dict[str, Any]]:
+        """Todos os pontos da série, do primeiro poll ao último gravado."""
+        head = self.gcs.load_json_gzip_if_exists(f"{self.prefix}/{self.HEAD_NAME}")
+        if not isinstance(head, dict):
+            return
+        self.base_every = int(head.get("baseEvery", self.base_every))
+        for chunk in range(head["seq"] // self.base_every + 1):
+            yield from self.series(chunk)
+
+    def read(self, seq: int) -> Any:
+        """Snapshot completo do poll `seq`, a partir da base do seu trecho."""
+        points = [p for p in self.series(seq // self.base_every) if p["seq"] <= seq]
+        bases = [p for p in points if "/base-" in (p.get("object") or "")]
+        if not bases:
+            raise ValueError(f"Base ausente para o poll {seq}: {self.prefix}")
+
+        base = bases[-1]
+        snapshot = self.gcs.load_json_gzip_if_exists(base["object"])
+        for point in points:
+            if point["seq"] > base["seq"] and point.get("object"):
+                delta = self.gcs.load_json_gzip_if_exists(point["object"])
+                if delta.get("format") != LIVE_DELTA_FORMAT:
+                    raise ValueError(f"Formato de delta desconhecido: {delta.get('format')}")
+                snapshot = apply_json_delta(snapshot, delta["delta"])
+        return snapshot
+
+    def resume(self) -> int:
+        """
+        Retoma a série a partir do head gravado (ex. após reinício do
+        processo) e retorna o próximo seq; 0 se a série for nova.
+        """
+        head = self.gcs.load_json_gzip_if_exists(f"{self.prefix}/{self.HEAD_NAME}")
+        if not isinstance(head, dict):
+            return 0
+        # O tamanho do trecho é o da série já gravada, mesmo se LIVE_BASE_EVERY mudou
+        self.base_every = int(head.get("baseEvery", self.base_every))
+        seq = int(head["seq"])
+        self.points = [p for p in self.series(seq // self.base_every) if p["seq"] <= seq]
+        try:
+            self.previous = self.read(seq)
+        except Exception as e:
+            # Sem o snapshot anterior o próximo poll grava uma base completa
+            logger.warning(f"Não foi possível reconstruir o poll {seq}: {e}")
+            self.previous = None
+        self.seq = seq
+        logger.info(f"Série retomada no poll {seq + 1}: {self.prefix}")
+        return seq + 1
+
+    def append(
+        self, snapshot: Any, metrics: Dict[str, Any], at: Optional[datetime] = None
+    ) -> Optional[str]:
+        """
+        Grava o poll seguinte e retorna o path do objeto gravado (base ou
+        delta), ou None se nada mudou desde o poll anterior.
+        """
+        seq = self.seq + 1
+        if seq % self.base_every == 0:
+            self.points = []
+
+        if seq % self.base_every == 0 or self.previous is None:
+            path = self.path("base", seq)
+            self.gcs._upload_json_gzip(snapshot, path)
+        else:
+            delta = json_delta(self.previous, snapshot)
+            path = None
+            if delta is not None:
+                path = self.path("delta", seq)
+                payload = {"format": LIVE_DELTA_FORMAT, "seq": seq, "delta": delta}
+                self.gcs._upload_json_gzip(payload, path)
+
+        self.points.append(
+            {
+                "t": (at or datetime.now(timezone.utc)).isoformat(),
+                "seq": seq,
+                "object": path,
+                "metrics": metrics,
+            }
+        )
+        self.gcs._upload_json_gzip(self.points, self.path("series", seq // self.base_every))
+        self.gcs._upload_json_gzip(
+            {"seq": seq, "baseEvery": self.base_every}, f"{self.prefix}/{self.HEAD_NAME}"
+        )
+        self.previous = snapshot
+        self.seq = seq
+        return path
+
+
+def get_poll_interval() -> float:
+    """Lê POLL_INTERVAL_SECONDS do ambiente (padrão 300)."""
+    raw = os.getenv("POLL_INTERVAL_SECONDS")
+    try:
+        interval = float(raw) if raw else DEFAULT_POLL_INTERVAL
+    except ValueError:
+        logger.warning(f"POLL_INTERVAL_SECONDS inválido ({raw}), usando {DEFAULT_POLL_INTERVAL}.")
+        interval = DEFAULT_POLL_INTERVAL
+    return max(0.0, interval)
+
+
+def live_prefix(extractor: Extractor, guild_id: Optional[str], payload: Any) -> str:
+    """Pasta da série ao vivo, ao lado do objeto final do evento (`extractor.path`)."""
+    path, _ = extractor.path(guild_id, payload)
+    return f"{path.rsplit('/', 1)[0]}/live/{extractor.name}"
+
+
+def poll_extractor(
+    extractor: Extractor,
+    ctx: ExtractorContext,
+    guild_id: Optional[str],
+    interval: float,
+    max_polls: Optional[int] = None,
+    until: Optional[datetime] = None,
+    stop: Optional[threading.Event] = None,
+) -> int:
+    """
+    Consulta a fonte a cada `interval` segundos e grava cada snapshot em
+    `LiveSnapshots`, com as métricas de `extractor.progress` na série.
+
+    Encerra ao atingir `max_polls`, em `until` (padrão: fim da instância em
+    andamento no calendário, quando o extrator tem `event_type`), quando a
+    API passa a devolver outra instância ou quando `stop` é sinalizado.
+    Falhas isoladas de consulta são registradas e o poll segue;
+    `POLL_MAX_FAILURES` falhas seguidas abortam com `SystemExit(1)`.
+
+    Returns:
+        int: Quantidade de polls gravados.
+    """
+    stop = stop or threading.Event()
+    if until is None and extractor.event_type is not None:
+        instance = ctx.calendar().instance(extractor.event_type)
+        if instance and instance["end"] is not None:
+            until = datetime.fromtimestamp(instance["end"] / 1000, tz=timezone.utc)
+    if until is not None:
+        logger.info(f"[{extractor.name}] Poll até {until.isoformat()} a cada {interval:.0f}s.")
+
+    live: Optional[LiveSnapshots] = None
+    instance_id = None
+    polls = failures = 0
+    while not stop.is_set():
+        try:
+            payload = extractor.validate(extractor.fetch(ctx, guild_id))
+            current = instance_key(extractor.event_id(payload)) if extractor.event_id else None
+            if live is None:
+                instance_id = current
+                live = LiveSnapshots.from_env(ctx.gcs, live_prefix(extractor, guild_id, payload))
+                live.resume()
+            elif current != instance_id:
+                logger.info(f"[{extractor.name}] Nova instância ({current}); poll encerrado.")
+                break
+            metrics = extractor.progress(payload) if extractor.progress else {}
+            path = live.append(payload, metrics)
+            failures = 0
+            polls += 1
+            logger.info(
+                f"[{extractor.name}] Poll {live.seq} da guild {guild_id}: "
+                f"{path or 'sem mudanças'}"
+            )
+        except Exception as e:
+            failures += 1
+            logger.error(
+                f"[{extractor.name}] Falha no poll ({failures}/{POLL_MAX_FAILURES}): {e}",
+                exc_info=True,
+            )
+            if failures >= POLL_MAX_FAILURES:
+                raise SystemExit(1)
+
+        if max_polls is not None and polls >= max_polls:
+            break
+        if until is not None and datetime.now(timezone.utc) >= until:
+            break
+        stop.wait(interval)
+
+    logger.info(f"[{extractor.name}] Poll finalizado após {polls} consultas.")
+    return polls
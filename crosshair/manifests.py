@@ -0,0 +1,515 @@
+"""
+Índices dos objetos bronze: manifest diário, registro de instâncias,
+shards e checkpoints de coleta.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timezone
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from google.api_core.exceptions import PreconditionFailed
+
+from crosshair.serialization import codec_for_path
+from crosshair.storage import GCSClient, LocalStorageClient, UploadInfo
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Manifest diário dos objetos bronze
+# ----------------------------------------
+def _day_key(day: Union[date, datetime, str]) -> str:
+    return day.strftime("%Y%m%d") if isinstance(day, (date, datetime)) else str(day)
+
+
+def manifest_path(guild_id: str, day: Union[date, datetime, str]) -> str:
+    """Path do manifest de uma guild/dia; fica fora das partições imutáveis."""
+    return f"{guild_id}/manifest/{_day_key(day)}.json.gz"
+
+
+class BronzeManifest:
+    """
+    Índice compacto dos objetos bronze de uma guild em um dia (data da
+    partição do objeto): path, generation, tamanho, nº de registros, sha256
+    do JSON e ID do evento de cada um.
+
+    Escritores chamam `record` após cada upload; leitores chamam `resolve`
+    e sabem exatamente o que carregar com uma única leitura pequena, sem
+    listar o bucket nem adivinhar paths.
+
+    A atualização é read-modify-write condicionada à generation lida, então
+    jobs concorrentes na mesma guild/dia não perdem entradas.
+    """
+
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, gcs: "GCSClient", guild_id: str, day: Union[date, datetime, str]):
+        self.gcs = gcs
+        self.guild_id = guild_id
+        self.day = _day_key(day)
+        self.path = manifest_path(guild_id, day)
+
+    def load(self) -> Tuple[Dict[str, Any], int]:
+        """Retorna (manifest, generation); manifest vazio e generation 0 se ausente."""
+        result = self.gcs.fetch_json_gzip(self.path)
+        if isinstance(result.data, dict):
+            return result.data, result.generation or 0
+        return {"guildId": self.guild_id, "date": self.day, "objects": {}}, 0
+
+    def record(
+        self,
+        name: str,
+        path: str,
+        records: Optional[int] = None,
+        event_id: Optional[str] = None,
+    ) -> bool:
+        """
+        Registra (ou substitui) a entrada `name` apontando para `path`.
+
+        Generation, tamanho e hash vêm do último upload de `path` feito pelo
+        mesmo GCSClient.
+
+        Returns:
+            bool: True se o manifest foi gravado.
+        """
+        info = self.gcs.uploaded.get(path)
+        if not isinstance(info, UploadInfo):
+            info = UploadInfo(path, None, None, "")
+        entry = {
+            "path": path,
+            "generation": info.generation,
+            "size": info.size,
+            "records": records,
+            "sha256": info.sha256 or None,
+            "eventId": event_id,
+            "updatedAt": datetime.now(timezone.utc).isoformat(),
+        }
+
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            manifest, generation = self.load()
+            manifest.setdefault("objects", {})[name] = entry
+            try:
+                self.gcs._upload_json_gzip(manifest, self.path, if_generation_match=generation)
+                logger.info(f"Manifest atualizado ({name}): {self.path}")
+                return True
+            except PreconditionFailed:
+                logger.info(f"Manifest alterado por outro job, tentativa {attempt}: {self.path}")
+            except Exception as e:
+                logger.error(f"Falha ao gravar manifest {self.path}: {e}", exc_info=True)
+                return False
+
+        logger.error(f"Manifest não gravado após {self.MAX_ATTEMPTS} tentativas: {self.path}")
+        return False
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        """Entrada `name` do manifest (com "path", "generation", ...), ou None."""
+        manifest, _ = self.load()
+        objects = manifest.get("objects")
+        entry = objects.get(name) if isinstance(objects, dict) else None
+        return entry if isinstance(entry, dict) and entry.get("path") else None
+
+
+# ----------------------------------------
+# Registro de instâncias de eventos (TW/TB)
+# ----------------------------------------
+_INSTANCE_PATTERN = re.compile(r"O\d+")
+
+
+def instance_key(value: Optional[str]) -> Optional[str]:
+    """
+    Chave estável de uma instância de evento: o token "O<timestamp ms>"
+    comum ao ID da instância no calendário ("O1700000000000") e aos IDs do
+    payload ("TERRITORY_WAR_EVENT_C01:O1700000000000"). Sem o token, o
+    próprio valor.
+    """
+    if not value:
+        return None
+    match = _INSTANCE_PATTERN.search(str(value))
+    return match.group(0) if match else str(value)
+
+
+def instance_registry_path(guild_id: str) -> str:
+    return f"{guild_id}/events/_instances.json.gz"
+
+
+class InstanceRegistry:
+    """
+    Registro das instâncias de TW/TB já gravadas por uma guild, consultado
+    antes de qualquer chamada à API: uma reexecução para a mesma instância
+    (ex. cron disparado duas vezes) termina com uma única leitura pequena.
+
+    Formato: {"<extrator>": {"<instance_key>": {"path", "eventId", "storedAt"}}}.
+    A gravação segue o read-modify-write condicionado à generation do
+    `BronzeManifest`.
+    """
+
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, gcs: "GCSClient", guild_id: str):
+        self.gcs = gcs
+        self.guild_id = guild_id
+        self.path = instance_registry_path(guild_id)
+
+    def load(self) -> Tuple[Dict[str, Any], int]:
+        """Retorna (registro, generation); registro vazio e generation 0 se ausente."""
+        result = self.gcs.fetch_json_gzip(self.path)
+        if isinstance(result.data, dict):
+            return result.data, result.generation or 0
+        return {}, 0
+
+    def get(self, name: str, instance_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Entrada da instância no extrator `name`, ou None se ainda não gravada."""
+        key = instance_key(instance_id)
+        if key is None:
+            return None
+        registry, _ = self.load()
+        entries = registry.get(name)
+        entry = entries.get(key) if isinstance(entries, dict) else None
+        return entry if isinstance(entry, dict) else None
+
+    def latest(self, name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(instance_key, entrada) gravada mais recentemente em `name`, ou None."""
+        registry, _ = self.load()
+        entries = registry.get(name)
+        if not isinstance(entries, dict) or not entries:
+            return None
+        return max(entries.items(), key=lambda item: str(item[1].get("storedAt", "")))
+
+    def resolve(
+        self, name: str, instance_id: Optional[str] = None
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Objeto a processar em `name`: o da instância informada ou, sem ela,
+        o gravado mais recentemente. Usado pela silver no lugar de deduzir o
+        path pela data.
+
+        Returns:
+            tuple: (path, instance_key) ou None se nada foi registrado.
+        """
+        if instance_id:
+            entry = self.get(name, instance_id)
+            return (entry["path"], instance_key(instance_id)) if entry else None
+        latest = self.latest(name)
+        return (latest[1]["path"], latest[0]) if latest else None
+
+    def record(self, name: str, instance_ids: Sequence[Optional[str]], path: str, **extra) -> bool:
+        """
+        Registra `path` sob cada ID informado (ex. o do calendário e o do
+        payload, que costumam ter a mesma chave).
+
+        Returns:
+            bool: True se o registro foi gravado.
+        """
+        keys = {key for key in map(instance_key, instance_ids) if key}
+        if not keys:
+            return False
+        entry = {"path": path, "storedAt": datetime.now(timezone.utc).isoformat(), **extra}
+
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            registry, generation = self.load()
+            entries = registry.setdefault(name, {})
+            for key in keys:
+                entries[key] = entry
+            try:
+                self.gcs._upload_json_gzip(registry, self.path, if_generation_match=generation)
+                logger.info(f"Instância registrada ({name}: {', '.join(sorted(keys))})")
+                return True
+            except PreconditionFailed:
+                logger.info(f"Registro alterado por outro job, tentativa {attempt}: {self.path}")
+            except Exception as e:
+                logger.error(f"Falha ao gravar registro {self.path}: {e}", exc_info=True)
+                return False
+
+        logger.error(f"Registro não gravado após {self.MAX_ATTEMPTS} tentativas: {self.path}")
+        return False
+
+
+# ----------------------------------------
+# Objetos fragmentados (um JSON.gz por item)
+# ----------------------------------------
+SHARD_MANIFEST_NAME = "_manifest.json.gz"
+_SHARD_NAME_PATTERN = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def shard_path(prefix: str, key: str) -> str:
+    """Path do shard `key` sob `prefix` (caracteres fora de [A-Za-z0-9_.-] viram "_")."""
+    return f"{prefix.rstrip('/')}/{_SHARD_NAME_PATTERN.sub('_', key)}.json.gz"
+
+
+class ShardedJsonWriter:
+    """
+    Grava cada item como um JSON.gz próprio sob `prefix`, em um pool de
+    upload separado de quem produz os itens: `put` retorna assim que o
+    upload é enfileirado, então uploads e fetches se sobrepõem.
+
+    No máximo `max_pending` itens ficam em memória aguardando upload (`put`
+    bloqueia acima disso). `close` espera os uploads e grava
+    `<prefix>/_manifest.json.gz`, que marca o conjunto como completo e
+    lista path, generation, tamanho e sha256 de cada shard.
+
+    Com `flush_every`, a cada N shards gravados o manifest é regravado
+    aberto (`"closed": False`), listando os shards já prontos, e
+    `on_flush(keys)` é chamado; após uma queda, uma retomada reaproveita
+    esses shards. Leitores comuns ignoram manifests abertos (ver
+    `load_shard_manifest`).
+    """
+
+    def __init__(
+        self,
+        gcs: "GCSClient",
+        prefix: str,
+        max_workers: int = 8,
+        max_pending: Optional[int] = None,
+        flush_every: int = 0,
+        on_flush: Optional[Callable[[Set[str]], None]] = None,
+    ):
+        self.gcs = gcs
+        self.prefix = prefix.rstrip("/")
+        self.manifest_path = f"{self.prefix}/{SHARD_MANIFEST_NAME}"
+        self.shards: Dict[str, UploadInfo] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.referenced: Set[str] = set()
+        self._lock = threading.Lock()
+        self._pending = threading.BoundedSemaphore(max_pending or max_workers * 2)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self._futures: List[Any] = []
+        self._start = time.perf_counter()
+        self.flush_every = max(0, flush_every)
+        self.on_flush = on_flush
+        self._flush_lock = threading.Lock()
+        self._unflushed = 0
+        gcs._ensure_connection_pool(max_workers)
+
+    def put(self, key: str, data: Any) -> None:
+        """Enfileira o upload de `data` como o shard `key`."""
+        self._pending.acquire()
+        try:
+            self._futures.append(self._executor.submit(self._upload, key, data))
+        except Exception:
+            self._pending.release()
+            raise
+
+    def reference(self, key: str, entry: Mapping[str, Any]) -> None:
+        """
+        Inclui no manifest um shard já gravado (ex. o de um dia anterior,
+        com `entry` vindo do manifest dele) sem baixar nem reenviar o objeto.
+        """
+        info = UploadInfo(
+            entry["path"], entry.get("generation"), entry.get("size"), entry["sha256"]
+        )
+        with self._lock:
+            self.shards[key] = info
+            self.referenced.add(key)
+
+    def _upload(self, key: str, data: Any) -> None:
+        try:
+            info = self.gcs._upload_json_gzip(data, shard_path(self.prefix, key))
+            with self._lock:
+                self.shards[key] = info
+                self._unflushed += 1
+                flush = self.flush_every and self._unflushed >= self.flush_every
+                if flush:
+                    self._unflushed = 0
+            if flush:
+                self.flush()
+        except Exception as e:
+            logger.error(f"Falha no upload do shard {key}: {e}", exc_info=True)
+            with self._lock:
+                self.errors[key] = e
+        finally:
+            self._pending.release()
+
+    def _manifest(self, closed: bool, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        with self._lock:
+            shards = dict(self.shards)
+            errors = dict(self.errors)
+            referenced = len(self.referenced)
+        return {
+            "prefix": self.prefix,
+            "count": len(shards),
+            "referenced": referenced,
+            "closed": closed,
+            "complete": closed and not errors,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "shards": {
+                key: {
+                    "path": info.path,
+                    "generation": info.generation,
+                    "size": info.size,
+                    "sha256": info.sha256,
+                }
+                for key, info in sorted(shards.items())
+            },
+            "errors": {key: str(e) for key, e in sorted(errors.items())},
+            **(extra or {}),
+        }
+
+    def flush(self) -> None:
+        """
+        Grava o manifest aberto com os shards já prontos e chama `on_flush`.
+        Falhas só são registradas: o progresso é opcional para a gravação.
+        """
+        with self._flush_lock:
+            try:
+                manifest = self._manifest(closed=False)
+                self.gcs._upload_json_gzip(manifest, self.manifest_path)
+                if self.on_flush is not None:
+                    self.on_flush(set(manifest["shards"]))
+            except Exception as e:
+                logger.warning(f"Falha ao gravar progresso dos shards: {e}", exc_info=True)
+
+    def close(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Aguarda os uploads e grava o manifest dos shards.
+
+        Args:
+            extra (dict, opcional): Campos adicionais do manifest (ex. "expected").
+
+        Returns:
+            dict: O manifest gravado; `complete` é False se algum shard falhou.
+        """
+        for future in self._futures:
+            future.result()
+        self._executor.shutdown(wait=True)
+
+        manifest = self._manifest(closed=True, extra=extra)
+        with self._flush_lock:
+            self.gcs._upload_json_gzip(manifest, self.manifest_path)
+
+        elapsed = time.perf_counter() - self._start
+        logger.info(
+            f"{len(self.shards) - len(self.referenced)} shards gravados e "
+            f"{len(self.referenced)} reaproveitados em {elapsed:.2f}s "
+            f"({len(self.errors)} falhas): gs://{self.gcs.bucket_name}/{self.manifest_path}"
+        )
+        return manifest
+
+    def __enter__(self) -> "ShardedJsonWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Sem manifest: o conjunto incompleto não é tratado como pronto
+            self._executor.shutdown(wait=True)
+
+
+def load_shard_manifest(
+    gcs: "GCSClient", prefix: str, include_open: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Manifest de um conjunto de shards, ou None se ainda não foi fechado.
+    Com `include_open`, retorna também o manifest parcial de uma gravação
+    em andamento ou interrompida (ver `ShardedJsonWriter.flush`).
+    """
+    data = gcs.load_json_gzip(f"{prefix.rstrip('/')}/{SHARD_MANIFEST_NAME}")
+    if not isinstance(data, dict):
+        return None
+    # Manifests anteriores ao campo "closed" só eram gravados no fechamento
+    return data if include_open or data.get("closed", True) else None
+
+
+def iter_shards(
+    gcs: "GCSClient",
+    prefix: str,
+    max_workers: int = 8,
+    keys: Optional[Iterable[str]] = None,
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Gera `(key, dados)` de cada shard listado no manifest, baixando até
+    `max_workers` em paralelo e entregando cada um assim que chega.
+
+    Args:
+        keys (list, opcional): Restringe a leitura a esses shards.
+
+    Raises:
+        FileNotFoundError: Se o manifest não existir (conjunto incompleto).
+    """
+    manifest = load_shard_manifest(gcs, prefix)
+    if manifest is None:
+        raise FileNotFoundError(f"Manifest de shards ausente em {prefix}")
+
+    shards = manifest.get("shards", {})
+    selected = list(shards) if keys is None else [k for k in keys if k in shards]
+    gcs._ensure_connection_pool(max_workers)
+
+    def load(key: str) -> Tuple[str, Any]:
+        path = shards[key]["path"]
+        data, _ = gcs._download_bytes(path)
+        return key, gcs._gzip_bytes_to_json(data, codec_for_path(path), gcs.serializer)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(load, key) for key in selected]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# ----------------------------------------
+# Checkpoint de coleta (retomada após falhas)
+# ----------------------------------------
+class CollectionCheckpoint:
+    """
+    Registro dos IDs já coletados (e dos que falharam) em uma execução,
+    para que uma nova execução busque só o que falta.
+
+    Fica no mesmo bucket dos dados, ou em disco quando CHECKPOINT_DIR está
+    definido (ver `from_env`). Um único job escreve cada checkpoint, então
+    não há controle de concorrência.
+    """
+
+    def __init__(self, gcs: "GCSClient", path: str):
+        self.gcs = gcs
+        self.path = path
+
+    @classmethod
+    def from_env(cls, gcs: "GCSClient", path: str) -> "CollectionCheckpoint":
+        """Usa o diretório local CHECKPOINT_DIR, se definido; senão o bucket de `gcs`."""
+        root = os.getenv("CHECKPOINT_DIR")
+        if root:
+            gcs = GCSClient("checkpoints", client=LocalStorageClient(root))
+        return cls(gcs, path)
+
+    def load(self) -> Dict[str, Any]:
+        """Estado salvo ({"collected": set, "failed": set}); vazio se não houver."""
+        state = self.gcs.load_json_gzip_if_exists(self.path) or {}
+        return {
+            "collected": set(state.get("collected", [])),
+            "failed": set(state.get("failed", [])),
+        }
+
+    def save(self, collected: Iterable[str], failed: Iterable[str] = ()) -> None:
+        """Grava o estado completo; um ID coletado nunca consta como falho."""
+        collected = set(collected)
+        failed = set(failed) - collected
+        self.gcs._upload_json_gzip(
+            {
+                "collected": sorted(collected),
+                "failed": sorted(failed),
+                "updatedAt": datetime.now(timezone.utc).isoformat(),
+            },
+            self.path,
+        )
+        logger.info(
+            f"Checkpoint gravado ({len(collected)} coletados, {len(failed)} falhas): {self.path}"
+        )
@@ -0,0 +1,84 @@
+"""Achatamento colunar e cópia Parquet dos objetos bronze."""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow é opcional para o JSON.gz
+    pa = None
+    pq = None
+
+if TYPE_CHECKING:  # pragma: no cover - storage importa este módulo
+    from crosshair.storage import GCSClient
+
+
+# ----------------------------------------
+# Achatamento colunar (bronze Parquet)
+# ----------------------------------------
+def flatten_record(
+    record: Dict[str, Any], exclude: Iterable[str] = (), sep: str = "_"
+) -> Dict[str, Any]:
+    """
+    Achata um registro JSON em colunas escalares.
+
+    Dicts aninhados viram `pai_filho`; listas são mantidas como texto JSON,
+    já que os arrays relevantes ganham tabelas próprias.
+    """
+    excluded = set(exclude)
+    flat: Dict[str, Any] = {}
+
+    def visit(value: Any, prefix: str) -> None:
+        if isinstance(value, dict):
+            for key, child in value.items():
+                visit(child, f"{prefix}{sep}{key}" if prefix else str(key))
+        elif isinstance(value, (list, tuple)):
+            flat[prefix] = json.dumps(value, ensure_ascii=False, default=str)
+        else:
+            flat[prefix] = value
+
+    for key, value in record.items():
+        if key not in excluded:
+            visit(value, str(key))
+    return flat
+
+
+def records_to_table(records: List[Dict[str, Any]]) -> Any:
+    """
+    Monta uma tabela Arrow coluna a coluna a partir de registros planos.
+
+    Colunas com tipos mistos (ex.: int e str do mesmo campo em jogadores
+    diferentes) são normalizadas para texto, em vez de falhar a escrita.
+    """
+    names: Dict[str, None] = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+
+    columns = {}
+    for name in names:
+        values = [record.get(name) for record in records]
+        kinds = {type(v) for v in values if v is not None}
+        if len(kinds) > 1 and not kinds <= {int, float}:
+            values = [None if v is None else str(v) for v in values]
+        columns[name] = values
+    return pa.table(columns)
+
+
+def upload_bronze_parquet(
+    gcs: GCSClient, json_path: str, tables: Mapping[str, List[Dict[str, Any]]]
+) -> bool:
+    """
+    Grava cada array quente como `<arquivo>.<nome>.parquet` ao lado do JSON.gz
+    bruto (ex.: guild.json.gz -> guild.member.parquet).
+
+    Returns:
+        bool: True se todas as tabelas foram gravadas.
+    """
+    base = json_path[: -len(".json.gz")] if json_path.endswith(".json.gz") else json_path
+    ok = True
+    for name, rows in tables.items():
+        ok = gcs.upload_parquet(rows, f"{base}.{name}.parquet") and ok
+    return ok
@@ -0,0 +1,472 @@
+"""
+Limitador de taxa adaptativo e chamadas resilientes (retry, timeout,
+hedging).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional
+
+from crosshair.config import env_flag
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Limitador de taxa adaptativo (AIMD)
+# ----------------------------------------
+_STATUS_PATTERN = re.compile(r"(?:status|http)\D{0,12}(\d{3})", re.IGNORECASE)
+_THROTTLE_PATTERN = re.compile(r"too many requests|rate.?limit|quota exceeded", re.IGNORECASE)
+
+
+def http_status_from_error(exc: BaseException) -> Optional[int]:
+    """
+    Extrai o status HTTP de uma exceção dos clientes upstream.
+
+    SwgohComlink e mhanndalorian_bot não expõem o status de forma estruturada,
+    então tenta atributos comuns (`status_code`, `response.status_code`) e,
+    em último caso, o texto da mensagem.
+    """
+    for candidate in (exc, getattr(exc, "response", None)):
+        status = getattr(candidate, "status_code", None)
+        if isinstance(status, int):
+            return status
+
+    message = str(exc)
+    match = _STATUS_PATTERN.search(message)
+    if match:
+        return int(match.group(1))
+    if _THROTTLE_PATTERN.search(message):
+        return 429
+    return None
+
+
+def _retry_after_from_error(exc: BaseException) -> Optional[float]:
+    """Lê o header Retry-After (em segundos) da resposta anexada à exceção, se houver."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket cuja taxa se ajusta por AIMD: cresce de forma aditiva a cada
+    sucesso e cai de forma multiplicativa ao receber 429/5xx.
+
+    Seguro para uso entre threads; `rate` e `queue_depth` podem ser lidos a
+    qualquer momento para acompanhar o comportamento em produção.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        min_rate: float = 0.5,
+        max_rate: float = 50.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        burst: Optional[float] = None,
+    ):
+        """
+        Args:
+            rate (float): Taxa inicial em requisições por segundo.
+            min_rate (float): Piso da taxa após recuos.
+            max_rate (float): Teto da taxa após aumentos.
+            increase (float): Incremento aditivo (req/s) por sucesso, dividido pela taxa atual.
+            decrease (float): Fator multiplicativo aplicado em 429/5xx.
+            burst (float, opcional): Capacidade do bucket; padrão igual a `rate`.
+        """
+        self._rate = max(min_rate, min(rate, max_rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._burst = burst
+        self._tokens = self._capacity()
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._successes = 0
+        self._throttles = 0
+        self._cond = threading.Condition()
+
+    def _capacity(self) -> float:
+        return max(1.0, self._burst if self._burst is not None else self._rate)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self._capacity(), self._tokens + elapsed * self._rate)
+
+    @property
+    def rate(self) -> float:
+        """Taxa atual em requisições por segundo."""
+        return self._rate
+
+    @property
+    def queue_depth(self) -> int:
+        """Quantidade de chamadas aguardando token."""
+        return self._waiting
+
+    def acquire(self) -> None:
+        """Bloqueia até haver um token disponível."""
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self._paused_until and self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = max(self._paused_until - now, (1.0 - self._tokens) / self._rate)
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiting -= 1
+
+    def on_success(self) -> None:
+        """Aumento aditivo: ~`increase` req/s a cada segundo de sucessos."""
+        with self._cond:
+            self._successes += 1
+            self._rate = min(self.max_rate, self._rate + self.increase / self._rate)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        Recuo multiplicativo. Vários erros simultâneos (mesma rajada) contam
+        como um único recuo, evitando derrubar a taxa até o piso de uma vez.
+        """
+        with self._cond:
+            self._throttles += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= 1.0 / self._rate:
+                self._rate = max(self.min_rate, self._rate * self.decrease)
+                self._last_decrease = now
+                self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna um retrato do estado atual do limitador."""
+        with self._cond:
+            return {
+                "rate": round(self._rate, 3),
+                "queue_depth": self._waiting,
+                "successes": self._successes,
+                "throttles": self._throttles,
+            }
+
+    @classmethod
+    def from_env(cls, name: str, **defaults: Any) -> "AdaptiveRateLimiter":
+        """
+        Cria um limitador lendo `<NAME>_RATE_LIMIT`, `<NAME>_RATE_MIN` e
+        `<NAME>_RATE_MAX` do ambiente (em req/s).
+        """
+        env_keys = {"rate": "RATE_LIMIT", "min_rate": "RATE_MIN", "max_rate": "RATE_MAX"}
+        kwargs = dict(defaults)
+        for arg, suffix in env_keys.items():
+            raw = os.getenv(f"{name.upper()}_{suffix}")
+            if raw:
+                try:
+                    kwargs[arg] = float(raw)
+                except ValueError:
+                    logger.warning(f"Valor inválido para {name.upper()}_{suffix}: {raw}")
+        return cls(**kwargs)
+
+
+_RATE_LIMITERS: Dict[str, AdaptiveRateLimiter] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(name: str, **defaults: Any) -> AdaptiveRateLimiter:
+    """Retorna o limitador compartilhado do processo para um serviço upstream."""
+    with _RATE_LIMITERS_LOCK:
+        if name not in _RATE_LIMITERS:
+            _RATE_LIMITERS[name] = AdaptiveRateLimiter.from_env(name, **defaults)
+        return _RATE_LIMITERS[name]
+
+
+class RateLimitedClient:
+    """
+    Proxy que passa todas as chamadas públicas de um cliente (SwgohComlink,
+    mhanndalorian_bot.API) pelo limitador e o realimenta com o resultado.
+    """
+
+    def __init__(self, client: Any, limiter: AdaptiveRateLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    @property
+    def limiter(self) -> AdaptiveRateLimiter:
+        return self._limiter
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        return self._wrap(attr)
+
+    def _wrap(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            self._limiter.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                status = http_status_from_error(e)
+                if status is not None and (status == 429 or status >= 500):
+                    logger.warning(f"Throttling do upstream (status={status}); reduzindo taxa.")
+                    self._limiter.on_throttle(retry_after=_retry_after_from_error(e))
+                raise
+            self._limiter.on_success()
+            return result
+
+        return call
+
+
+# ----------------------------------------
+# Chamadas resilientes (retry, timeout, hedging)
+# ----------------------------------------
+# Limites superiores (s) dos buckets do histograma de latência
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências seguro entre threads.
+
+    Os buckets fixos (`LATENCY_BUCKETS`) servem para o resumo no log; os
+    percentis são exatos sobre as últimas `window` amostras, o que deixa o
+    p95 usado no hedging acompanhar mudanças de comportamento do upstream.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self._recent.append(seconds)
+            self._count += 1
+            self._total += seconds
+            self._max = max(self._max, seconds)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentil `q` (0-1) das amostras recentes, ou None sem amostras."""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def summary(self) -> Dict[str, Any]:
+        """Contagem, média, p50/p95/p99, máximo (em s) e contagem por bucket."""
+        labels = [f"<={b:g}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]:g}s"]
+        with self._lock:
+            count, total, maximum = self._count, self._total, self._max
+            buckets = {label: n for label, n in zip(labels, self._counts) if n}
+        result = {"count": count, "mean": round(total / count, 4) if count else None}
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            value = self.percentile(q)
+            result[name] = round(value, 4) if value is not None else None
+        result["max"] = round(maximum, 4)
+        result["buckets"] = buckets
+        return result
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Retentativas com backoff exponencial e jitter, timeout por requisição
+    e hedging opcional.
+
+    Attributes:
+        attempts: Tentativas no total (1 = sem retry).
+        base_delay / max_delay: Backoff "full jitter": espera uniforme em
+            [0, min(max_delay, base_delay * 2**tentativa)].
+        timeout: Tempo máximo (s) de espera por tentativa; None desliga.
+        hedge: Dispara uma requisição duplicada quando a tentativa passa do
+            percentil `hedge_quantile` das latências já observadas.
+        hedge_min_samples: Amostras necessárias antes de começar a fazer hedge.
+    """
+
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    timeout: Optional[float] = 30.0
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes da tentativa seguinte à `attempt` (0 = primeira)."""
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults: Any) -> "RetryPolicy":
+        """
+        Lê `<PREFIX>_RETRIES` (tentativas extras), `<PREFIX>_BACKOFF_BASE`,
+        `<PREFIX>_BACKOFF_MAX`, `<PREFIX>_TIMEOUT` (0 desliga) e
+        `<PREFIX>_HEDGE` (booleano) do ambiente.
+        """
+        prefix = prefix.upper()
+        kwargs = dict(defaults)
+        env_keys = {
+            "attempts": ("RETRIES", lambda v: int(v) + 1),
+            "base_delay": ("BACKOFF_BASE", float),
+            "max_delay": ("BACKOFF_MAX", float),
+            "timeout": ("TIMEOUT", lambda v: float(v) or None),
+        }
+        for arg, (suffix, parse) in env_keys.items():
+            raw = os.getenv(f"{prefix}_{suffix}")
+            if raw:
+                try:
+                    kwargs[arg] = parse(raw)
+                except ValueError:
+                    logger.warning(f"Valor inválido para {prefix}_{suffix}: {raw}")
+        if os.getenv(f"{prefix}_HEDGE"):
+            kwargs["hedge"] = env_flag(f"{prefix}_HEDGE")
+        return cls(**kwargs)
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """
+    Erros transitórios: 429, 5xx, timeouts e falhas de rede (OSError, base
+    das exceções do `requests`). Demais 4xx e erros de aplicação não são
+    repetidos.
+    """
+    status = http_status_from_error(exc)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(exc, OSError)
+
+
+class ResilientCaller:
+    """
+    Executa chamadas bloqueantes com timeout por tentativa, retry com backoff
+    e hedging, registrando as latências.
+
+    Cada tentativa roda em um pool próprio: o timeout limita quanto o
+    chamador espera, mas uma requisição HTTP já iniciada não é cancelada
+    (o resultado é descartado quando chegar). Por isso o pool deve ter
+    folga em relação ao número de chamadores concorrentes.
+
+    Attributes:
+        attempt_latency: Latência de cada requisição bem-sucedida (base do p95).
+        call_latency: Latência ponta a ponta de `call`, incluindo retries.
+    """
+
+    def __init__(
+        self, policy: Optional[RetryPolicy] = None, name: str = "call", pool_size: int = 32
+    ):
+        self.policy = policy or RetryPolicy()
+        self.name = name
+        self.attempt_latency = LatencyHistogram()
+        self.call_latency = LatencyHistogram()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+    def _hedge_delay(self) -> Optional[float]:
+        policy = self.policy
+        if not policy.hedge or self.attempt_latency.count < policy.hedge_min_samples:
+            return None
+        return self.attempt_latency.percentile(policy.hedge_quantile)
+
+    def _timed(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.attempt_latency.record(time.perf_counter() - start)
+        return result
+
+    def _attempt(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        """Uma tentativa: requisição original e, se passar do p95, uma duplicata."""
+        start = time.monotonic()
+        deadline = start + self.policy.timeout if self.policy.timeout else None
+        hedge_delay = self._hedge_delay()
+        hedge_at = start + hedge_delay if hedge_delay is not None else None
+
+        pending = {self._executor.submit(self._timed, func, args, kwargs)}
+        hedge = None
+        error: Optional[BaseException] = None
+        while pending:
+            checkpoints = [t for t in (deadline, hedge_at if hedge is None else None) if t]
+            wait_for = max(0.0, min(checkpoints) - time.monotonic()) if checkpoints else None
+            done, pending = wait_futures(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+
+            now = time.monotonic()
+            if pending and hedge is None and hedge_at is not None and now >= hedge_at:
+                self._count("hedges")
+                hedge = self._executor.submit(self._timed, func, args, kwargs)
+                pending.add(hedge)
+            elif pending and deadline is not None and now >= deadline:
+                self._count("timeouts")
+                raise TimeoutError(f"{self.name}: sem resposta em {self.policy.timeout:g}s")
+        raise error
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Chama `func(*args, **kwargs)` aplicando a política; propaga o último erro."""
+        self._count("calls")
+        start = time.perf_counter()
+        attempts = max(1, self.policy.attempts)
+        try:
+            for attempt in range(attempts):
+                try:
+                    return self._attempt(func, args, kwargs)
+                except Exception as e:
+                    if attempt + 1 >= attempts or not is_retryable_error(e):
+                        raise
+                    delay = self.policy.backoff(attempt)
+                    self._count("retries")
+                    logger.warning(
+                        f"{self.name}: tentativa {attempt + 1}/{attempts} falhou ({e}); "
+                        f"nova tentativa em {delay:.2f}s."
+                    )
+                    time.sleep(delay)
+        finally:
+            self.call_latency.record(time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores e histogramas de latência (por requisição e por chamada)."""
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "attempt_latency": self.attempt_latency.summary(),
+            "call_latency": self.call_latency.summary(),
+        }
+
+    def close(self) -> None:
+        """Libera o pool sem esperar requisições abandonadas por timeout."""
+        self._executor.shutdown(wait=False)
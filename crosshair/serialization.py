@@ -0,0 +1,226 @@
+"""Codecs de compressão e serializadores JSON (stdlib ou orjson)."""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import json
+import logging
+import lzma
+import math
+import os
+import re
+from io import BytesIO
+from typing import IO, Any, Callable, Dict, NamedTuple, Optional, Union
+
+from crosshair.config import env_list
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é um acelerador opcional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+# Separadores compactos: é o único formato que o orjson gera, e assim os
+# backends de serialização produzem exatamente os mesmos bytes. Os objetos
+# gravados antes desta mudança usavam ", " e ": " (padrão da stdlib)
+JSON_SEPARATORS = (",", ":")
+# Floats que o orjson grafa diferente da stdlib: em notação científica
+# (|x| >= 1e16 ou muito pequenos: "1e16" x "1e+16", "1e-7" x "1e-07") ou
+# pequenos em notação decimal ("0.00001" x "1e-05"). Buscas simples, sem
+# tokenizar: um falso positivo dentro de uma string só custa o caminho rápido
+_ORJSON_EXPONENT = re.compile(rb"e[-1-9]")
+_ORJSON_SMALL_DECIMAL = b"0.0000"
+# Nível histórico do bucket (padrão do GzipFile); o 6 comprime JSON quase
+# tanto em bem menos tempo, e pode ser escolhido via GCS_COMPRESSION_LEVEL
+DEFAULT_GZIP_LEVEL = 9
+
+
+# ----------------------------------------
+# Codecs de compressão
+# ----------------------------------------
+class Codec(NamedTuple):
+    """
+    Formato de compressão de um objeto, identificado pela extensão do path.
+
+    `opener(fileobj, mode, level)` devolve um file-like que comprime na
+    escrita e descomprime na leitura; `level` é ignorado na leitura.
+    """
+
+    name: str
+    extension: str
+    default_level: int
+    opener: Callable[[IO[bytes], str, int], IO[bytes]]
+
+    def open(self, fileobj: IO[bytes], mode: str = "rb", level: Optional[int] = None) -> IO[bytes]:
+        return self.opener(fileobj, mode, self.default_level if level is None else level)
+
+    def compress(self, data: bytes, level: Optional[int] = None) -> bytes:
+        buffer = BytesIO()
+        with self.open(buffer, "wb", level) as f:
+            f.write(data)
+        return buffer.getvalue()
+
+    def decompress(self, data: bytes) -> bytes:
+        with self.open(BytesIO(data), "rb") as f:
+            return f.read()
+
+
+def _open_lzma(fileobj: IO[bytes], mode: str, level: int) -> IO[bytes]:
+    # LZMAFile não aceita preset na leitura
+    if "r" in mode:
+        return lzma.LZMAFile(fileobj, mode=mode)
+    return lzma.LZMAFile(fileobj, mode=mode, preset=level)
+
+
+CODECS: Dict[str, Codec] = {
+    "gzip": Codec(
+        "gzip",
+        ".gz",
+        DEFAULT_GZIP_LEVEL,
+        lambda f, mode, level: gzip.GzipFile(fileobj=f, mode=mode, compresslevel=level),
+    ),
+    "lzma": Codec("lzma", ".xz", 6, _open_lzma),
+    "bz2": Codec(
+        "bz2", ".bz2", 9, lambda f, mode, level: bz2.BZ2File(f, mode=mode, compresslevel=level)
+    ),
+}
+
+
+def codec_for_path(path: str) -> Codec:
+    """
+    Detecta o codec pela extensão (".gz", ".xz", ".bz2").
+
+    Paths sem extensão conhecida são tratados como gzip, o formato
+    histórico do bucket.
+    """
+    for codec in CODECS.values():
+        if path.endswith(codec.extension):
+            return codec
+    return CODECS["gzip"]
+
+
+def compression_levels_from_env() -> Dict[str, int]:
+    """
+    Níveis de compressão por padrão de path, lidos de GCS_COMPRESSION_LEVEL.
+
+    Aceita um nível único ("6", para todos os objetos) ou pares
+    `padrão=nível` separados por vírgula, testados em ordem com fnmatch
+    contra o path (ex. "*/players*=6,*=9"). Entradas inválidas são
+    ignoradas com um aviso; paths sem padrão usam o nível do codec.
+    """
+    levels: Dict[str, int] = {}
+    for item in env_list("GCS_COMPRESSION_LEVEL"):
+        pattern, _, level = item.rpartition("=")
+        if not level.strip().isdigit():
+            logger.warning(f"GCS_COMPRESSION_LEVEL inválido, ignorando: {item}")
+            continue
+        levels[pattern.strip() or "*"] = int(level)
+    return levels
+
+
+# ----------------------------------------
+# Serialização JSON (stdlib ou orjson)
+# ----------------------------------------
+def _has_non_finite(data: Any) -> bool:
+    """Indica se há NaN/Infinity em algum float de `data` (dicts e listas aninhados)."""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, float):
+            if not math.isfinite(item):
+                return True
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return False
+
+
+class JsonSerializer:
+    """
+    Serializador JSON da stdlib: UTF-8 sem escapes, separadores compactos e
+    `default=str` para tipos não nativos (datetime, Decimal, ...).
+    """
+
+    name = "json"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(
+            ensure_ascii=False, default=str, separators=JSON_SEPARATORS
+        )
+
+    def dumps(self, data: Any) -> bytes:
+        return self._encoder.encode(data).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """
+    Caminho rápido via orjson, com exatamente os mesmos bytes do
+    `JsonSerializer` (o hash da deduplicação não depende do backend).
+
+    datetime e dataclasses são repassados ao `default=str`, como na stdlib.
+    A chamada cai para a stdlib quando:
+
+    - o orjson recusa o payload (inteiros acima de 64 bits, por exemplo);
+    - há NaN/Infinity, que o orjson gravaria como `null` (perdendo o valor):
+      se a saída tem `null`, o payload é verificado;
+    - a saída tem floats que o orjson grafa diferente da stdlib, como
+      `1e16` e `0.00001` (a stdlib escreve `1e+16` e `1e-05`).
+    """
+
+    name = "orjson"
+    _OPTIONS = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if orjson is not None
+        else 0
+    )
+
+    def dumps(self, data: Any) -> bytes:
+        try:
+            encoded = orjson.dumps(data, default=str, option=self._OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            return super().dumps(data)
+        if b"null" in encoded and _has_non_finite(data):
+            return super().dumps(data)
+        if _ORJSON_SMALL_DECIMAL in encoded or _ORJSON_EXPONENT.search(encoded):
+            return super().dumps(data)
+        return encoded
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super().loads(data)
+
+
+SERIALIZERS: Dict[str, Callable[[], JsonSerializer]] = {
+    "json": JsonSerializer,
+    "orjson": OrjsonSerializer,
+}
+_SERIALIZER_CACHE: Dict[str, JsonSerializer] = {}
+
+
+def get_serializer(name: Optional[str] = None) -> JsonSerializer:
+    """
+    Retorna o serializador `name` ("json" ou "orjson").
+
+    Sem `name`, usa JSON_SERIALIZER do ambiente; o padrão ("auto") é o
+    orjson quando instalado e a stdlib caso contrário.
+    """
+    name = (name or os.getenv("JSON_SERIALIZER") or "auto").lower()
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name not in SERIALIZERS:
+        raise ValueError(f"Serializador JSON desconhecido: {name}")
+    if name == "orjson" and orjson is None:
+        logger.warning("orjson não instalado; usando o json da stdlib.")
+        name = "json"
+    if name not in _SERIALIZER_CACHE:
+        _SERIALIZER_CACHE[name] = SERIALIZERS[name]()
+    return _SERIALIZER_CACHE[name]
@@ -0,0 +1,249 @@
+"""Deltas de JSON e snapshots diários dos players (base + deltas)."""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from google.api_core.exceptions import NotFound
+
+from crosshair.storage import GCSClient
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Snapshots diários em delta (players)
+# ----------------------------------------
+# Campos usados, em ordem de preferência, para casar itens de listas entre
+# snapshots (players; memberId/mapStatId nos leaderboards de TW/TB)
+DELTA_LIST_KEYS = ("playerId", "id", "nameKey", "memberId", "mapStatId")
+PLAYERS_DELTA_FORMAT = "players-delta/1"
+DEFAULT_PLAYERS_BASE_INTERVAL = 7
+
+
+def _delta_list_key(old: List[Any], new: List[Any]) -> Optional[str]:
+    """Campo que identifica unicamente os itens das duas listas (ids str), ou None."""
+    items = old + new
+    if not items or not all(isinstance(item, dict) for item in items):
+        return None
+    for key in DELTA_LIST_KEYS:
+        for side in (old, new):
+            ids = [item.get(key) for item in side]
+            if not all(isinstance(i, str) for i in ids) or len(set(ids)) != len(ids):
+                break
+        else:
+            return key
+    return None
+
+
+def json_delta(old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """
+    Diferença de `old` para `new`, ou None se iguais.
+
+    - dicts: {"set": {...}, "del": [...], "sub": {chave: delta}}
+    - listas de dicts com id único (ver DELTA_LIST_KEYS): {"key": campo,
+      "add": {id: item}, "sub": {id: delta}, "del": [ids], "order": [ids]},
+      com "order" só quando a ordem final difere da natural (antigos na
+      ordem original + novos ao final)
+    - qualquer outro caso: {"=": new}
+
+    Seções vazias são omitidas. `apply_json_delta(old, delta) == new`.
+    """
+    if old == new:
+        return None
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        set_: Dict[str, Any] = {}
+        sub: Dict[str, Any] = {}
+        for key, value in new.items():
+            if key not in old:
+                set_[key] = value
+            elif old[key] != value:
+                child = json_delta(old[key], value)
+                if "=" in child:
+                    set_[key] = value
+                else:
+                    sub[key] = child
+        removed = [key for key in old if key not in new]
+        delta = {"set": set_, "del": removed, "sub": sub}
+        return {k: v for k, v in delta.items() if v}
+
+    if isinstance(old, list) and isinstance(new, list):
+        key = _delta_list_key(old, new)
+        if key is not None:
+            old_items = {item[key]: item for item in old}
+            new_ids = [item[key] for item in new]
+            add = {}
+            sub = {}
+            for item in new:
+                item_id = item[key]
+                if item_id not in old_items:
+                    add[item_id] = item
+                elif old_items[item_id] != item:
+                    sub[item_id] = json_delta(old_items[item_id], item)
+            new_set = set(new_ids)
+            removed = [i for i in old_items if i not in new_set]
+            natural = [i for i in old_items if i in new_set] + [i for i in new_ids if i in add]
+            delta = {
+                "key": key,
+                "add": add,
+                "sub": sub,
+                "del": removed,
+                "order": new_ids if natural != new_ids else [],
+            }
+            return {k: v for k, v in delta.items() if v}
+
+    return {"=": new}
+
+
+def apply_json_delta(old: Any, delta: Optional[Dict[str, Any]]) -> Any:
+    """Aplica um delta gerado por `json_delta`; `old` não é modificado."""
+    if delta is None:
+        return old
+    if "=" in delta:
+        return delta["="]
+
+    if isinstance(old, dict):
+        removed = set(delta.get("del", ()))
+        result = {k: v for k, v in old.items() if k not in removed}
+        for key, child in delta.get("sub", {}).items():
+            result[key] = apply_json_delta(old[key], child)
+        result.update(delta.get("set", {}))
+        return result
+
+    if isinstance(old, list):
+        key = delta["key"]
+        add = delta.get("add", {})
+        sub = delta.get("sub", {})
+        old_items = {item[key]: item for item in old}
+        order = delta.get("order")
+        if not order:
+            removed = set(delta.get("del", ()))
+            order = [i for i in old_items if i not in removed] + list(add)
+        return [add[i] if i in add else apply_json_delta(old_items[i], sub.get(i)) for i in order]
+
+    raise ValueError(f"Delta incompatível com valor do tipo {type(old).__name__}")
+
+
+class PlayersSnapshots:
+    """
+    Snapshots diários de players em base + deltas.
+
+    A cada `base_interval` dias (ou quando falta o snapshot da véspera) é
+    gravada uma base completa em `players.json.gz`, no formato de sempre.
+    Nos outros dias grava-se `players.delta.json.gz`, só com o que mudou
+    por player em relação ao dia anterior. `read(dia)` reconstrói o
+    snapshot completo de qualquer dia percorrendo a cadeia até a base.
+    """
+
+    BASE_NAME = "players.json.gz"
+    DELTA_NAME = "players.delta.json.gz"
+
+    def __init__(
+        self,
+        gcs: "GCSClient",
+        guild_id: str,
+        base_interval: int = DEFAULT_PLAYERS_BASE_INTERVAL,
+    ):
+        self.gcs = gcs
+        self.guild_id = guild_id
+        self.base_interval = max(1, base_interval)
+
+    @classmethod
+    def from_env(cls, gcs: "GCSClient", guild_id: str) -> "PlayersSnapshots":
+        """Intervalo entre bases de PLAYERS_BASE_INTERVAL_DAYS (padrão 7)."""
+        raw = os.getenv("PLAYERS_BASE_INTERVAL_DAYS")
+        try:
+            interval = int(raw) if raw else DEFAULT_PLAYERS_BASE_INTERVAL
+        except ValueError:
+            logger.warning(f"PLAYERS_BASE_INTERVAL_DAYS inválido: {raw}")
+            interval = DEFAULT_PLAYERS_BASE_INTERVAL
+        return cls(gcs, guild_id, interval)
+
+    def folder(self, day: date) -> str:
+        return f"{self.guild_id}/daily/{day.year}/{day.month:02}/{day.day:02}"
+
+    def _resolve(self, day: date) -> Optional[Tuple[List[Any], date]]:
+        """(snapshot completo, data da base) de `day`, ou None se ausente."""
+        deltas = []
+        current = day
+        while True:
+            folder = self.folder(current)
+            delta = self.gcs.load_json_gzip_if_exists(f"{folder}/{self.DELTA_NAME}")
+            if delta is None:
+                base = self.gcs.load_json_gzip_if_exists(f"{folder}/{self.BASE_NAME}")
+                if base is None:
+                    if deltas:
+                        logger.error(f"Base ausente na cadeia de deltas de players: {folder}")
+                    return None
+                break
+            if delta.get("format") != PLAYERS_DELTA_FORMAT:
+                raise ValueError(f"Formato de delta desconhecido: {delta.get('format')}")
+            deltas.append(delta)
+            current = date.fromisoformat(delta["previous"])
+
+        players = base
+        for delta in reversed(deltas):
+            players = apply_json_delta(players, delta["delta"])
+        return players, current
+
+    def read(self, day: Union[date, datetime]) -> Optional[List[Any]]:
+        """Snapshot completo de players do dia, reconstruído a partir da base."""
+        day = day.date() if isinstance(day, datetime) else day
+        resolved = self._resolve(day)
+        return resolved[0] if resolved else None
+
+    def _delta_payload(
+        self, day: date, previous: Tuple[List[Any], date], players: List[Any]
+    ) -> Optional[Dict[str, Any]]:
+        delta = json_delta(previous[0], players)
+        if delta is not None and "=" in delta:
+            logger.info("Players sem playerId único; gravando base completa.")
+            return None
+        if apply_json_delta(previous[0], delta) != players:
+            logger.warning("Delta de players não reproduz o snapshot; gravando base completa.")
+            return None
+        return {
+            "format": PLAYERS_DELTA_FORMAT,
+            "date": day.isoformat(),
+            "previous": (day - timedelta(days=1)).isoformat(),
+            "baseDate": previous[1].isoformat(),
+            "delta": delta,
+        }
+
+    def write(self, day: Union[date, datetime], players: List[Any]) -> str:
+        """
+        Grava o snapshot do dia como base ou delta e retorna o path gravado.
+
+        Grava base completa se não houver snapshot da véspera, se a base
+        vigente tiver `base_interval` dias ou mais, ou se os players não
+        puderem ser casados por `playerId`. Exceções de upload são propagadas.
+        """
+        day = day.date() if isinstance(day, datetime) else day
+        folder = self.folder(day)
+
+        payload = None
+        if self.base_interval > 1:
+            previous = self._resolve(day - timedelta(days=1))
+            if previous is not None and (day - previous[1]).days < self.base_interval:
+                payload = self._delta_payload(day, previous, players)
+
+        if payload is None:
+            path, stale = f"{folder}/{self.BASE_NAME}", f"{folder}/{self.DELTA_NAME}"
+            self.gcs._upload_json_gzip(players, path, stream=True)
+            logger.info(f"Base de players gravada: {path}")
+        else:
+            path, stale = f"{folder}/{self.DELTA_NAME}", f"{folder}/{self.BASE_NAME}"
+            self.gcs._upload_json_gzip(payload, path)
+            changed = len((payload["delta"] or {}).get("sub", {}))
+            logger.info(f"Delta de players gravado ({changed} alterados): {path}")
+
+        # Reexecução no mesmo dia pode ter gravado o outro formato antes
+        try:
+            self.gcs.bucket.blob(stale).delete()
+        except NotFound:
+            pass
+        return path
@@ -0,0 +1,1455 @@
+"""Cliente de storage (GCS, disco local ou memória) e cache local em disco."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from fnmatch import fnmatch
+from io import BytesIO, TextIOWrapper
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import requests
+from google.api_core.exceptions import NotFound, NotModified, PreconditionFailed
+from google.cloud import storage
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow é opcional para o JSON.gz
+    pa = None
+    pq = None
+
+from crosshair.jsonpath import _assemble_selection, _project, iter_json_paths
+from crosshair.parquet import records_to_table
+from crosshair.serialization import (
+    CODECS,
+    Codec,
+    JsonSerializer,
+    codec_for_path,
+    compression_levels_from_env,
+    get_serializer,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# O upload resumable exige blocos múltiplos de 256 KiB
+_CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Cada bloco de leitura em streaming é um request de range
+DEFAULT_READ_CHUNK_SIZE = 4 * 1024 * 1024
+# Partições bronze que não mudam depois do dia em que foram escritas. As
+# pastas de TW/TB (events/t[wb]/<data>/) ficam de fora: a data é a do início
+# do evento, e a série ao vivo, o --force e a deduplicação regravam objetos
+# ali nos dias seguintes; elas são revalidadas por generation
+DEFAULT_IMMUTABLE_PATTERNS = (
+    r"^[^/]+/daily/(?P<y>\d{4})/(?P<m>\d{2})/(?P<d>\d{2})/",
+    r"^calendar/(?P<y>\d{4})/(?P<m>\d{2})/(?P<d>\d{2})/",
+)
+# Quantidade de texto JSON acumulada antes de cada write no compressor
+_JSON_WRITE_BUFFER = 64 * 1024
+# Ponteiros "chave lógica -> último objeto" usados na deduplicação de uploads
+DEDUP_REF_PREFIX = "_dedup"
+
+
+def _align_chunk_size(chunk_size: int) -> int:
+    """Arredonda o chunk para o múltiplo de 256 KiB mais próximo (mínimo 256 KiB)."""
+    blocks = max(1, round(chunk_size / _CHUNK_ALIGNMENT))
+    return blocks * _CHUNK_ALIGNMENT
+
+
+class UploadInfo(NamedTuple):
+    """Metadados de um objeto recém-enviado (usados no manifest do dia)."""
+
+    path: str
+    generation: Optional[int]
+    size: Optional[int]
+    sha256: str
+
+
+class FetchResult(NamedTuple):
+    """Resultado de uma leitura condicional por generation."""
+
+    data: Any
+    generation: Optional[int]
+    not_modified: bool
+
+
+@dataclass
+class BatchResult:
+    """Resultado por item e métricas agregadas de uma operação em lote."""
+
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+    durations: Dict[str, float] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def stats(self) -> Dict[str, Any]:
+        """Contagens, throughput e latências (p50/p95/max) por item."""
+        latencies = sorted(self.durations.values())
+        total = len(latencies)
+
+        def percentile(q: float) -> float:
+            return round(latencies[min(total - 1, int(q * total))], 4) if total else 0.0
+
+        return {
+            "items": total,
+            "succeeded": len(self.results),
+            "failed": len(self.errors),
+            "elapsed_s": round(self.elapsed, 4),
+            "items_per_s": round(total / self.elapsed, 2) if self.elapsed > 0 else 0.0,
+            "p50_s": percentile(0.50),
+            "p95_s": percentile(0.95),
+            "max_s": round(latencies[-1], 4) if total else 0.0,
+        }
+
+
+class GCSClient:
+    """
+    Wrapper para operações com Google Cloud Storage, incluindo
+    upload e download de JSON compactado. O codec (gzip, lzma ou bz2) é
+    escolhido pela extensão do path ("guild.json.gz", "players.json.xz").
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        client: Optional[StorageBackend] = None,
+        upload_chunk_size: int = DEFAULT_UPLOAD_CHUNK_SIZE,
+        read_chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+        cache: Optional["DiskCache"] = None,
+        immutable_patterns: Sequence[str] = DEFAULT_IMMUTABLE_PATTERNS,
+        compression_level: Optional[Union[int, Mapping[str, int]]] = None,
+        serializer: Optional[JsonSerializer] = None,
+    ):
+        """
+        Args:
+            bucket_name (str): Nome do bucket no Google Cloud Storage.
+            client (StorageBackend, opcional): Cliente customizado (storage.Client,
+                LocalStorageClient ou MemoryStorageClient); por padrão definido
+                por STORAGE_BACKEND (ver `storage_client_from_env`).
+            upload_chunk_size (int): Tamanho dos blocos do upload resumable em modo
+                streaming; arredondado para múltiplo de 256 KiB.
+            read_chunk_size (int): Tamanho de cada range baixado nas leituras em streaming.
+            cache (DiskCache, opcional): Cache local de blobs; por padrão é criado
+                a partir de GCS_CACHE_DIR, se definido.
+            immutable_patterns (list): Regex de paths servidos do cache sem
+                nenhum request (ver `is_immutable_path`).
+            compression_level (int | dict, opcional): Nível usado na escrita, ou
+                `{padrão fnmatch do path: nível}` (o primeiro que casar vale); por
+                padrão o de GCS_COMPRESSION_LEVEL (ver `compression_levels_from_env`)
+                e, sem padrão correspondente, o de cada codec (gzip 9, lzma 6, bz2 9).
+            serializer (JsonSerializer, opcional): Backend JSON; por padrão
+                `get_serializer()` (orjson se instalado).
+        """
+        self.client = client or storage_client_from_env()
+        self.bucket_name = bucket_name
+        self.bucket = self.client.bucket(bucket_name)
+        self.upload_chunk_size = _align_chunk_size(upload_chunk_size)
+        self.read_chunk_size = read_chunk_size
+        self.cache = cache if cache is not None else DiskCache.from_env()
+        self.immutable_patterns = immutable_patterns
+        if compression_level is None:
+            compression_level = compression_levels_from_env()
+        elif isinstance(compression_level, int):
+            compression_level = {"*": compression_level}
+        self.compression_levels: Dict[str, int] = dict(compression_level)
+        self.serializer = serializer or get_serializer()
+        # Último upload bem-sucedido de cada path (generation, tamanho, hash)
+        self.uploaded: Dict[str, UploadInfo] = {}
+        self._pool_size = 10
+
+    def compression_level_for(self, path: str) -> Optional[int]:
+        """Nível de compressão do path; None usa o padrão do codec."""
+        for pattern, level in self.compression_levels.items():
+            if fnmatch(path, pattern):
+                return level
+        return None
+
+    # ----------------------------------------
+    # Internos: JSON <-> GZIP
+    # ----------------------------------------
+    @staticmethod
+    def _json_to_gzip_bytes(
+        data: Dict[str, Any],
+        codec: Optional[Codec] = None,
+        level: Optional[int] = None,
+        serializer: Optional[JsonSerializer] = None,
+        digest: Optional[Any] = None,
+    ) -> BytesIO:
+        """
+        Converte dict em JSON compactado (gzip por padrão) em memória.
+
+        `digest` (hashlib), se informado, recebe o JSON não comprimido.
+        """
+        codec = codec or CODECS["gzip"]
+        json_bytes = (serializer or get_serializer()).dumps(data)
+        if digest is not None:
+            digest.update(json_bytes)
+        buffer = BytesIO()
+
+        with codec.open(buffer, "wb", level) as f:
+            f.write(json_bytes)
+
+        buffer.seek(0)
+        return buffer
+
+    @classmethod
+    def _iter_json_chunks(
+        cls, data: Any, serializer: JsonSerializer, depth: int = 2
+    ) -> Iterator[bytes]:
+        """
+        Gera o JSON de `data` em fragmentos, idêntico a `serializer.dumps(data)`.
+
+        Listas e dicts de chaves str são abertos até `depth` níveis; cada item
+        é codificado de uma vez pelo serializador (encoder em C ou orjson, bem
+        mais rápidos que `iterencode`, que é Python puro), então o maior
+        fragmento em memória é um único item.
+        """
+        if depth > 0 and isinstance(data, (list, tuple)) and data:
+            yield b"["
+            for i, item in enumerate(data):
+                if i:
+                    yield b","
+                yield from cls._iter_json_chunks(item, serializer, depth - 1)
+            yield b"]"
+        elif (
+            depth > 0 and isinstance(data, dict) and data and all(isinstance(k, str) for k in data)
+        ):
+            yield b"{"
+            for i, (key, value) in enumerate(data.items()):
+                yield (b"," if i else b"") + serializer.dumps(key) + b":"
+                yield from cls._iter_json_chunks(value, serializer, depth - 1)
+            yield b"}"
+        else:
+            yield serializer.dumps(data)
+
+    @classmethod
+    def _write_json_gzip(
+        cls,
+        data: Any,
+        fileobj: IO[bytes],
+        codec: Optional[Codec] = None,
+        level: Optional[int] = None,
+        serializer: Optional[JsonSerializer] = None,
+        digest: Optional[Any] = None,
+    ) -> int:
+        """
+        Serializa `data` incrementalmente direto no compressor (gzip por padrão).
+
+        Nunca materializa o JSON inteiro: os fragmentos são agrupados em
+        blocos de ~64 KiB e comprimidos à medida que chegam. `digest`
+        (hashlib), se informado, recebe cada bloco não comprimido.
+
+        Returns:
+            int: Bytes de JSON (não comprimido) escritos.
+        """
+        serializer = serializer or get_serializer()
+        written = 0
+
+        with (codec or CODECS["gzip"]).open(fileobj, "wb", level) as f:
+
+            def write(block: bytes) -> int:
+                if digest is not None:
+                    digest.update(block)
+                return f.write(block)
+
+            pending = []
+            pending_size = 0
+            for chunk in cls._iter_json_chunks(data, serializer):
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= _JSON_WRITE_BUFFER:
+                    written += write(b"".join(pending))
+                    pending = []
+                    pending_size = 0
+            if pending:
+                written += write(b"".join(pending))
+
+        return written
+
+    @staticmethod
+    def _gzip_bytes_to_json(
+        data: bytes, codec: Optional[Codec] = None, serializer: Optional[JsonSerializer] = None
+    ) -> Dict[str, Any]:
+        """Descompacta JSON (gzip por padrão) em dict."""
+        return (serializer or get_serializer()).loads((codec or CODECS["gzip"]).decompress(data))
+
+    # ----------------------------------------
+    # Upload JSON.gz
+    # ----------------------------------------
+    def upload_json_gzip(
+        self,
+        data: Dict[str, Any],
+        path: str,
+        stream: bool = False,
+        dedup_key: Optional[str] = None,
+    ) -> bool:
+        """
+        Compacta um dict em JSON.gz e envia para um caminho no bucket.
+
+        Args:
+            data (dict): Dados em formato de dicionário.
+            path (str): Caminho destino dentro do bucket.
+            stream (bool): Se True, serializa e comprime direto para um upload
+                resumable em blocos de `upload_chunk_size`, sem montar o
+                arquivo em memória. Indicado para payloads grandes (players).
+            dedup_key (str, opcional): Chave lógica do objeto (ex. "calendar",
+                ou o próprio `path` para reexecuções). Se o conteúdo for igual
+                ao do último objeto dessa chave, nada é enviado (ver
+                `_upload_json_gzip_dedup`).
+
+        Returns:
+            bool: True se sucesso, False se erro.
+        """
+        try:
+            if dedup_key is None:
+                self._upload_json_gzip(data, path, stream=stream)
+                logger.info(f"Upload concluído: gs://{self.bucket_name}/{path}")
+            else:
+                self._upload_json_gzip_dedup(data, path, dedup_key, stream=stream)
+            return True
+
+        except Exception as e:
+            logger.error(
+                f"Falha no upload para GCS (bucket={self.bucket_name}, path={path}): {e}",
+                exc_info=True,
+            )
+            return False
+
+    def _upload_json_gzip(
+        self,
+        data: Any,
+        path: str,
+        stream: bool = False,
+        if_generation_match: Optional[int] = None,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> UploadInfo:
+        """
+        Upload sem tratamento de erro; exceções são propagadas.
+
+        `if_generation_match` condiciona a escrita à generation atual do
+        objeto (0 = não pode existir); em conflito o GCS levanta
+        PreconditionFailed. `metadata` é gravado como metadado customizado.
+        """
+        if stream:
+            info = self._upload_json_gzip_stream(data, path, if_generation_match, metadata)
+            self.uploaded[path] = info
+            return info
+
+        digest = hashlib.sha256()
+        buffer = self._json_to_gzip_bytes(
+            data, codec_for_path(path), self.compression_level_for(path), self.serializer, digest
+        )
+
+        blob = self.bucket.blob(path)
+        if metadata:
+            blob.metadata = metadata
+        kwargs = {} if if_generation_match is None else {"if_generation_match": if_generation_match}
+        blob.upload_from_file(
+            buffer,
+            content_type="application/octet-stream",
+            client=self.client,
+            **kwargs,
+        )
+        if self.cache is not None:
+            self.cache.put(self.bucket_name, path, blob.generation, buffer.getvalue())
+
+        info = UploadInfo(path, blob.generation, len(buffer.getvalue()), digest.hexdigest())
+        self.uploaded[path] = info
+        return info
+
+    def _upload_json_gzip_stream(
+        self,
+        data: Any,
+        path: str,
+        if_generation_match: Optional[int] = None,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> UploadInfo:
+        """Envia JSON.gz via BlobWriter (upload resumable), bloco a bloco."""
+        blob = self.bucket.blob(path, chunk_size=self.upload_chunk_size)
+        if metadata:
+            blob.metadata = metadata
+        kwargs = {} if if_generation_match is None else {"if_generation_match": if_generation_match}
+        digest = hashlib.sha256()
+        with blob.open(
+            "wb",
+            chunk_size=self.upload_chunk_size,
+            content_type="application/octet-stream",
+            ignore_flush=True,
+            **kwargs,
+        ) as writer:
+            self._write_json_gzip(
+                data,
+                writer,
+                codec_for_path(path),
+                self.compression_level_for(path),
+                self.serializer,
+                digest,
+            )
+
+        # O BlobWriter não devolve os metadados do objeto final
+        blob.reload()
+        return UploadInfo(path, blob.generation, blob.size, digest.hexdigest())
+
+    # ----------------------------------------
+    # Deduplicação por hash de conteúdo
+    # ----------------------------------------
+    def _content_hash(self, data: Any) -> str:
+        """sha256 do JSON serializado, calculado em fragmentos (sem montar o arquivo)."""
+        digest = hashlib.sha256()
+        for chunk in self._iter_json_chunks(data, self.serializer):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _dedup_ref_path(dedup_key: str) -> str:
+        return f"{DEDUP_REF_PREFIX}/{dedup_key.strip('/')}.json.gz"
+
+    def _upload_json_gzip_dedup(
+        self, data: Any, path: str, dedup_key: str, stream: bool = False
+    ) -> UploadInfo:
+        """
+        Upload que evita reenviar conteúdo idêntico ao último da `dedup_key`.
+
+        O hash (sha256 do JSON não comprimido) é calculado numa passada de
+        serialização sem compressão e comparado com o ponteiro
+        `_dedup/<chave>.json.gz`, que guarda o último objeto da chave.
+
+        - Mesmo hash e mesmo path: nada é escrito; o objeto existente ganha
+          `dedupSkips`/`lastDedupAt` nos metadados.
+        - Mesmo hash e path novo (ex. calendário do dia seguinte): cópia no
+          servidor, sem tráfego de saída nem recompressão, com `dedupOf`
+          apontando a origem para que os consumidores possam pular o
+          reprocessamento.
+        - Hash diferente: upload normal, com `sha256` nos metadados.
+        """
+        sha256 = self._content_hash(data)
+        ref_path = self._dedup_ref_path(dedup_key)
+        ref = self.fetch_json_gzip(ref_path).data
+
+        source = None
+        if isinstance(ref, dict) and ref.get("sha256") == sha256 and ref.get("path"):
+            source = self.bucket.get_blob(ref["path"])
+            if source is not None and (source.metadata or {}).get("sha256") != sha256:
+                source = None  # objeto sobrescrito fora da deduplicação
+
+        now = datetime.now(timezone.utc).isoformat()
+        if source is not None and source.name == path:
+            metadata = dict(source.metadata or {})
+            metadata["dedupSkips"] = str(int(metadata.get("dedupSkips") or 0) + 1)
+            metadata["lastDedupAt"] = now
+            source.metadata = metadata
+            source.patch()
+            info = UploadInfo(path, source.generation, source.size, sha256)
+            self.uploaded[path] = info
+            logger.info(f"Upload evitado, conteúdo idêntico: gs://{self.bucket_name}/{path}")
+            return info
+
+        if source is not None:
+            copied = self.bucket.copy_blob(source, self.bucket, path)
+            metadata = {key: None for key in copied.metadata or {}}
+            metadata.update({"sha256": sha256, "dedupOf": source.name, "lastDedupAt": now})
+            copied.metadata = metadata
+            copied.patch()
+            info = UploadInfo(path, copied.generation, copied.size, sha256)
+            self.uploaded[path] = info
+            logger.info(
+                f"Conteúdo idêntico a {source.name}; cópia no servidor: "
+                f"gs://{self.bucket_name}/{path}"
+            )
+        else:
+            info = self._upload_json_gzip(data, path, stream=stream, metadata={"sha256": sha256})
+            logger.info(f"Upload concluído: gs://{self.bucket_name}/{path}")
+
+        self._upload_json_gzip(
+            {"path": path, "generation": info.generation, "sha256": sha256, "updatedAt": now},
+            ref_path,
+        )
+        return info
+
+    # ----------------------------------------
+    # Download JSON.gz
+    # ----------------------------------------
+    def load_json_gzip(
+        self,
+        path: str,
+        select: Optional[Union[Sequence[str], Mapping[str, Optional[Sequence[str]]]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Lê e descompacta um arquivo JSON.gz do GCS e retorna como dict.
+
+        Faz um único request: a ausência do objeto é detectada pelo NotFound
+        do próprio download, sem um `exists()` prévio.
+
+        Args:
+            path (str): Caminho do arquivo no bucket.
+            select (opcional): Key paths a manter, ex. ["member[*]"] ou
+                {"member[*]": ["playerId", "playerName"]} para também projetar
+                os campos de cada item. O arquivo é lido em streaming e só as
+                partes selecionadas são materializadas; o resto é descartado.
+
+        Returns:
+            dict | None: Dados carregados, ou None em caso de falha.
+        """
+        try:
+            if select is not None:
+                return self._load_selection(path, select)
+
+            data, _ = self._download_bytes(path)
+            return self._gzip_bytes_to_json(data, codec_for_path(path), self.serializer)
+
+        except NotFound:
+            logger.warning(f"Arquivo não encontrado: gs://{self.bucket_name}/{path}")
+            return None
+
+        except Exception as e:
+            logger.error(
+                f"Erro ao carregar JSON={self.bucket_name}, path={path}): {e}",
+                exc_info=True,
+            )
+            return None
+
+    def load_json_gzip_if_exists(self, path: str) -> Optional[Any]:
+        """
+        Lê um JSON.gz; None se o objeto não existir, sem log de aviso (para
+        objetos cuja ausência é esperada, como checkpoints e snapshots).
+        Outros erros são propagados, ao contrário de `load_json_gzip`.
+        """
+        try:
+            data, _ = self._download_bytes(path)
+        except NotFound:
+            return None
+        return self._gzip_bytes_to_json(data, codec_for_path(path), self.serializer)
+
+    def fetch_json_gzip(
+        self, path: str, if_generation_not_match: Optional[int] = None
+    ) -> FetchResult:
+        """
+        Lê um JSON.gz retornando também a generation do objeto.
+
+        Com `if_generation_not_match`, o GCS responde 304 se o objeto ainda
+        estiver nessa generation e nada é baixado; o chamador reaproveita a
+        cópia que já tem.
+
+        Args:
+            path (str): Caminho do arquivo no bucket.
+            if_generation_not_match (int, opcional): Generation já conhecida.
+
+        Returns:
+            FetchResult: `data` e `generation` quando baixado; `not_modified=True`
+            quando inalterado; `data=None, generation=None` se ausente ou erro.
+        """
+        codec = codec_for_path(path)
+        try:
+            if if_generation_not_match is None:
+                data, generation = self._download_bytes(path)
+                return FetchResult(
+                    self._gzip_bytes_to_json(data, codec, self.serializer), generation, False
+                )
+
+            blob = self.bucket.blob(path)
+            data = blob.download_as_bytes(if_generation_not_match=if_generation_not_match)
+            if self.cache is not None:
+                self.cache.put(self.bucket_name, path, blob.generation, data)
+            return FetchResult(
+                self._gzip_bytes_to_json(data, codec, self.serializer), blob.generation, False
+            )
+
+        except NotModified:
+            logger.info(f"Sem alterações (generation {if_generation_not_match}): {path}")
+            return FetchResult(None, if_generation_not_match, True)
+
+        except NotFound:
+            logger.warning(f"Arquivo não encontrado: gs://{self.bucket_name}/{path}")
+            return FetchResult(None, None, False)
+
+        except Exception as e:
+            logger.error(
+                f"Erro ao carregar JSON={self.bucket_name}, path={path}): {e}",
+                exc_info=True,
+            )
+            return FetchResult(None, None, False)
+
+    def _download_bytes(self, path: str) -> Tuple[bytes, Optional[int]]:
+        """
+        Baixa os bytes do blob passando pelo cache local, se configurado.
+
+        - Path imutável já em cache: nenhum request.
+        - Path em cache: download condicional; 304 reaproveita a cópia local.
+        - Caso contrário: download normal, gravado no cache.
+        """
+        blob = self.bucket.blob(path)
+        if self.cache is None:
+            return blob.download_as_bytes(), blob.generation
+
+        generation = self.cache.latest_generation(self.bucket_name, path)
+        if generation is not None:
+            if is_immutable_path(path, self.immutable_patterns):
+                data = self.cache.get(self.bucket_name, path, generation)
+                if data is not None:
+                    return data, generation
+            try:
+                data = blob.download_as_bytes(if_generation_not_match=generation)
+            except NotModified:
+                data = self.cache.get(self.bucket_name, path, generation)
+                if data is not None:
+                    return data, generation
+                data = blob.download_as_bytes()
+        else:
+            data = blob.download_as_bytes()
+
+        self.cache.put(self.bucket_name, path, blob.generation, data)
+        return data, blob.generation
+
+    @contextmanager
+    def _open_json_gzip_text(self, path: str) -> Iterator[IO[str]]:
+        """Abre o blob como stream de texto JSON (download em ranges + descompressão)."""
+        local_path = None
+        if self.cache is not None and is_immutable_path(path, self.immutable_patterns):
+            generation = self.cache.latest_generation(self.bucket_name, path)
+            if generation is not None:
+                local_path = self.cache.local_path(self.bucket_name, path, generation)
+
+        with ExitStack() as stack:
+            if local_path is not None:
+                raw = stack.enter_context(open(local_path, "rb"))
+            else:
+                blob = self.bucket.blob(path)
+                raw = stack.enter_context(blob.open("rb", chunk_size=self.read_chunk_size))
+            gz = stack.enter_context(codec_for_path(path).open(raw, "rb"))
+            yield stack.enter_context(TextIOWrapper(gz, encoding="utf-8"))
+
+    def _load_selection(
+        self, path: str, select: Union[Sequence[str], Mapping[str, Optional[Sequence[str]]]]
+    ) -> Any:
+        key_paths = list(select)
+        fields = select if isinstance(select, Mapping) else {}
+        seen_arrays: Set[str] = set()
+
+        with self._open_json_gzip_text(path) as text:
+            items = (
+                (key_path, _project(item, fields.get(key_path)))
+                for key_path, item in iter_json_paths(text, key_paths, seen_arrays)
+            )
+            result = _assemble_selection(items, key_paths, seen_arrays)
+
+        if result is None:
+            # Nada casou: mantém o tipo da raiz esperado pela seleção
+            result = [] if all(p.startswith("[") for p in key_paths) else {}
+        return result
+
+    def iter_json_gzip(
+        self, path: str, key_path: str, fields: Optional[Sequence[str]] = None
+    ) -> Iterator[Any]:
+        """
+        Gera, sob demanda, os itens de um JSON.gz que casam com `key_path`.
+
+        O blob é baixado em ranges e descompactado em streaming; apenas o item
+        corrente fica em memória. Diferente de `load_json_gzip`, erros de
+        leitura são propagados, já que parte dos itens pode ter sido consumida.
+
+        Args:
+            path (str): Caminho do arquivo no bucket.
+            key_path (str): Ex. "member[*]", "data.totalBanners[*]" ou "[*]".
+            fields (list, opcional): Campos mantidos em cada item (dicts).
+        """
+        with self._open_json_gzip_text(path) as text:
+            for _, item in iter_json_paths(text, [key_path]):
+                yield _project(item, fields)
+
+    # ----------------------------------------
+    # Parquet (saída colunar opcional)
+    # ----------------------------------------
+    def upload_parquet(self, records: List[Dict[str, Any]], path: str) -> bool:
+        """
+        Grava uma lista de registros planos como Parquet (zstd) no bucket.
+
+        Args:
+            records (list): Registros já achatados (ver `flatten_record`).
+            path (str): Caminho destino dentro do bucket.
+
+        Returns:
+            bool: True se sucesso, False se erro (inclusive sem pyarrow).
+        """
+        if pq is None:
+            logger.error("pyarrow não está instalado; Parquet não gerado.")
+            return False
+        try:
+            buffer = BytesIO()
+            pq.write_table(records_to_table(records), buffer, compression="zstd")
+            buffer.seek(0)
+
+            blob = self.bucket.blob(path)
+            blob.upload_from_file(
+                buffer,
+                content_type="application/vnd.apache.parquet",
+                client=self.client,
+            )
+            logger.info(f"Upload concluído: gs://{self.bucket_name}/{path}")
+            return True
+
+        except Exception as e:
+            logger.error(
+                f"Falha no upload Parquet (bucket={self.bucket_name}, path={path}): {e}",
+                exc_info=True,
+            )
+            return False
+
+    def load_parquet(self, path: str, columns: Optional[Sequence[str]] = None) -> Optional[Any]:
+        """
+        Lê um Parquet do bucket como DataFrame, decodificando só `columns`.
+
+        Returns:
+            pandas.DataFrame | None: Dados carregados, ou None em caso de falha.
+        """
+        if pq is None:
+            logger.error("pyarrow não está instalado; Parquet não pode ser lido.")
+            return None
+        try:
+            data, _ = self._download_bytes(path)
+            table = pq.read_table(pa.BufferReader(data), columns=columns)
+            return table.to_pandas()
+
+        except NotFound:
+            logger.warning(f"Arquivo não encontrado: gs://{self.bucket_name}/{path}")
+            return None
+
+        except Exception as e:
+            logger.error(
+                f"Erro ao carregar Parquet={self.bucket_name}, path={path}): {e}",
+                exc_info=True,
+            )
+            return None
+
+    # ----------------------------------------
+    # Operações em lote (paralelas)
+    # ----------------------------------------
+    def _ensure_connection_pool(self, size: int) -> None:
+        """
+        Amplia o pool HTTP do storage.Client compartilhado para `size`
+        conexões; o padrão do requests (10) serializaria workers excedentes.
+        """
+        if size <= self._pool_size:
+            return
+        http = getattr(self.client, "_http", None)
+        if isinstance(http, requests.Session):
+            adapter = requests.adapters.HTTPAdapter(pool_connections=size, pool_maxsize=size)
+            http.mount("https://", adapter)
+            self._pool_size = size
+
+    def _run_batch(
+        self, keys: Sequence[str], func: Callable[[str], Any], max_workers: int, action: str
+    ) -> BatchResult:
+        max_workers = max(1, min(max_workers, len(keys) or 1))
+        self._ensure_connection_pool(max_workers)
+        batch = BatchResult()
+
+        def timed(key: str) -> Tuple[str, Any, Optional[BaseException], float]:
+            start = time.perf_counter()
+            try:
+                return key, func(key), None, time.perf_counter() - start
+            except Exception as e:
+                return key, None, e, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for key, result, error, duration in executor.map(timed, keys):
+                batch.durations[key] = duration
+                if error is None:
+                    batch.results[key] = result
+                else:
+                    batch.errors[key] = error
+                    logger.error(f"Falha em {action} de gs://{self.bucket_name}/{key}: {error}")
+        batch.elapsed = time.perf_counter() - start
+
+        logger.info(f"{action.capitalize()} em lote: {batch.stats()}")
+        return batch
+
+    def load_many_json_gzip(self, paths: Iterable[str], max_workers: int = 8) -> BatchResult:
+        """
+        Baixa vários JSON.gz em paralelo sobre o mesmo storage.Client.
+
+        Args:
+            paths (list): Caminhos no bucket (duplicados são lidos uma vez).
+            max_workers (int): Máximo de downloads simultâneos.
+
+        Returns:
+            BatchResult: `results[path]` com os dados; objetos ausentes ou com
+            erro ficam em `errors[path]` (NotFound para ausentes).
+        """
+
+        def load(path: str) -> Any:
+            data, _ = self._download_bytes(path)
+            return self._gzip_bytes_to_json(data, codec_for_path(path), self.serializer)
+
+        return self._run_batch(list(dict.fromkeys(paths)), load, max_workers, "download")
+
+    def upload_many_json_gzip(
+        self,
+        items: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]],
+        max_workers: int = 8,
+        stream: bool = False,
+    ) -> BatchResult:
+        """
+        Envia vários JSON.gz em paralelo sobre o mesmo storage.Client.
+
+        Args:
+            items: Mapeamento `path -> dados` (ou pares `(path, dados)`).
+            max_workers (int): Máximo de uploads simultâneos.
+            stream (bool): Usa o upload em streaming para cada item.
+
+        Returns:
+            BatchResult: `results[path] = True` para cada sucesso; falhas em `errors`.
+        """
+        payloads = dict(items.items() if isinstance(items, Mapping) else items)
+
+        def upload(path: str) -> bool:
+            self._upload_json_gzip(payloads[path], path, stream=stream)
+            return True
+
+        return self._run_batch(list(payloads), upload, max_workers, "upload")
+
+
+# ----------------------------------------
+# Cache local em disco (LRU por generation)
+# ----------------------------------------
+
+
+class DiskCache:
+    """
+    Cache LRU em disco para blobs do GCS, endereçado por (bucket, path,
+    generation). Como a generation muda a cada escrita, uma entrada nunca
+    fica obsoleta: no máximo deixa de ser usada e é removida pelo LRU.
+
+    Layout: `objects/<sha256>` guarda os bytes (comprimidos, como no GCS) e
+    `refs/<sha256>` a última generation conhecida de cada path. O mtime dos
+    objetos marca o último acesso, então o LRU sobrevive entre execuções.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024**3):
+        """
+        Args:
+            directory (str): Diretório do cache (criado se não existir).
+            max_bytes (int): Tamanho máximo dos objetos; acima disso os menos
+                usados recentemente são removidos.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._objects_dir = os.path.join(directory, "objects")
+        self._refs_dir = os.path.join(directory, "refs")
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._refs_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = sum(
+            os.path.getsize(os.path.join(self._objects_dir, name))
+            for name in os.listdir(self._objects_dir)
+        )
+        self.hits = 0
+        self.misses = 0
+        self.bytes_from_cache = 0
+        self.bytes_stored = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["DiskCache"]:
+        """Cria o cache a partir de GCS_CACHE_DIR / GCS_CACHE_MAX_MB, se definidos."""
+        directory = os.getenv("GCS_CACHE_DIR")
+        if not directory:
+            return None
+        max_mb = os.getenv("GCS_CACHE_MAX_MB")
+        try:
+            max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else 1024**3
+        except ValueError:
+            logger.warning(f"GCS_CACHE_MAX_MB inválido ({max_mb}), usando 1024.")
+            max_bytes = 1024**3
+        return cls(directory, max_bytes=max_bytes)
+
+    @staticmethod
+    def _digest(*parts: Any) -> str:
+        return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _object_path(self, bucket: str, path: str, generation: int) -> str:
+        return os.path.join(self._objects_dir, self._digest(bucket, path, generation))
+
+    def _ref_path(self, bucket: str, path: str) -> str:
+        return os.path.join(self._refs_dir, self._digest(bucket, path))
+
+    def latest_generation(self, bucket: str, path: str) -> Optional[int]:
+        """Última generation vista para o path, sem acessar a rede."""
+        try:
+            with open(self._ref_path(bucket, path)) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def local_path(self, bucket: str, path: str, generation: int) -> Optional[str]:
+        """Caminho local do objeto em cache (marcando o acesso), ou None."""
+        object_path = self._object_path(bucket, path, generation)
+        try:
+            os.utime(object_path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_from_cache += os.path.getsize(object_path)
+        return object_path
+
+    def get(self, bucket: str, path: str, generation: int) -> Optional[bytes]:
+        """Bytes do objeto na generation pedida, ou None em caso de miss."""
+        object_path = self.local_path(bucket, path, generation)
+        if object_path is None:
+            return None
+        try:
+            with open(object_path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, bucket: str, path: str, generation: Optional[int], data: bytes) -> None:
+        """Grava o objeto (escrita atômica) e atualiza a referência do path."""
+        if generation is None or len(data) > self.max_bytes:
+            return
+        object_path = self._object_path(bucket, path, generation)
+        tmp_path = _write_temp(object_path, data)
+        with self._lock:
+            # Regravar a mesma chave substitui o arquivo: só a diferença conta
+            try:
+                replaced = os.path.getsize(object_path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, object_path)
+            self._size += len(data) - replaced
+            self.bytes_stored += len(data)
+        _atomic_write(self._ref_path(bucket, path), str(generation).encode("ascii"))
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            if self._size <= self.max_bytes:
+                return
+            entries = []
+            for name in os.listdir(self._objects_dir):
+                full = os.path.join(self._objects_dir, name)
+                try:
+                    stat = os.stat(full)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, full))
+            entries.sort()
+            self._size = sum(size for _, size, _ in entries)
+            for _, size, full in entries:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(full)
+                except OSError:
+                    continue
+                self._size -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de hit/miss/bytes desde a criação do cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_from_cache": self.bytes_from_cache,
+                "bytes_stored": self.bytes_stored,
+                "evictions": self.evictions,
+                "size_bytes": self._size,
+            }
+
+
+def _write_temp(path: str, data: bytes) -> str:
+    """Grava `data` num temporário ao lado de `path` e devolve o caminho dele."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    return tmp_path
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.replace(_write_temp(path, data), path)
+
+
+def is_immutable_path(path: str, patterns: Sequence[str] = DEFAULT_IMMUTABLE_PATTERNS) -> bool:
+    """
+    Indica se o path é uma partição fechada: casa com um dos padrões e a
+    data da partição é anterior a hoje (UTC). A partição do dia corrente
+    ainda pode ser regravada por um rerun, então não conta como imutável.
+    """
+    for pattern in patterns:
+        match = re.match(pattern, path)
+        if not match:
+            continue
+        try:
+            day = date(int(match.group("y")), int(match.group("m")), int(match.group("d")))
+        except (IndexError, ValueError):
+            return True
+        return day < datetime.now(timezone.utc).date()
+    return False
+
+
+# ----------------------------------------
+# Backends de storage (GCS, disco local, memória)
+# ----------------------------------------
+class StorageBackend(Protocol):
+    """
+    Contrato de cliente usado pelo GCSClient: o subconjunto de
+    `storage.Client` que ele consome.
+
+    `bucket(nome)` devolve um objeto com `blob(path, chunk_size=None)`,
+    `get_blob(path)` e `list_blobs(prefix=None)`; cada blob expõe
+    `generation`, `size`, `metadata`, `exists()`, `reload()`, `patch()`,
+    `download_as_bytes(if_generation_not_match=)` (NotFound/NotModified como
+    no GCS), `upload_from_file(if_generation_match=)` (PreconditionFailed),
+    `upload_from_string()`, `open("rb"|"wb")` e `delete()`; o bucket expõe
+    ainda `copy_blob(blob, bucket, novo_nome)` (cópia no servidor).
+    """
+
+    def bucket(self, bucket_name: str) -> Any: ...
+
+
+_GENERATION_LOCK = threading.Lock()
+_last_generation = 0
+
+
+def _next_generation() -> int:
+    """Generation estritamente crescente no processo (ns desde a epoch)."""
+    global _last_generation
+    with _GENERATION_LOCK:
+        _last_generation = max(_last_generation + 1, time.time_ns())
+        return _last_generation
+
+
+def _check_generation_match(
+    name: str, stat: Optional[Tuple[int, int]], if_generation_match: Optional[int]
+) -> None:
+    """Aplica `if_generation_match` como o GCS (0 = o objeto não pode existir)."""
+    if if_generation_match is None:
+        return
+    current = stat[0] if stat else 0
+    if current != if_generation_match:
+        raise PreconditionFailed(
+            f"Generation de {name} é {current}, esperada {if_generation_match}"
+        )
+
+
+class _CommitWriter:
+    """File-like de escrita que só publica o objeto se fechado sem erro."""
+
+    def __init__(self, fileobj: IO[bytes], commit: Callable[[], None], abort: Callable[[], None]):
+        self._fileobj = fileobj
+        self._commit = commit
+        self._abort = abort
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        return self._fileobj.write(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._commit()
+
+    def __enter__(self) -> "_CommitWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.closed = True
+            self._abort()
+
+
+class LocalObjectStore:
+    """
+    Objetos como arquivos em `<root>/<path>`. A generation é o mtime em ns,
+    gravado explicitamente a cada escrita; escritas são atômicas (rename).
+    Metadados customizados ficam em `<root>/.metadata/<path>.json`.
+    """
+
+    METADATA_DIR = ".metadata"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+
+    def _file(self, name: str) -> str:
+        file_path = os.path.abspath(os.path.join(self.root, name))
+        if not file_path.startswith(self.root + os.sep):
+            raise ValueError(f"Path fora do diretório do bucket: {name}")
+        return file_path
+
+    def stat(self, name: str) -> Optional[Tuple[int, int]]:
+        """(generation, tamanho) do objeto, ou None se ausente."""
+        try:
+            st = os.stat(self._file(name))
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _metadata_file(self, name: str) -> str:
+        return self._file(f"{self.METADATA_DIR}/{name}.json")
+
+    def get_metadata(self, name: str) -> Dict[str, str]:
+        try:
+            with open(self._metadata_file(name), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return {}
+
+    def set_metadata(self, name: str, metadata: Optional[Mapping[str, str]]) -> None:
+        if self.stat(name) is None:
+            raise NotFound(f"Objeto não encontrado: {name}")
+        metadata_path = self._metadata_file(name)
+        if not metadata:
+            if os.path.exists(metadata_path):
+                os.remove(metadata_path)
+            return
+        os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+        _atomic_write(metadata_path, json.dumps(dict(metadata)).encode("utf-8"))
+
+    def open_read(self, name: str) -> IO[bytes]:
+        try:
+            return open(self._file(name), "rb")
+        except FileNotFoundError:
+            raise NotFound(f"Objeto não encontrado: {name}")
+
+    def copy(self, source: str, destination: str) -> Tuple[int, int]:
+        """Cópia local de bytes e metadados; devolve (generation, tamanho) do destino."""
+        result: List[Tuple[int, int]] = []
+        with self.open_read(source) as f:
+            with self.open_write(destination, lambda *stat: result.append(stat)) as writer:
+                shutil.copyfileobj(f, writer)
+        self.set_metadata(destination, self.get_metadata(source))
+        return result[0]
+
+    def open_write(
+        self,
+        name: str,
+        on_commit: Callable[[int, int], None],
+        if_generation_match: Optional[int] = None,
+        metadata: Optional[Mapping[str, str]] = None,
+    ) -> _CommitWriter:
+        file_path = self._file(name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp = open(tmp_path, "wb")
+
+        def commit() -> None:
+            tmp.close()
+            generation = _next_generation()
+            os.utime(tmp_path, ns=(generation, generation))
+            # A precondição só é garantida entre threads do mesmo processo
+            with self._lock:
+                try:
+                    _check_generation_match(name, self.stat(name), if_generation_match)
+                except PreconditionFailed:
+                    os.remove(tmp_path)
+                    raise
+                os.replace(tmp_path, file_path)
+                self.set_metadata(name, metadata)
+            on_commit(generation, os.stat(file_path).st_size)
+
+        def abort() -> None:
+            tmp.close()
+            os.remove(tmp_path)
+
+        return _CommitWriter(tmp, commit, abort)
+
+    def delete(self, name: str) -> None:
+        try:
+            os.remove(self._file(name))
+        except FileNotFoundError:
+            raise NotFound(f"Objeto não encontrado: {name}")
+        try:
+            os.remove(self._metadata_file(name))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str = "") -> List[str]:
+        names = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root and self.METADATA_DIR in dirnames:
+                dirnames.remove(self.METADATA_DIR)
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                name = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                name = name.replace(os.sep, "/")
+                if name.startswith(prefix):
+                    names.append(name)
+        return sorted(names)
+
+
+class MemoryObjectStore:
+    """Objetos em um dict `path -> (bytes, generation)`; útil para testes e benchmarks."""
+
+    def __init__(self):
+        self.objects: Dict[str, Tuple[bytes, int]] = {}
+        self.metadata: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def get_metadata(self, name: str) -> Dict[str, str]:
+        return dict(self.metadata.get(name) or {})
+
+    def set_metadata(self, name: str, metadata: Optional[Mapping[str, str]]) -> None:
+        if name not in self.objects:
+            raise NotFound(f"Objeto não encontrado: {name}")
+        self.metadata[name] = dict(metadata or {})
+
+    def copy(self, source: str, destination: str) -> Tuple[int, int]:
+        """Cópia de bytes e metadados; devolve (generation, tamanho) do destino."""
+        with self._lock:
+            entry = self.objects.get(source)
+            if entry is None:
+                raise NotFound(f"Objeto não encontrado: {source}")
+            generation = _next_generation()
+            self.objects[destination] = (entry[0], generation)
+            self.metadata[destination] = dict(self.metadata.get(source) or {})
+        return generation, len(entry[0])
+
+    def stat(self, name: str) -> Optional[Tuple[int, int]]:
+        """(generation, tamanho) do objeto, ou None se ausente."""
+        entry = self.objects.get(name)
+        return (entry[1], len(entry[0])) if entry else None
+
+    def open_read(self, name: str) -> IO[bytes]:
+        entry = self.objects.get(name)
+        if entry is None:
+            raise NotFound(f"Objeto não encontrado: {name}")
+        return BytesIO(entry[0])
+
+    def open_write(
+        self,
+        name: str,
+        on_commit: Callable[[int, int], None],
+        if_generation_match: Optional[int] = None,
+        metadata: Optional[Mapping[str, str]] = None,
+    ) -> _CommitWriter:
+        buffer = BytesIO()
+
+        def commit() -> None:
+            data = buffer.getvalue()
+            with self._lock:
+                _check_generation_match(name, self.stat(name), if_generation_match)
+                generation = _next_generation()
+                self.objects[name] = (data, generation)
+                self.metadata[name] = dict(metadata or {})
+            on_commit(generation, len(data))
+
+        return _CommitWriter(buffer, commit, lambda: None)
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self.metadata.pop(name, None)
+            if self.objects.pop(name, None) is None:
+                raise NotFound(f"Objeto não encontrado: {name}")
+
+    def list(self, prefix: str = "") -> List[str]:
+        return sorted(name for name in list(self.objects) if name.startswith(prefix))
+
+
+class StoreBlob:
+    """Blob compatível com `storage.Blob` sobre um object store local/memória."""
+
+    def __init__(self, store: Any, name: str, chunk_size: Optional[int] = None):
+        self._store = store
+        self.name = name
+        self.chunk_size = chunk_size
+        self.generation: Optional[int] = None
+        self.size: Optional[int] = None
+        self.metadata: Optional[Dict[str, str]] = None
+
+    def _on_commit(self, generation: int, size: int) -> None:
+        self.generation = generation
+        self.size = size
+
+    def exists(self, client: Any = None) -> bool:
+        return self._store.stat(self.name) is not None
+
+    def reload(self, client: Any = None) -> None:
+        stat = self._store.stat(self.name)
+        if stat is None:
+            raise NotFound(f"Objeto não encontrado: {self.name}")
+        self.generation, self.size = stat
+        self.metadata = self._store.get_metadata(self.name) or None
+
+    def patch(self, client: Any = None, **kwargs: Any) -> None:
+        """Grava `metadata` sem alterar a generation; chaves com None são removidas."""
+        metadata = {k: v for k, v in (self.metadata or {}).items() if v is not None}
+        self._store.set_metadata(self.name, metadata)
+        self.metadata = metadata or None
+
+    def download_as_bytes(
+        self, client: Any = None, if_generation_not_match: Optional[int] = None, **kwargs: Any
+    ) -> bytes:
+        self.reload()
+        if if_generation_not_match is not None and self.generation == if_generation_not_match:
+            raise NotModified(f"Objeto inalterado: {self.name}")
+        with self._store.open_read(self.name) as f:
+            return f.read()
+
+    def upload_from_file(
+        self,
+        file_obj: IO[bytes],
+        client: Any = None,
+        if_generation_match: Optional[int] = None,
+        **kwargs: Any,
+    ) -> None:
+        with self._store.open_write(
+            self.name, self._on_commit, if_generation_match, self.metadata
+        ) as writer:
+            while True:
+                chunk = file_obj.read(1024 * 1024)
+                if not chunk:
+                    break
+                writer.write(chunk)
+
+    def upload_from_string(self, data: Union[bytes, str], client: Any = None, **kwargs: Any):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.upload_from_file(BytesIO(data), **kwargs)
+
+    def open(self, mode: str = "rb", chunk_size: Optional[int] = None, **kwargs: Any) -> IO[bytes]:
+        if mode == "rb":
+            self.reload()
+            return self._store.open_read(self.name)
+        if mode == "wb":
+            return self._store.open_write(
+                self.name, self._on_commit, kwargs.get("if_generation_match"), self.metadata
+            )
+        raise ValueError(f"Modo não suportado: {mode}")
+
+    def delete(self, client: Any = None) -> None:
+        self._store.delete(self.name)
+
+
+class StoreBucket:
+    """Bucket compatível com `storage.Bucket` sobre um object store."""
+
+    def __init__(self, store: Any, name: str):
+        self._store = store
+        self.name = name
+
+    def blob(self, blob_name: str, chunk_size: Optional[int] = None, **kwargs: Any) -> StoreBlob:
+        return StoreBlob(self._store, blob_name, chunk_size)
+
+    def get_blob(self, blob_name: str, **kwargs: Any) -> Optional[StoreBlob]:
+        blob = self.blob(blob_name)
+        stat = self._store.stat(blob_name)
+        if stat is None:
+            return None
+        blob.generation, blob.size = stat
+        blob.metadata = self._store.get_metadata(blob_name) or None
+        return blob
+
+    def copy_blob(
+        self,
+        blob: StoreBlob,
+        destination_bucket: "StoreBucket",
+        new_name: Optional[str] = None,
+        **kwargs: Any,
+    ) -> StoreBlob:
+        new_name = new_name or blob.name
+        if destination_bucket._store is self._store:
+            self._store.copy(blob.name, new_name)
+        else:
+            with self._store.open_read(blob.name) as f:
+                destination_bucket.blob(new_name).upload_from_file(f)
+            destination_bucket._store.set_metadata(new_name, self._store.get_metadata(blob.name))
+        copied = destination_bucket.blob(new_name)
+        copied.reload()
+        return copied
+
+    def list_blobs(self, prefix: Optional[str] = None, **kwargs: Any) -> Iterator[StoreBlob]:
+        for name in self._store.list(prefix or ""):
+            blob = self.get_blob(name)
+            if blob is not None:
+                yield blob
+
+
+class LocalStorageClient:
+    """Cliente de storage em disco: o bucket `b` vive em `<root>/b/`."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def bucket(self, bucket_name: str) -> StoreBucket:
+        return StoreBucket(LocalObjectStore(os.path.join(self.root, bucket_name)), bucket_name)
+
+
+class MemoryStorageClient:
+    """Cliente de storage em memória; buckets de mesmo nome compartilham objetos."""
+
+    def __init__(self):
+        self._stores: Dict[str, MemoryObjectStore] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, bucket_name: str) -> StoreBucket:
+        with self._lock:
+            store = self._stores.setdefault(bucket_name, MemoryObjectStore())
+        return StoreBucket(store, bucket_name)
+
+
+STORAGE_BACKENDS = ("gcs", "local", "memory")
+DEFAULT_LOCAL_STORAGE_DIR = ".storage"
+_MEMORY_CLIENT = MemoryStorageClient()
+
+
+def storage_client_from_env() -> StorageBackend:
+    """
+    Cria o cliente de storage a partir de STORAGE_BACKEND:
+
+    - "gcs" (padrão): `storage.Client()`.
+    - "local": arquivos em STORAGE_LOCAL_DIR (padrão ".storage").
+    - "memory": objetos em memória, compartilhados por todo o processo.
+    """
+    backend = (os.getenv("STORAGE_BACKEND") or "gcs").lower()
+    if backend == "gcs":
+        return storage.Client()
+    if backend == "local":
+        root = os.getenv("STORAGE_LOCAL_DIR") or DEFAULT_LOCAL_STORAGE_DIR
+        logger.info(f"Storage local em {os.path.abspath(root)}")
+        return LocalStorageClient(root)
+    if backend == "memory":
+        return _MEMORY_CLIENT
+    raise ValueError(f"STORAGE_BACKEND inválido: {backend} (use {', '.join(STORAGE_BACKENDS)})")
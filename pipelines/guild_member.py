@@ -2,6 +2,7 @@ import subprocess
 import logging
 import time
 import os
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -30,7 +31,7 @@ SCRIPTS = [
 # ----------------------------
 # Função para executar cada script
 # ----------------------------
-def run_script(script_path: str):
+def run_script(script_path: str, args=()):
     script = Path(script_path)
     if not script.exists():
         logger.error(f"Script não encontrado: {script_path}")
@@ -40,7 +41,9 @@ def run_script(script_path: str):
 
     start = time.time()
 
-    result = subprocess.run([os.getenv("BIN_PATH"), str(script)], capture_output=True, text=True)
+    result = subprocess.run(
+        [os.getenv("BIN_PATH"), str(script), *args], capture_output=True, text=True
+    )
 
     duration = round(time.time() - start, 2)
 
@@ -64,8 +67,11 @@ def run_script(script_path: str):
 # ----------------------------
 def main():
     logger.info("\n================ DAILY PIPELINE ================\n")
-    for script in SCRIPTS:
-        if not run_script(script):
+    # A silver lê a partição do dia em que a coleta começou, mesmo que
+    # termine depois da meia-noite UTC
+    day = datetime.now(timezone.utc).strftime("%Y%m%d")
+    for index, script in enumerate(SCRIPTS):
+        if not run_script(script, ("--date", day) if index == 1 else ()):
             logger.critical("PIPELINE INTERROMPIDA devido ao erro acima.\n")
             exit(1)
 
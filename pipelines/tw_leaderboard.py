@@ -1,4 +1,5 @@
 import subprocess
+import sys
 import logging
 import time
 import os
@@ -31,7 +32,7 @@ SCRIPTS = [
 # ----------------------------
 # Função para executar cada script
 # ----------------------------
-def run_script(script_path: str):
+def run_script(script_path: str, args=()):
     script = Path(script_path)
     if not script.exists():
         logger.error(f"Script não encontrado: {script_path}")
@@ -41,7 +42,9 @@ def run_script(script_path: str):
 
     start = time.time()
 
-    result = subprocess.run([os.getenv("BIN_PATH"), str(script)], capture_output=True, text=True)
+    result = subprocess.run(
+        [os.getenv("BIN_PATH"), str(script), *args], capture_output=True, text=True
+    )
 
     duration = round(time.time() - start, 2)
 
@@ -63,10 +66,16 @@ def run_script(script_path: str):
 # ----------------------------
 # Execução principal
 # ----------------------------
-def main():
+def main(bronze_args=()):
+    """
+    Args:
+        bronze_args: Argumentos repassados às etapas bronze e silver (ex.
+            --instance-id vindo do cron_events; --force só é usado pelo
+            bronze), para que a silver processe a mesma instância.
+    """
     logger.info("\n================ TW PIPELINE ================\n")
-    for script in SCRIPTS:
-        if not run_script(script):
+    for index, script in enumerate(SCRIPTS):
+        if not run_script(script, bronze_args if index < 2 else ()):
             logger.critical("PIPELINE INTERROMPIDA devido ao erro acima.\n")
             exit(1)
 
@@ -74,4 +83,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -1,3 +1,4 @@
+import argparse
 import os
 import re
 import logging
@@ -20,6 +21,10 @@ logger = logging.getLogger("guild_daily_to_bq")
 
 load_dotenv()
 
+# Únicos campos de cada membro usados por este job; o resto do guild.json.gz
+# é descartado durante a leitura em streaming.
+MEMBER_FIELDS = ["playerId", "playerName", "guildJoinTime", "memberLevel", "memberContribution"]
+
 
 # ----------------------------------------------------
 # Função utilitária para carregar variáveis de ambiente
@@ -32,7 +37,12 @@ def load_env_var(var_name: str) -> str:
     return value
 
 
-def main():
+def main(day=None):
+    """
+    Args:
+        day (str): Partição bronze a processar (YYYYMMDD). O pipeline passa
+            a data em que iniciou a coleta; se omitida, a data UTC atual.
+    """
 
     # ----------------------------------------------------
     # Carregar variáveis de ambiente
@@ -60,7 +70,20 @@ def main():
     # Construir caminho do arquivo
     # ----------------------------------------------------
     now = datetime.now(timezone.utc)
-    file_path = f"{GUILD_ID}/daily/{now.year}/{now.month:02}/{now.day:02}/guild.json.gz"
+    try:
+        partition = datetime.strptime(day, "%Y%m%d").replace(tzinfo=timezone.utc) if day else now
+    except ValueError:
+        logger.critical(f"Data inválida (use YYYYMMDD): {day}")
+        raise SystemExit(1)
+    file_path = (
+        f"{GUILD_ID}/daily/{partition.year}/{partition.month:02}/{partition.day:02}/guild.json.gz"
+    )
+
+    # O manifest do dia aponta o objeto exato; sem ele, usa o path padrão
+    entry = utils.BronzeManifest(gcs, GUILD_ID, partition).resolve("guild")
+    if entry:
+        file_path = entry["path"]
+        logger.info(f"Guild resolvida pelo manifest (generation {entry.get('generation')}).")
 
     logger.info(f"Carregando arquivo: {file_path}")
 
@@ -68,7 +91,7 @@ def main():
     # Carregar dados da guild do GCS
     # ----------------------------------------------------
     try:
-        guild_raw = gcs.load_json_gzip(file_path)
+        guild_raw = gcs.load_json_gzip(file_path, select={"member[*]": MEMBER_FIELDS})
         if guild_raw is None:
             raise ValueError("Arquivo retornou None.")
         logger.info("Dados da guild carregados com sucesso.")
@@ -200,5 +223,15 @@ def main():
 # ----------------------------------------------------
 # Execução
 # ----------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Guild da camada bronze para a silver.")
+    parser.add_argument(
+        "--date",
+        help="Partição bronze a processar, YYYYMMDD (padrão: data UTC atual).",
+    )
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
 if __name__ == "__main__":
-    main()
+    main(day=parse_args().date)
@@ -0,0 +1,285 @@
+import argparse
+import os
+import re
+import logging
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+import numpy as np
+import pandas as pd
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+import utils
+
+
+# ----------------------------------------------------
+# Configuração de logging
+# ----------------------------------------------------
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+logger = logging.getLogger("tbleaderboard_to_bq")
+
+
+load_dotenv()
+
+# Listas de zonas do territoryBattleStatus e o tipo gravado na tabela
+ZONE_KINDS = {
+    "conflictZoneStatus": "conflict",
+    "strikeZoneStatus": "strike",
+    "reconZoneStatus": "recon",
+    "covertZoneStatus": "covert",
+}
+
+# Partes do tbleaderboard.json.gz lidas por este job (carregadas em streaming)
+TB_SELECT = {
+    "instanceId": None,
+    "currentStat[*]": ["mapStatId", "playerStat"],
+    **{f"{key}[*]": ["zoneStatus", "playersParticipated"] for key in ZONE_KINDS},
+}
+
+ZONE_COLUMNS = [
+    "zone_kind",
+    "zone_id",
+    "phase",
+    "zone_state",
+    "command_state",
+    "score",
+    "players_participated",
+]
+MEMBER_COLUMNS = ["player_id", "map_stat_id", "stat", "round", "score"]
+
+# "power_round_3" -> ("power", 3); "summary" -> ("summary", <NA>)
+_MAP_STAT_PATTERN = re.compile(r"^(.*?)(?:_round_(\d+))?$")
+_PHASE_PATTERN = re.compile(r"phase(\d+)")
+
+
+# ----------------------------------------------------
+# Função utilitária para carregar variáveis de ambiente
+# ----------------------------------------------------
+def load_env_var(var_name: str) -> str:
+    value = os.getenv(var_name)
+    if not value:
+        logger.error(f"Variável de ambiente ausente: {var_name}")
+        raise ValueError(f"A variável {var_name} não está definida no .env")
+    return value
+
+
+# ----------------------------------------------------
+# Transformações (colunares: cada coluna é montada inteira de uma vez)
+# ----------------------------------------------------
+def tb_date_from(instance_id: str) -> datetime:
+    """Data do TB, extraída do timestamp (ms) embutido no instanceId."""
+    match = re.search(r"O(\d+)", instance_id or "")
+    if not match:
+        raise ValueError(f"instanceId não tem o formato esperado: {instance_id}")
+    return datetime.fromtimestamp(int(match.group(1)) // 1000, tz=timezone.utc)
+
+
+def _int_column(values) -> np.ndarray:
+    """Inteiros a partir dos valores da API (strings); ausentes ou inválidos viram 0."""
+    numeric = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+    return numeric.fillna(0).to_numpy(dtype="int64")
+
+
+def zone_table(status: dict) -> pd.DataFrame:
+    """Uma linha por zona (conflict/strike/recon/covert) de cada fase."""
+    kinds, zones = [], []
+    for key, kind in ZONE_KINDS.items():
+        items = status.get(key) or []
+        kinds.append(np.full(len(items), kind, dtype=object))
+        zones.extend(items)
+
+    zone_status = [z.get("zoneStatus") or {} for z in zones]
+    zone_ids = [z.get("zoneId") for z in zone_status]
+    phases = [_PHASE_PATTERN.search(zone_id or "") for zone_id in zone_ids]
+    return pd.DataFrame(
+        {
+            "zone_kind": np.concatenate(kinds),
+            "zone_id": zone_ids,
+            "phase": pd.array([int(m.group(1)) if m else None for m in phases], dtype="Int64"),
+            "zone_state": [z.get("zoneState") for z in zone_status],
+            "command_state": [z.get("commandState") for z in zone_status],
+            "score": _int_column([z.get("score") for z in zone_status]),
+            "players_participated": _int_column([z.get("playersParticipated") for z in zones]),
+        },
+        columns=ZONE_COLUMNS,
+    )
+
+
+def member_stats_table(status: dict) -> pd.DataFrame:
+    """
+    Formato longo: uma linha por membro e estatística do mapa, com o tipo
+    da estatística e a fase (round) separados do mapStatId.
+    """
+    stats = status.get("currentStat") or []
+    player_stats = [s.get("playerStat") or [] for s in stats]
+    rows = [row for block in player_stats for row in block]
+    # Índice do bloco de cada linha: o mapStatId é parseado uma vez por bloco
+    block = np.repeat(np.arange(len(stats)), [len(p) for p in player_stats])
+
+    map_stat_ids = np.array([s.get("mapStatId") or "" for s in stats], dtype=object)
+    parsed = [_MAP_STAT_PATTERN.match(m).groups() for m in map_stat_ids]
+    names = np.array([name for name, _ in parsed], dtype=object)
+    rounds = pd.array([int(r) if r else None for _, r in parsed], dtype="Int64")
+
+    return pd.DataFrame(
+        {
+            "player_id": pd.Series([row.get("memberId") for row in rows], dtype=object),
+            "map_stat_id": map_stat_ids[block],
+            "stat": names[block],
+            "round": rounds[block],
+            "score": _int_column([row.get("score") for row in rows]),
+        },
+        columns=MEMBER_COLUMNS,
+    )
+
+
+def resolve_tb_file(gcs, guild_id: str, instance_id=None):
+    """
+    Objeto bronze do TB a processar: o da instância informada ou o último
+    registrado pelo bronze no `InstanceRegistry`.
+
+    Returns:
+        tuple: (path, instance_key) ou None se nada foi registrado.
+    """
+    return utils.InstanceRegistry(gcs, guild_id).resolve("tbleaderboard", instance_id)
+
+
+def delete_instance_rows(client, table_id: str, instance: str) -> None:
+    """
+    Remove as linhas já carregadas da instância, para que reprocessar um TB
+    (ex. bronze pulou a instância já registrada) não duplique dados.
+    """
+    try:
+        client.get_table(table_id)
+    except NotFound:
+        return
+    job = client.query(
+        f"DELETE FROM `{table_id}` WHERE tb_instance_id = @instance",
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("instance", "STRING", instance)]
+        ),
+    )
+    job.result()
+    if job.num_dml_affected_rows:
+        logger.info(f"{job.num_dml_affected_rows} linhas anteriores de {instance} removidas.")
+
+
+def main(instance_id=None):
+    """
+    Args:
+        instance_id (str): Instância do TB a processar; se omitida, a última
+            gravada pelo bronze.
+    """
+
+    # ----------------------------------------------------
+    # Carregar variáveis de ambiente
+    # ----------------------------------------------------
+    try:
+        GCS_BUCKET_NAME = load_env_var("GCS_BUCKET_NAME")
+        GUILD_ID = load_env_var("GUILD_ID")
+        BQ_PROJECT_ID = load_env_var("BQ_PROJECT_ID")
+        BQ_DATASET = "silver"
+    except ValueError as e:
+        logger.critical(f"Erro ao carregar variáveis de ambiente: {e}")
+        raise SystemExit(1)
+
+    # ----------------------------------------------------
+    # Inicializar cliente GCS
+    # ----------------------------------------------------
+    try:
+        gcs = utils.GCSClient(GCS_BUCKET_NAME)
+        logger.info("Cliente GCS inicializado.")
+    except Exception as e:
+        logger.critical(f"Erro ao inicializar GCSClient: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    # ----------------------------------------------------
+    # Localizar e carregar o arquivo TB do GCS
+    # ----------------------------------------------------
+    try:
+        resolved = resolve_tb_file(gcs, GUILD_ID, instance_id)
+        if resolved is None:
+            raise ValueError(f"Nenhum TB registrado para a instância {instance_id or '(última)'}.")
+        file_path, instance = resolved
+        logger.info(f"Carregando arquivo: {file_path} (instância {instance})")
+
+        status = gcs.load_json_gzip(file_path, select=TB_SELECT)
+        if not isinstance(status, dict):
+            raise ValueError("Arquivo retornou None.")
+        logger.info("Arquivo TB leaderboard carregado com sucesso.")
+    except Exception as e:
+        logger.critical(f"Falha ao carregar arquivo TB: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    # ----------------------------------------------------
+    # Achatar zonas e estatísticas por membro
+    # ----------------------------------------------------
+    try:
+        tb_date = tb_date_from(status.get("instanceId"))
+        logger.info(f"TB identificado com data UTC: {tb_date.isoformat()}")
+
+        tables = {
+            "tb_zone_status": zone_table(status),
+            "tb_member_stats": member_stats_table(status),
+        }
+        for df in tables.values():
+            df.insert(0, "tb_instance_id", instance)
+            df["tb_date"] = tb_date
+        logger.info(
+            "DataFrames criados: "
+            + ", ".join(f"{name} ({len(df)} linhas)" for name, df in tables.items())
+        )
+    except Exception as e:
+        logger.critical(f"Erro ao transformar dados do TB: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    # ----------------------------------------------------
+    # Inicializar BigQuery Client
+    # ----------------------------------------------------
+    try:
+        client = bigquery.Client()
+        logger.info("Cliente BigQuery inicializado.")
+    except Exception as e:
+        logger.critical(f"Erro ao inicializar BigQuery: {e}", exc_info=True)
+        raise SystemExit(1)
+
+    # ----------------------------------------------------
+    # Gravar dados no BigQuery (substituindo as linhas da instância)
+    # ----------------------------------------------------
+    for table_name, df in tables.items():
+        table_id = f"{BQ_PROJECT_ID}.{BQ_DATASET}.{table_name}"
+        try:
+            delete_instance_rows(client, table_id, instance)
+            job = client.load_table_from_dataframe(
+                df,
+                table_id,
+                job_config=bigquery.LoadJobConfig(write_disposition="WRITE_APPEND"),
+            )
+            job.result()
+            logger.info(f"Dados gravados com sucesso no BigQuery: {table_id}")
+        except Exception as e:
+            logger.error(f"Erro ao gravar dados no BigQuery ({table_id}): {e}", exc_info=True)
+            raise SystemExit(1)
+
+    logger.info("Execução concluída com sucesso.")
+
+
+# ----------------------------------------------------
+# Execução
+# ----------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Leaderboard de TB da camada bronze para a silver."
+    )
+    parser.add_argument(
+        "--instance-id",
+        help="Instância do TB a processar (padrão: a última gravada pelo bronze).",
+    )
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+if __name__ == "__main__":
+    main(instance_id=parse_args().instance_id)
@@ -1,3 +1,4 @@
+import argparse
 import os
 import re
 import logging
@@ -20,6 +21,15 @@ logger = logging.getLogger("twleaderboard_to_bq")
 
 load_dotenv()
 
+# Partes do twleaderboard.json.gz lidas por este job (carregadas em streaming)
+TW_SELECT = {
+    "territoryMapId": None,
+    "data.totalBanners[*]": ["memberId", "banners"],
+    "data.attackBanners[*]": ["memberId", "banners"],
+    "data.defenseBanners[*]": ["memberId", "banners"],
+    "data.rogueActions[*]": ["memberId", "rogueActions"],
+}
+
 
 # ----------------------------------------------------
 # Função utilitária para carregar variáveis de ambiente
@@ -32,7 +42,42 @@ def load_env_var(var_name: str) -> str:
     return value
 
 
-def main():
+def resolve_tw_file(gcs, guild_id: str, instance_id=None, day=None):
+    """
+    Objeto bronze da TW a processar: o da instância informada ou o último
+    registrado pelo bronze no `InstanceRegistry`.
+
+    Sem registro (TWs gravadas antes do registro existir), usa a pasta da
+    data `day` (YYYYMMDD; padrão: ontem): o manifest do dia aponta o objeto
+    exato e, sem ele, vale o path padrão.
+
+    Returns:
+        tuple: (path, instance_key) ou None se a instância informada não foi
+        registrada e nenhuma data foi dada. Pela data, instance_key é None.
+    """
+    resolved = utils.InstanceRegistry(gcs, guild_id).resolve("twleaderboard", instance_id)
+    if resolved is not None:
+        return resolved
+    if instance_id and not day:
+        return None
+
+    day = day or (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y%m%d")
+    entry = utils.BronzeManifest(gcs, guild_id, day).resolve("twleaderboard")
+    if entry:
+        logger.info(f"TW sem registro; resolvida pelo manifest de {day}.")
+        return entry["path"], None
+    logger.info(f"TW sem registro; usando o path padrão de {day}.")
+    return f"{guild_id}/events/tw/{day}/twleaderboard.json.gz", None
+
+
+def main(instance_id=None, day=None):
+    """
+    Args:
+        instance_id (str): Instância da TW a processar; se omitida, a última
+            gravada pelo bronze.
+        day (str): Data (YYYYMMDD) da pasta usada quando a TW não está no
+            registro de instâncias (ver `resolve_tw_file`).
+    """
 
     # ----------------------------------------------------
     # Carregar variáveis de ambiente
@@ -57,19 +102,16 @@ def main():
         raise SystemExit(1)
 
     # ----------------------------------------------------
-    # Construir caminho do arquivo TW leaderboards
-    # ----------------------------------------------------
-    now = datetime.now(timezone.utc)
-    yesterday = (now - timedelta(days=1)).strftime("%Y%m%d")
-
-    file_path = f"{GUILD_ID}/events/tw/{yesterday}/twleaderboard.json.gz"
-    logger.info(f"Carregando arquivo: {file_path}")
-
-    # ----------------------------------------------------
-    # Carregar arquivo TW do GCS
+    # Localizar e carregar o arquivo TW do GCS
     # ----------------------------------------------------
     try:
-        tw_l_raw = gcs.load_json_gzip(file_path)
+        resolved = resolve_tw_file(gcs, GUILD_ID, instance_id, day)
+        if resolved is None:
+            raise ValueError(f"Nenhuma TW registrada para a instância {instance_id or '(última)'}.")
+        file_path, instance = resolved
+        logger.info(f"Carregando arquivo: {file_path} (instância {instance or 'não registrada'})")
+
+        tw_l_raw = gcs.load_json_gzip(file_path, select=TW_SELECT)
         if tw_l_raw is None:
             raise ValueError("Arquivo retornou None.")
         logger.info("Arquivo TW leaderboard carregado com sucesso.")
@@ -198,5 +240,22 @@ def main():
 # ----------------------------------------------------
 # Execução
 # ----------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Leaderboard de TW da camada bronze para a silver."
+    )
+    parser.add_argument(
+        "--instance-id",
+        help="Instância da TW a processar (padrão: a última gravada pelo bronze).",
+    )
+    parser.add_argument(
+        "--date",
+        help="Data (YYYYMMDD) da pasta da TW quando ela não está no registro (padrão: ontem).",
+    )
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(instance_id=args.instance_id, day=args.date)
@@ -88,7 +88,7 @@ def test_api_error_code(mock_env):
 def test_gcs_initialization_failure(mock_env):
     with patch("bronze.events.API") as MockAPI:
         MockAPI.return_value.fetch_data.return_value = {"code": 0}
-    with patch("bronze.events.utils.GCSClient", side_effect=Exception("GCS fail")):
+    with patch("crosshair.extractors.GCSClient", side_effect=Exception("GCS fail")):
         with pytest.raises(SystemExit):
             main()
 
@@ -101,7 +101,7 @@ def test_gcs_upload_failure(mock_env):
         MockAPI.return_value.fetch_data.return_value = {"code": 0}
     mock_gcs = MagicMock()
     mock_gcs.upload_json_gzip.return_value = False
-    with patch("bronze.events.utils.GCSClient", return_value=mock_gcs):
+    with patch("crosshair.extractors.GCSClient", return_value=mock_gcs):
         with pytest.raises(SystemExit):
             main()
 
@@ -120,7 +120,7 @@ def test_success_flow(mock_env, caplog):
     mock_gcs.upload_json_gzip.return_value = True
 
     with patch("bronze.events.API", return_value=mock_api):
-        with patch("bronze.events.utils.GCSClient", return_value=mock_gcs):
+        with patch("crosshair.extractors.GCSClient", return_value=mock_gcs):
             main()
 
     assert any("Execução concluída com sucesso" in msg for msg in caplog.text.split("\n"))
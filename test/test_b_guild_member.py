@@ -1,6 +1,19 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from bronze.guild_member import load_env_var, main
+import time
+from bronze.guild_member import (
+    load_env_var,
+    main,
+    fetch_players,
+    fetch_players_sharded,
+    get_fetch_workers,
+    load_previous_snapshot,
+    merge_players,
+    resolve_shard_references,
+    split_changed_members,
+)
+from datetime import datetime, timezone
+import utils
 
 # -------------------------
 # Testes de variáveis .env
@@ -37,7 +50,7 @@ def mock_env(monkeypatch):
 
 def test_gcs_initialization_failure(mock_env):
     with patch(
-        "bronze.guild_member.utils.GCSClient",
+        "crosshair.extractors.GCSClient",
         side_effect=Exception("GCS fail"),
     ):
         with pytest.raises(SystemExit):
@@ -50,7 +63,7 @@ def test_gcs_initialization_failure(mock_env):
 
 
 def test_comlink_initialization_failure(mock_env):
-    with patch("bronze.guild_member.utils.GCSClient") as MockGCS:
+    with patch("crosshair.extractors.GCSClient") as MockGCS:
         MockGCS.return_value = MagicMock()
         with patch(
             "bronze.guild_member.SwgohComlink",
@@ -66,7 +79,7 @@ def test_comlink_initialization_failure(mock_env):
 
 
 def test_guild_fetch_failure(mock_env):
-    with patch("bronze.guild_member.utils.GCSClient") as MockGCS:
+    with patch("crosshair.extractors.GCSClient") as MockGCS:
         MockGCS.return_value = MagicMock()
         with patch("bronze.guild_member.SwgohComlink") as MockComlink:
             mock_comlink = MockComlink.return_value
@@ -83,7 +96,7 @@ def test_guild_fetch_failure(mock_env):
 def test_player_fetch_failure(mock_env):
     mock_guild = {"member": [{"playerId": "p1"}]}
 
-    with patch("bronze.guild_member.utils.GCSClient") as MockGCS:
+    with patch("crosshair.extractors.GCSClient") as MockGCS:
         mock_gcs = MockGCS.return_value
         mock_gcs.upload_json_gzip.return_value = True
 
@@ -104,7 +117,7 @@ def test_player_fetch_failure(mock_env):
 def test_guild_upload_failure(mock_env):
     mock_guild = {"member": []}
 
-    with patch("bronze.guild_member.utils.GCSClient") as MockGCS:
+    with patch("crosshair.extractors.GCSClient") as MockGCS:
         mock_gcs = MockGCS.return_value
         mock_gcs.upload_json_gzip.side_effect = [False]  # falha no upload da guild
 
@@ -124,7 +137,7 @@ def test_success_flow(mock_env, caplog):
     caplog.set_level("INFO")
     mock_guild = {"member": [{"playerId": "p1"}, {"playerId": "p2"}]}
 
-    with patch("bronze.guild_member.utils.GCSClient") as MockGCS:
+    with patch("crosshair.extractors.GCSClient") as MockGCS:
         mock_gcs = MockGCS.return_value
         mock_gcs.upload_json_gzip.return_value = True
 
@@ -139,3 +152,332 @@ def test_success_flow(mock_env, caplog):
     assert any("Execução concluída com sucesso" in msg for msg in caplog.text.split("\n"))
     assert any("Cliente GCS inicializado" in msg for msg in caplog.text.split("\n"))
     assert any("Cliente SwgohComlink inicializado" in msg for msg in caplog.text.split("\n"))
+
+
+# -------------------------
+# Coleta concorrente preserva a ordem
+# -------------------------
+
+
+def test_fetch_players_preserves_order_and_skips_errors(caplog):
+    caplog.set_level("INFO")
+    members = [{"playerId": f"p{i}"} for i in range(6)] + [{"playerName": "sem id"}]
+
+    def get_player(player_id):
+        idx = int(player_id[1:])
+        time.sleep(0.01 * (6 - idx))  # os primeiros terminam por último
+        if player_id == "p3":
+            raise Exception("Player fetch fail")
+        return {"playerId": player_id}
+
+    comlink = MagicMock()
+    comlink.get_player.side_effect = get_player
+
+    players = fetch_players(comlink, members, max_workers=4)
+
+    assert [p["playerId"] for p in players] == ["p0", "p1", "p2", "p4", "p5"]
+    assert "players/s" in caplog.text
+
+
+def test_get_fetch_workers(monkeypatch):
+    monkeypatch.setenv("PLAYER_FETCH_WORKERS", "3")
+    assert get_fetch_workers() == 3
+    monkeypatch.setenv("PLAYER_FETCH_WORKERS", "abc")
+    assert get_fetch_workers() == 8
+
+
+def test_fetch_players_sharded_uploads_each_player():
+    members = [{"playerId": f"p{i}"} for i in range(4)] + [{"playerName": "sem id"}]
+
+    def get_player(player_id):
+        if player_id == "p2":
+            raise Exception("Player fetch fail")
+        return {"playerId": player_id}
+
+    comlink = MagicMock()
+    comlink.get_player.side_effect = get_player
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    writer = utils.ShardedJsonWriter(gcs, "g/daily/2024/01/02/players")
+
+    assert fetch_players_sharded(comlink, members, writer, max_workers=2) == 3
+    manifest = writer.close()
+
+    assert sorted(manifest["shards"]) == ["p0", "p1", "p3"]
+    assert gcs.load_json_gzip("g/daily/2024/01/02/players/p3.json.gz") == {"playerId": "p3"}
+
+
+# -------------------------
+# Coleta incremental
+# -------------------------
+
+
+def _member(player_id, activity="1", gp="100"):
+    return {"playerId": player_id, "lastActivityTime": activity, "galacticPower": gp}
+
+
+def test_split_changed_members_and_merge():
+    previous = [_member("p1"), _member("p2"), _member("p3"), {"playerId": "p4"}]
+    previous_players = {pid: {"playerId": pid, "old": True} for pid in ("p1", "p2", "p4")}
+    members = [
+        _member("p1"),  # inalterado
+        _member("p2", activity="2"),  # jogou
+        _member("p3"),  # sem player anterior
+        {"playerId": "p4"},  # sem campos de atividade
+        _member("p5"),  # membro novo
+    ]
+
+    changed, carried = split_changed_members(members, previous, previous_players)
+
+    assert [m["playerId"] for m in changed] == ["p2", "p3", "p4", "p5"]
+    assert carried == {"p1": {"playerId": "p1", "old": True}}
+
+    fetched = [{"playerId": pid} for pid in ("p5", "p2", "p3", "p4")]
+    merged = merge_players(members, fetched, carried)
+    assert [p["playerId"] for p in merged] == ["p1", "p2", "p3", "p4", "p5"]
+    assert merged[0]["old"]
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_load_previous_snapshot(sharded):
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    folder = "g/daily/2024/01/01"
+    members = [_member("p1"), _member("p2")]
+    gcs.upload_json_gzip({"member": members, "profile": {}}, f"{folder}/guild.json.gz")
+    if sharded:
+        writer = utils.ShardedJsonWriter(gcs, f"{folder}/players")
+        writer.put("p1", {"playerId": "p1"})
+        writer.close()
+        manifest_path = writer.manifest_path
+    else:
+        manifest_path = f"{folder}/players.json.gz"
+        gcs.upload_json_gzip([{"playerId": "p1"}], manifest_path)
+    utils.BronzeManifest(gcs, "g", "20240101").record("players", manifest_path)
+
+    previous_members, previous_players = load_previous_snapshot(
+        gcs, "g", datetime(2024, 1, 2, tzinfo=timezone.utc)
+    )
+
+    assert previous_members == members
+    assert list(previous_players) == ["p1"]
+    if sharded:
+        # Referência ao shard da véspera, reaproveitada sem novo upload
+        entry = previous_players["p1"]
+        assert entry["path"] == f"{folder}/players/p1.json.gz"
+        writer = utils.ShardedJsonWriter(gcs, "g/daily/2024/01/02/players")
+        writer.reference("p1", entry)
+        manifest = writer.close()
+        assert manifest["referenced"] == 1
+        assert dict(utils.iter_shards(gcs, "g/daily/2024/01/02/players")) == {
+            "p1": {"playerId": "p1"}
+        }
+    else:
+        assert previous_players["p1"] == {"playerId": "p1"}
+
+
+def test_shard_references_become_profiles_for_single_file():
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    writer = utils.ShardedJsonWriter(gcs, "g/daily/2024/01/01/players")
+    writer.put("p1", {"playerId": "p1", "name": "P1"})
+    entries = writer.close()["shards"]
+    lost = {**entries["p1"], "path": "g/daily/2024/01/01/players/p2.json.gz"}
+    members = [{"playerId": "p1"}, {"playerId": "p2"}, {"playerId": "p3"}]
+    carried = {"p1": entries["p1"], "p2": lost, "p3": {"playerId": "p3"}}
+
+    refetch, resolved = resolve_shard_references(gcs, members, carried)
+
+    # Shard ilegível: o player volta para a busca em vez de virar perfil
+    assert refetch == [{"playerId": "p2"}]
+    assert resolved == {"p1": {"playerId": "p1", "name": "P1"}, "p3": {"playerId": "p3"}}
+    assert resolve_shard_references(gcs, members, {"p3": {"playerId": "p3"}})[0] == []
+
+
+# -------------------------
+# Checkpoint e retomada
+# -------------------------
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_resume_fetches_only_missing_players(mock_env, monkeypatch, sharded):
+    if sharded:
+        monkeypatch.setenv("PLAYERS_SHARDED", "1")
+    gcs = utils.GCSClient("bucket123", client=utils.MemoryStorageClient())
+    guild = {"member": [{"playerId": "p1"}, {"playerId": "p2"}, {"playerId": "p3"}]}
+    calls = []
+    failing = {"p2"}
+
+    def get_player(player_id):
+        calls.append(player_id)
+        if player_id in failing:
+            raise Exception("Player fetch fail")
+        return {"playerId": player_id}
+
+    with patch("crosshair.extractors.GCSClient", return_value=gcs):
+        with patch("bronze.guild_member.SwgohComlink"), patch(
+            "bronze.guild_member.utils.RateLimitedClient"
+        ) as MockClient:
+            comlink = MockClient.return_value
+            comlink.get_guild.return_value = guild
+            comlink.get_player.side_effect = get_player
+
+            main()
+            checkpoint_path = next(p for p in gcs.uploaded if "_checkpoint" in p)
+            state = utils.CollectionCheckpoint(gcs, checkpoint_path).load()
+            assert state == {"collected": {"p1", "p3"}, "failed": {"p2"}}
+
+            calls.clear()
+            failing.clear()
+            main(resume=True)
+
+    assert calls == ["p2"]
+    state = utils.CollectionCheckpoint(gcs, checkpoint_path).load()
+    assert state == {"collected": {"p1", "p2", "p3"}, "failed": set()}
+    folder = checkpoint_path.rsplit("/_checkpoint", 1)[0]
+    if sharded:
+        players = [p for _, p in sorted(utils.iter_shards(gcs, f"{folder}/players"))]
+    else:
+        players = gcs.load_json_gzip(f"{folder}/players.json.gz")
+    assert [p["playerId"] for p in players] == ["p1", "p2", "p3"]
+
+
+class Crash(BaseException):
+    """Simula a queda do processo (não é tratada como falha de um player)."""
+
+
+def test_resume_after_crash_reuses_flushed_shards(mock_env, monkeypatch):
+    monkeypatch.setenv("PLAYERS_SHARDED", "1")
+    monkeypatch.setenv("PLAYERS_CHECKPOINT_EVERY", "1")
+    monkeypatch.setenv("PLAYER_FETCH_WORKERS", "1")
+    gcs = utils.GCSClient("bucket123", client=utils.MemoryStorageClient())
+    guild = {"member": [{"playerId": f"p{i}"} for i in range(1, 5)]}
+    calls = []
+    crash = {"p3"}
+
+    def checkpoint_state():
+        path = next((p for p in gcs.uploaded if "_checkpoint" in p), None)
+        return utils.CollectionCheckpoint(gcs, path).load() if path else None
+
+    def get_player(player_id):
+        calls.append(player_id)
+        if player_id in crash:
+            # Espera o checkpoint parcial dos players já enviados antes de "cair"
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                state = checkpoint_state()
+                if state and state["collected"] == {"p1", "p2"}:
+                    break
+                time.sleep(0.01)
+            raise Crash()
+        return {"playerId": player_id}
+
+    with patch("crosshair.extractors.GCSClient", return_value=gcs):
+        with patch("bronze.guild_member.SwgohComlink"), patch(
+            "bronze.guild_member.utils.RateLimitedClient"
+        ) as MockClient:
+            comlink = MockClient.return_value
+            comlink.get_guild.return_value = guild
+            comlink.get_player.side_effect = get_player
+
+            with pytest.raises(Crash):
+                main()
+            collected = checkpoint_state()["collected"]
+            assert {"p1", "p2"} <= collected and "p3" not in collected
+            checkpoint_path = next(p for p in gcs.uploaded if "_checkpoint" in p)
+            folder = checkpoint_path.rsplit("/_checkpoint", 1)[0]
+            # O manifest parcial não é visto como conjunto completo
+            assert utils.load_shard_manifest(gcs, f"{folder}/players") is None
+
+            calls.clear()
+            crash.clear()
+            main(resume=True)
+
+    # p4 pode ter sido buscado na primeira execução (já estava na fila)
+    assert "p3" in calls and not {"p1", "p2"} & set(calls)
+    players = dict(utils.iter_shards(gcs, f"{folder}/players"))
+    assert sorted(players) == ["p1", "p2", "p3", "p4"]
+    assert checkpoint_state() == {"collected": set(players), "failed": set()}
+
+
+# -------------------------
+# Retry dos players
+# -------------------------
+
+
+def test_fetch_players_retries_with_caller():
+    failures = {"p1": 1}
+
+    def get_player(player_id):
+        if failures.get(player_id):
+            failures[player_id] -= 1
+            raise ConnectionError("connection reset")
+        return {"playerId": player_id}
+
+    comlink = MagicMock()
+    comlink.get_player.side_effect = get_player
+    caller = utils.ResilientCaller(utils.RetryPolicy(attempts=2, base_delay=0.001))
+
+    players = fetch_players(comlink, [{"playerId": "p0"}, {"playerId": "p1"}], caller=caller)
+
+    assert [p["playerId"] for p in players] == ["p0", "p1"]
+    assert caller.stats()["retries"] == 1
+    assert caller.stats()["attempt_latency"]["count"] == 2
+    caller.close()
+
+
+# -------------------------
+# Projeção dos players
+# -------------------------
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_players_projection_with_raw_copy(mock_env, monkeypatch, caplog, sharded):
+    caplog.set_level("INFO")
+    if sharded:
+        monkeypatch.setenv("PLAYERS_SHARDED", "1")
+    monkeypatch.setenv("PLAYERS_PROJECTION", "playerId,rosterUnit[*].definitionId")
+    monkeypatch.setenv("PLAYERS_RAW_COLD", "1")
+    gcs = utils.GCSClient("bucket123", client=utils.MemoryStorageClient())
+    raw = {"playerId": "p1", "datacron": ["x" * 50], "rosterUnit": [{"definitionId": "A", "xp": 1}]}
+
+    with patch("crosshair.extractors.GCSClient", return_value=gcs):
+        with patch("bronze.guild_member.SwgohComlink"), patch(
+            "bronze.guild_member.utils.RateLimitedClient"
+        ) as MockClient:
+            comlink = MockClient.return_value
+            comlink.get_guild.return_value = {"member": [{"playerId": "p1"}]}
+            comlink.get_player.return_value = raw
+            main()
+
+    projected = {"playerId": "p1", "rosterUnit": [{"definitionId": "A"}]}
+    folder = next(p for p in gcs.uploaded if p.endswith("guild.json.gz")).rsplit("/", 1)[0]
+    raw_paths = [p for p in gcs.uploaded if p.startswith(f"raw/{folder}/players-")]
+    if sharded:
+        assert dict(utils.iter_shards(gcs, f"{folder}/players")) == {"p1": projected}
+        raw_prefix = next(p for p in raw_paths if p.endswith(utils.SHARD_MANIFEST_NAME))
+        raw_shards = dict(utils.iter_shards(gcs, raw_prefix.rsplit("/", 1)[0]))
+        assert raw_shards == {"p1": raw}
+    else:
+        assert gcs.load_json_gzip(f"{folder}/players.json.gz") == [projected]
+        assert [gcs.load_json_gzip(p) for p in raw_paths] == [[raw]]
+    assert "Projeção de players: 1 players" in caplog.text
+
+
+def test_players_projection_without_player_id_keeps_it(mock_env, monkeypatch):
+    monkeypatch.setenv("PLAYERS_PROJECTION", "rosterUnit[*].definitionId")
+    gcs = utils.GCSClient("bucket123", client=utils.MemoryStorageClient())
+
+    with patch("crosshair.extractors.GCSClient", return_value=gcs):
+        with patch("bronze.guild_member.SwgohComlink"), patch(
+            "bronze.guild_member.utils.RateLimitedClient"
+        ) as MockClient:
+            comlink = MockClient.return_value
+            comlink.get_guild.return_value = {"member": [{"playerId": "p1"}]}
+            comlink.get_player.return_value = {
+                "playerId": "p1",
+                "rosterUnit": [{"definitionId": "A"}],
+            }
+            main()
+
+    players_path = next(p for p in gcs.uploaded if p.endswith("players.json.gz"))
+    assert gcs.load_json_gzip(players_path) == [
+        {"playerId": "p1", "rosterUnit": [{"definitionId": "A"}]}
+    ]
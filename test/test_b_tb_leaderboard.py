@@ -1,6 +1,8 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from bronze.tb_leaderboard import load_env_var, main
+import crosshair.storage
+import utils
 
 
 # -------------------------
@@ -27,6 +29,7 @@ def mock_env(monkeypatch):
     monkeypatch.setenv("ALLYCODE", "123")
     monkeypatch.setenv("GUILD_ID", "456")
     monkeypatch.setenv("GCS_BUCKET_NAME", "bucket")
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
 
 
 # -------------------------
@@ -90,7 +93,7 @@ def test_gcs_initialization_failure(mock_env):
             "territoryBattleStatus": {"instanceId": "O1234567890"}
         }
     with patch(
-        "bronze.tb_leaderboard.utils.GCSClient",
+        "crosshair.extractors.GCSClient",
         side_effect=Exception("GCS fail"),
     ):
         with pytest.raises(SystemExit):
@@ -107,7 +110,7 @@ def test_gcs_upload_failure(mock_env):
         }
     mock_gcs = MagicMock()
     mock_gcs.upload_json_gzip.return_value = False
-    with patch("bronze.tb_leaderboard.utils.GCSClient", return_value=mock_gcs):
+    with patch("crosshair.extractors.GCSClient", return_value=mock_gcs):
         with pytest.raises(SystemExit):
             main()
 
@@ -125,8 +128,47 @@ def test_success_flow(mock_env, caplog):
     mock_gcs.upload_json_gzip.return_value = True
 
     with patch("bronze.tb_leaderboard.API", return_value=mock_api):
-        with patch("bronze.tb_leaderboard.utils.GCSClient", return_value=mock_gcs):
+        with patch("crosshair.extractors.GCSClient", return_value=mock_gcs):
             main()
 
     assert any("Execução concluída com sucesso" in msg for msg in caplog.text.split("\n"))
     assert any("TW detectado na data" in msg for msg in caplog.text.split("\n"))
+
+
+# -------------------------
+# Modo poll grava só as mudanças e a série de progresso
+# -------------------------
+
+
+def test_poll_mode_writes_deltas_and_series(mock_env, monkeypatch):
+    monkeypatch.setattr(crosshair.storage, "_MEMORY_CLIENT", utils.MemoryStorageClient())
+
+    def status(score):
+        return {
+            "territoryBattleStatus": {
+                "instanceId": "TB_EVENT:O1699999999000",
+                "currentRound": 1,
+                "conflictZoneStatus": [{"zoneStatus": {"zoneId": "z1", "score": str(score)}}],
+                "currentStat": [
+                    {"mapStatId": "summary", "playerStat": [{"memberId": "p1", "score": score}]}
+                ],
+            }
+        }
+
+    responses = [status(10), status(10), status(25), {"territoryBattleStatus": {}}]
+    mock_api = MagicMock()
+    mock_api.fetch_data.side_effect = responses
+
+    with patch("bronze.tb_leaderboard.API", return_value=mock_api):
+        main(poll=True, interval=0, max_polls=5)
+
+    # A quarta resposta é de outra instância: o poll termina após três
+    assert mock_api.fetch_data.call_count == 4
+    live = utils.LiveSnapshots(
+        utils.GCSClient("bucket"), "456/events/tb/20231114/live/tbleaderboard"
+    )
+    points = list(live.iter_series())
+    assert [p["object"] is not None for p in points] == [True, False, True]
+    assert [p["metrics"]["members"]["p1"] for p in points] == [10, 10, 25]
+    assert points[2]["metrics"]["zones"] == {"z1": 25}
+    assert live.read(2) == responses[2]["territoryBattleStatus"]
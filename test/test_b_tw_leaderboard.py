@@ -1,6 +1,9 @@
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock
 from bronze.tw_leaderboard import load_env_var, main
+import crosshair.storage
+import utils
 
 # -------------------------
 # Testes de variáveis .env
@@ -30,6 +33,7 @@ def mock_env(monkeypatch):
     monkeypatch.setenv("ALLYCODE", "123")
     monkeypatch.setenv("GUILD_ID", "456")
     monkeypatch.setenv("GCS_BUCKET_NAME", "bucket")
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
 
 
 # -------------------------
@@ -101,7 +105,7 @@ def test_gcs_initialization_failure(mock_env):
     with patch("bronze.tw_leaderboard.API") as MockAPI:
         MockAPI.return_value.fetch_data.return_value = {"territoryMapId": "O1234567890"}
     with patch(
-        "bronze.tw_leaderboard.utils.GCSClient",
+        "crosshair.extractors.GCSClient",
         side_effect=Exception("GCS fail"),
     ):
         with pytest.raises(SystemExit):
@@ -118,7 +122,7 @@ def test_gcs_upload_failure(mock_env):
         MockAPI.return_value.fetch_data.return_value = {"territoryMapId": "O1234567890"}
     mock_gcs = MagicMock()
     mock_gcs.upload_json_gzip.return_value = False
-    with patch("bronze.tw_leaderboard.utils.GCSClient", return_value=mock_gcs):
+    with patch("crosshair.extractors.GCSClient", return_value=mock_gcs):
         with pytest.raises(SystemExit):
             main()
 
@@ -138,8 +142,149 @@ def test_success_flow(mock_env, caplog):
     mock_gcs.upload_json_gzip.return_value = True
 
     with patch("bronze.tw_leaderboard.API", return_value=mock_api):
-        with patch("bronze.tw_leaderboard.utils.GCSClient", return_value=mock_gcs):
+        with patch("crosshair.extractors.GCSClient", return_value=mock_gcs):
             main()
 
     assert any("Execução concluída com sucesso" in msg for msg in caplog.text.split("\n"))
     assert any("TW detectado na data" in msg for msg in caplog.text.split("\n"))
+
+
+# -------------------------
+# Parquet opcional ao lado do JSON
+# -------------------------
+
+
+def test_parquet_output_enabled(mock_env, monkeypatch):
+    monkeypatch.setenv("BRONZE_PARQUET", "1")
+    mock_api = MagicMock()
+    mock_api.fetch_data.return_value = {
+        "territoryMapId": "O1699999999000",
+        "data": {"totalBanners": [{"memberId": "p1", "banners": 10}]},
+    }
+    mock_gcs = MagicMock()
+    mock_gcs.upload_json_gzip.return_value = True
+    mock_gcs.upload_parquet.return_value = True
+
+    with patch("bronze.tw_leaderboard.API", return_value=mock_api):
+        with patch("crosshair.extractors.GCSClient", return_value=mock_gcs):
+            main()
+
+    paths = [c.args[1] for c in mock_gcs.upload_parquet.call_args_list]
+    assert "456/events/tw/20231114/twleaderboard.totalBanners.parquet" in paths
+    assert len(paths) == 4
+
+
+# -------------------------
+# Várias guilds no mesmo processo
+# -------------------------
+
+
+def test_multiple_guilds_isolate_failures(mock_env, monkeypatch):
+    monkeypatch.setenv("GUILD_IDS", "g1,g2,g3")
+    monkeypatch.setenv("ALLYCODES", "111,222,333")
+    mock_gcs = MagicMock()
+    mock_gcs.upload_json_gzip.return_value = True
+
+    def make_api(api_key, allycode):
+        api = MagicMock()
+        if allycode == "222":
+            api.fetch_data.side_effect = Exception("API fail")
+        else:
+            api.fetch_data.return_value = {"territoryMapId": f"O1699999999000:{allycode}"}
+        return api
+
+    with patch("bronze.tw_leaderboard.API", side_effect=make_api):
+        with patch("crosshair.extractors.GCSClient", return_value=mock_gcs):
+            with pytest.raises(SystemExit):
+                main()
+
+    paths = sorted(c.args[1] for c in mock_gcs.upload_json_gzip.call_args_list)
+    assert paths == [
+        "g1/events/tw/20231114/twleaderboard.json.gz",
+        "g3/events/tw/20231114/twleaderboard.json.gz",
+    ]
+
+
+# -------------------------
+# Instância já registrada não chama a API
+# -------------------------
+
+
+def test_known_instance_skips_fetch_unless_forced(mock_env, monkeypatch, caplog):
+    caplog.set_level("INFO")
+    monkeypatch.setattr(crosshair.storage, "_MEMORY_CLIENT", utils.MemoryStorageClient())
+    mock_api = MagicMock()
+    mock_api.fetch_data.return_value = {"territoryMapId": "TERRITORY_WAR_EVENT_C01:O1699999999000"}
+
+    with patch("bronze.tw_leaderboard.API", return_value=mock_api):
+        main(instance_id="O1699999999000")
+        assert mock_api.fetch_data.call_count == 1
+
+        main(instance_id="O1699999999000")
+        assert mock_api.fetch_data.call_count == 1
+        assert "já gravada" in caplog.text
+
+        main(instance_id="O1699999999000", force=True)
+        assert mock_api.fetch_data.call_count == 2
+
+        # Outra instância é buscada normalmente
+        main(instance_id="O1700000000000")
+        assert mock_api.fetch_data.call_count == 3
+
+
+def test_instance_resolved_from_calendar(mock_env, monkeypatch):
+    monkeypatch.setattr(crosshair.storage, "_MEMORY_CLIENT", utils.MemoryStorageClient())
+    now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    gcs = utils.GCSClient("bucket")
+    calendar = {
+        "events": [
+            {
+                "type": "TERRITORY_WAR_EVENT",
+                "instance": [
+                    {"id": "O1", "startTime": str(now_ms - 10), "endTime": str(now_ms + 10**6)}
+                ],
+            }
+        ]
+    }
+    gcs.upload_json_gzip(calendar, utils.calendar_path(datetime.now(timezone.utc)))
+    utils.InstanceRegistry(gcs, "456").record("twleaderboard", ["O1"], "456/events/tw/x.json.gz")
+
+    with patch("bronze.tw_leaderboard.API") as MockAPI:
+        main()
+    MockAPI.return_value.fetch_data.assert_not_called()
+
+
+def test_upcoming_instance_not_marked_from_past_payload(mock_env, monkeypatch):
+    monkeypatch.setattr(crosshair.storage, "_MEMORY_CLIENT", utils.MemoryStorageClient())
+    now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    upcoming = f"O{now_ms + 10**8}"
+    gcs = utils.GCSClient("bucket")
+    calendar = {
+        "events": [
+            {
+                "type": "TERRITORY_WAR_EVENT",
+                "instance": [
+                    {
+                        "id": upcoming,
+                        "startTime": str(now_ms + 10**8),
+                        "endTime": str(now_ms + 10**9),
+                    }
+                ],
+            }
+        ]
+    }
+    gcs.upload_json_gzip(calendar, utils.calendar_path(datetime.now(timezone.utc)))
+    mock_api = MagicMock()
+    mock_api.fetch_data.return_value = {"territoryMapId": "TERRITORY_WAR_EVENT_C01:O1699999999000"}
+
+    with patch("bronze.tw_leaderboard.API", return_value=mock_api):
+        main()
+
+    registry = utils.InstanceRegistry(gcs, "456")
+    assert registry.get("twleaderboard", "O1699999999000") is not None
+    assert registry.get("twleaderboard", upcoming) is None
+
+    # A execução agendada da próxima instância não é pulada
+    with patch("bronze.tw_leaderboard.API", return_value=mock_api):
+        main()
+    assert mock_api.fetch_data.call_count == 2
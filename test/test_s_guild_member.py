@@ -216,3 +216,26 @@ def test_success_flow(mock_env, caplog):
             main()
 
     assert any("Execução concluída com sucesso" in msg for msg in caplog.text.split("\n"))
+
+
+# -------------------------
+# Partição informada pelo pipeline
+# -------------------------
+
+
+def test_partition_date_from_pipeline(mock_env):
+    mock_gcs = MagicMock()
+    mock_gcs.load_json_gzip.return_value = None
+    with patch("silver.guild_member.utils.GCSClient", return_value=mock_gcs):
+        with pytest.raises(SystemExit):
+            main(day="20240105")
+
+    assert mock_gcs.load_json_gzip.call_args.args[0] == "guild123/daily/2024/01/05/guild.json.gz"
+
+
+def test_invalid_partition_date(mock_env):
+    mock_gcs = MagicMock()
+    with patch("silver.guild_member.utils.GCSClient", return_value=mock_gcs):
+        with pytest.raises(SystemExit):
+            main(day="2024-01-05")
+    mock_gcs.load_json_gzip.assert_not_called()
@@ -0,0 +1,182 @@
+import pandas as pd
+import pytest
+from unittest.mock import patch, MagicMock
+from google.api_core.exceptions import NotFound
+import utils
+from silver.tb_leaderboard import load_env_var, main, member_stats_table, zone_table
+
+# -------------------------
+# Testes de variáveis .env
+# -------------------------
+
+
+def test_load_env_var_success(monkeypatch):
+    monkeypatch.setenv("MY_VAR", "123")
+    assert load_env_var("MY_VAR") == "123"
+
+
+def test_load_env_var_missing(monkeypatch):
+    monkeypatch.delenv("MY_VAR", raising=False)
+    with pytest.raises(ValueError):
+        load_env_var("MY_VAR")
+
+
+# -------------------------
+# Fixtures
+# -------------------------
+
+STATUS = {
+    "instanceId": "TB_EVENT_C01:O1690000000000",
+    "conflictZoneStatus": [
+        {
+            "zoneStatus": {
+                "zoneId": "tb3_mixed_phase02_conflict01",
+                "zoneState": "ZONECOMPLETE",
+                "commandState": "ZONENOTCOMMANDED",
+                "score": "1500",
+            },
+            "playersParticipated": 3,
+        }
+    ],
+    "strikeZoneStatus": [
+        {"zoneStatus": {"zoneId": "tb3_mixed_phase01_strike02", "score": "7"}},
+    ],
+    "currentStat": [
+        {
+            "mapStatId": "summary",
+            "playerStat": [{"memberId": "p1", "score": "10"}, {"memberId": "p2", "score": "20"}],
+        },
+        {"mapStatId": "power_round_3", "playerStat": [{"memberId": "p1", "score": "5"}]},
+        {"mapStatId": "unit_donated_round_1", "playerStat": [{"memberId": "p2"}]},
+    ],
+}
+
+
+@pytest.fixture
+def mock_env(monkeypatch):
+    monkeypatch.setenv("GCS_BUCKET_NAME", "bucket")
+    monkeypatch.setenv("GUILD_ID", "guild123")
+    monkeypatch.setenv("BQ_PROJECT_ID", "proj123")
+
+
+@pytest.fixture
+def gcs_with_tb():
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    path = "guild123/events/tb/20230722/tbleaderboard.json.gz"
+    gcs.upload_json_gzip(STATUS, path)
+    utils.InstanceRegistry(gcs, "guild123").record("tbleaderboard", [STATUS["instanceId"]], path)
+    return gcs
+
+
+# -------------------------
+# Transformações
+# -------------------------
+
+
+def test_zone_table():
+    df = zone_table(STATUS)
+
+    assert df["zone_kind"].tolist() == ["conflict", "strike"]
+    assert df["phase"].tolist() == [2, 1]
+    assert df["score"].tolist() == [1500, 7]
+    assert df["players_participated"].tolist() == [3, 0]
+    assert pd.isna(df.loc[1, "zone_state"])
+
+
+def test_member_stats_table():
+    df = member_stats_table(STATUS)
+
+    assert df["player_id"].tolist() == ["p1", "p2", "p1", "p2"]
+    assert df["stat"].tolist() == ["summary", "summary", "power", "unit_donated"]
+    assert df["round"].isna().tolist() == [True, True, False, False]
+    assert df["round"].dropna().tolist() == [3, 1]
+    assert df["score"].tolist() == [10, 20, 5, 0]
+
+
+def test_empty_status():
+    assert zone_table({}).empty
+    assert member_stats_table({}).empty
+
+
+# -------------------------
+# Falhas
+# -------------------------
+
+
+def test_gcs_initialization_failure(mock_env):
+    with patch("silver.tb_leaderboard.utils.GCSClient", side_effect=Exception("GCS fail")):
+        with pytest.raises(SystemExit):
+            main()
+
+
+def test_no_registered_instance(mock_env):
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    with patch("silver.tb_leaderboard.utils.GCSClient", return_value=gcs):
+        with pytest.raises(SystemExit):
+            main()
+
+
+def test_unknown_instance(mock_env, gcs_with_tb):
+    with patch("silver.tb_leaderboard.utils.GCSClient", return_value=gcs_with_tb):
+        with pytest.raises(SystemExit):
+            main(instance_id="O1")
+
+
+def test_bigquery_load_failure(mock_env, gcs_with_tb):
+    mock_client = MagicMock()
+    mock_client.load_table_from_dataframe.side_effect = Exception("Load fail")
+
+    with patch("silver.tb_leaderboard.utils.GCSClient", return_value=gcs_with_tb):
+        with patch("silver.tb_leaderboard.bigquery.Client", return_value=mock_client):
+            with pytest.raises(SystemExit):
+                main()
+
+
+# -------------------------
+# Fluxo completo com sucesso
+# -------------------------
+
+
+def test_success_flow(mock_env, gcs_with_tb, caplog):
+    caplog.set_level("INFO")
+    mock_client = MagicMock()
+
+    with patch("silver.tb_leaderboard.utils.GCSClient", return_value=gcs_with_tb):
+        with patch("silver.tb_leaderboard.bigquery.Client", return_value=mock_client):
+            main(instance_id="O1690000000000")
+
+    loads = {c.args[1]: c.args[0] for c in mock_client.load_table_from_dataframe.call_args_list}
+    assert set(loads) == {"proj123.silver.tb_zone_status", "proj123.silver.tb_member_stats"}
+    members = loads["proj123.silver.tb_member_stats"]
+    assert len(members) == 4
+    assert set(members["tb_instance_id"]) == {"O1690000000000"}
+    assert str(members["tb_date"].iloc[0].date()) == "2023-07-22"
+    assert any("Execução concluída com sucesso" in msg for msg in caplog.text.split("\n"))
+
+
+def test_reload_replaces_instance_rows(mock_env, gcs_with_tb):
+    mock_client = MagicMock()
+
+    with patch("silver.tb_leaderboard.utils.GCSClient", return_value=gcs_with_tb):
+        with patch("silver.tb_leaderboard.bigquery.Client", return_value=mock_client):
+            main()
+
+    calls = [c for c in mock_client.mock_calls if c[0] in ("query", "load_table_from_dataframe")]
+    # Para cada tabela, o DELETE da instância vem antes do append
+    assert [c[0] for c in calls] == ["query", "load_table_from_dataframe"] * 2
+    query = calls[0]
+    assert "DELETE FROM `proj123.silver.tb_zone_status`" in query.args[0]
+    params = query.kwargs["job_config"].query_parameters
+    assert [(p.name, p.value) for p in params] == [("instance", "O1690000000000")]
+
+
+def test_first_load_skips_delete(mock_env, gcs_with_tb):
+    mock_client = MagicMock()
+    mock_client.get_table.side_effect = NotFound("table")
+
+    with patch("silver.tb_leaderboard.utils.GCSClient", return_value=gcs_with_tb):
+        with patch("silver.tb_leaderboard.bigquery.Client", return_value=mock_client):
+            main()
+
+    mock_client.query.assert_not_called()
+    assert mock_client.load_table_from_dataframe.call_count == 2
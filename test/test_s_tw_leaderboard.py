@@ -1,5 +1,7 @@
+from datetime import datetime, timedelta, timezone
 import pytest
 from unittest.mock import patch, MagicMock
+import utils
 from silver.tw_leaderboard import load_env_var, main
 
 # -------------------------
@@ -30,6 +32,16 @@ def mock_env(monkeypatch):
     monkeypatch.setenv("BQ_PROJECT_ID", "proj123")
 
 
+def registered_gcs(entries=None):
+    """GCSClient falso cujo registro de instâncias aponta para uma TW gravada."""
+    entries = entries or {
+        "O1690000000000": {"path": "guild123/events/tw/20230722/tw.json.gz", "storedAt": "t"}
+    }
+    mock_gcs = MagicMock()
+    mock_gcs.fetch_json_gzip.return_value = utils.FetchResult({"twleaderboard": entries}, 1, False)
+    return mock_gcs
+
+
 # -------------------------
 # Falha ao inicializar GCS
 # -------------------------
@@ -50,7 +62,7 @@ def test_gcs_initialization_failure(mock_env):
 
 
 def test_gcs_load_failure(mock_env):
-    mock_gcs = MagicMock()
+    mock_gcs = registered_gcs()
     mock_gcs.load_json_gzip.return_value = None
     with patch("silver.tw_leaderboard.utils.GCSClient", return_value=mock_gcs):
         with pytest.raises(SystemExit):
@@ -63,7 +75,7 @@ def test_gcs_load_failure(mock_env):
 
 
 def test_missing_data_field(mock_env):
-    mock_gcs = MagicMock()
+    mock_gcs = registered_gcs()
     mock_gcs.load_json_gzip.return_value = {"territoryMapId": "O1690000000000"}
     with patch("silver.tw_leaderboard.utils.GCSClient", return_value=mock_gcs):
         with pytest.raises(SystemExit):
@@ -76,7 +88,7 @@ def test_missing_data_field(mock_env):
 
 
 def test_dataframe_creation_failure(mock_env):
-    mock_gcs = MagicMock()
+    mock_gcs = registered_gcs()
     mock_gcs.load_json_gzip.return_value = {
         "territoryMapId": "O1690000000000",
         "data": None,
@@ -92,7 +104,7 @@ def test_dataframe_creation_failure(mock_env):
 
 
 def test_tw_timestamp_failure(mock_env):
-    mock_gcs = MagicMock()
+    mock_gcs = registered_gcs()
     mock_gcs.load_json_gzip.return_value = {
         "territoryMapId": "INVALID",
         "data": {},
@@ -108,7 +120,7 @@ def test_tw_timestamp_failure(mock_env):
 
 
 def test_bigquery_initialization_failure(mock_env):
-    mock_gcs = MagicMock()
+    mock_gcs = registered_gcs()
     mock_gcs.load_json_gzip.return_value = {
         "territoryMapId": "O1690000000000",
         "data": {"totalBanners": []},
@@ -128,7 +140,7 @@ def test_bigquery_initialization_failure(mock_env):
 
 
 def test_bigquery_load_failure(mock_env):
-    mock_gcs = MagicMock()
+    mock_gcs = registered_gcs()
     mock_gcs.load_json_gzip.return_value = {
         "territoryMapId": "O1690000000000",
         "data": {"totalBanners": []},
@@ -159,7 +171,7 @@ def test_success_flow(mock_env, caplog):
         "defenseBanners": [["p1", 2]],
         "rogueActions": [["p1", 1]],
     }
-    mock_gcs = MagicMock()
+    mock_gcs = registered_gcs()
     mock_gcs.load_json_gzip.return_value = {
         "territoryMapId": "O1690000000000",
         "data": data,
@@ -176,3 +188,77 @@ def test_success_flow(mock_env, caplog):
             main()
 
     assert any("Execução concluída com sucesso" in msg for msg in caplog.text.split("\n"))
+
+
+# -------------------------
+# Path resolvido pelo registro de instâncias
+# -------------------------
+
+
+def test_path_resolved_from_registry(mock_env):
+    mock_gcs = registered_gcs(
+        {
+            "O1700000000000": {"path": "guild123/events/tw/x/old.json.gz", "storedAt": "2023-11"},
+            "O1710000000000": {"path": "guild123/events/tw/x/new.json.gz", "storedAt": "2024-03"},
+        }
+    )
+    mock_gcs.load_json_gzip.return_value = None
+    with patch("silver.tw_leaderboard.utils.GCSClient", return_value=mock_gcs):
+        with pytest.raises(SystemExit):
+            main()
+        assert mock_gcs.load_json_gzip.call_args.args[0] == "guild123/events/tw/x/new.json.gz"
+
+        with pytest.raises(SystemExit):
+            main(instance_id="TERRITORY_WAR_EVENT_C01:O1700000000000")
+        assert mock_gcs.load_json_gzip.call_args.args[0] == "guild123/events/tw/x/old.json.gz"
+
+
+def test_unregistered_instance(mock_env):
+    mock_gcs = registered_gcs()
+    with patch("silver.tw_leaderboard.utils.GCSClient", return_value=mock_gcs):
+        with pytest.raises(SystemExit):
+            main(instance_id="O1")
+    mock_gcs.load_json_gzip.assert_not_called()
+
+
+# -------------------------
+# TW sem registro: fallback pela pasta da data
+# -------------------------
+
+
+def test_unregistered_tw_falls_back_to_date_folder(mock_env):
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    gcs.upload_json_gzip(
+        {"territoryMapId": "O1690000000000", "data": {"totalBanners": [["p1", 5]]}},
+        "guild123/events/tw/20230722/twleaderboard.json.gz",
+    )
+    mock_client = MagicMock()
+
+    with patch("silver.tw_leaderboard.utils.GCSClient", return_value=gcs):
+        with patch("silver.tw_leaderboard.bigquery.Client", return_value=mock_client):
+            main(day="20230722")
+
+    df = mock_client.load_table_from_dataframe.call_args.args[0]
+    assert df["player_id"].tolist() == ["p1"]
+    assert str(df["tw_date"].iloc[0].date()) == "2023-07-22"
+
+
+def test_unregistered_tw_defaults_to_yesterday_or_manifest(mock_env):
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    gcs.load_json_gzip = MagicMock(return_value=None)
+    yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y%m%d")
+
+    with patch("silver.tw_leaderboard.utils.GCSClient", return_value=gcs):
+        with pytest.raises(SystemExit):
+            main()
+        assert gcs.load_json_gzip.call_args.args[0] == (
+            f"guild123/events/tw/{yesterday}/twleaderboard.json.gz"
+        )
+
+        # O manifest do dia aponta o objeto exato
+        utils.BronzeManifest(gcs, "guild123", "20230722").record(
+            "twleaderboard", "guild123/events/tw/20230722/tw-2.json.gz"
+        )
+        with pytest.raises(SystemExit):
+            main(day="20230722")
+        assert gcs.load_json_gzip.call_args.args[0] == "guild123/events/tw/20230722/tw-2.json.gz"
@@ -0,0 +1,1116 @@
+import gzip
+import hashlib
+import io
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import pytest
+from google.api_core.exceptions import NotFound, NotModified
+from unittest.mock import MagicMock
+import utils
+
+# -------------------------
+# Limitador de taxa adaptativo
+# -------------------------
+
+
+def test_http_status_from_error():
+    exc = Exception("boom")
+    exc.response = MagicMock(status_code=503)
+    assert utils.http_status_from_error(exc) == 503
+    assert utils.http_status_from_error(RuntimeError("HTTP 502 Bad Gateway")) == 502
+    assert utils.http_status_from_error(RuntimeError("Too Many Requests")) == 429
+    assert utils.http_status_from_error(RuntimeError("invalid payload")) is None
+
+
+def test_rate_limiter_aimd():
+    limiter = utils.AdaptiveRateLimiter(rate=10.0, min_rate=1.0, max_rate=12.0, increase=5.0)
+
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(10.5)
+
+    limiter.on_throttle()
+    assert limiter.rate == pytest.approx(5.25)
+
+    # Erros da mesma rajada contam como um único recuo
+    limiter.on_throttle()
+    assert limiter.rate == pytest.approx(5.25)
+    assert limiter.stats()["throttles"] == 2
+
+
+def test_rate_limiter_from_env(monkeypatch):
+    monkeypatch.setenv("TESTSVC_RATE_LIMIT", "3")
+    monkeypatch.setenv("TESTSVC_RATE_MAX", "4")
+    limiter = utils.AdaptiveRateLimiter.from_env("testsvc")
+    assert limiter.rate == 3.0
+    assert limiter.max_rate == 4.0
+    assert limiter.queue_depth == 0
+
+
+def test_rate_limited_client_feedback():
+    limiter = utils.AdaptiveRateLimiter(rate=100.0, min_rate=1.0)
+    client = MagicMock()
+    client.get_player.side_effect = [{"playerId": "p1"}, RuntimeError("status: 429")]
+    wrapped = utils.RateLimitedClient(client, limiter)
+
+    assert wrapped.get_player(player_id="p1") == {"playerId": "p1"}
+    with pytest.raises(RuntimeError):
+        wrapped.get_player(player_id="p2")
+
+    stats = limiter.stats()
+    assert stats["successes"] == 1
+    assert stats["throttles"] == 1
+    assert limiter.rate < 100.0
+
+
+# -------------------------
+# Upload JSON.gz em streaming
+# -------------------------
+
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_write_json_gzip_matches_json_dumps(name):
+    data = {"member": [{"playerId": "p1", "nome": "ação"}, {"x": []}], "empty": {}, 1: None}
+    buffer = io.BytesIO()
+    utils.GCSClient._write_json_gzip(data, buffer, serializer=utils.get_serializer(name))
+    expected = json.dumps(data, ensure_ascii=False, default=str, separators=(",", ":"))
+    assert gzip.decompress(buffer.getvalue()).decode("utf-8") == expected
+
+
+def test_upload_json_gzip_stream_uses_blob_writer():
+    client = MagicMock()
+    writer = io.BytesIO()
+    blob = client.bucket.return_value.blob.return_value
+    blob.open.return_value.__enter__.return_value = writer
+
+    gcs = utils.GCSClient("bucket", client=client, upload_chunk_size=300 * 1024)
+    assert gcs.upload_json_gzip([{"playerId": "p1"}], "a/players.json.gz", stream=True)
+
+    assert gcs.upload_chunk_size == 256 * 1024
+    assert blob.open.call_args.kwargs["chunk_size"] == 256 * 1024
+    blob.upload_from_file.assert_not_called()
+    assert json.loads(gzip.decompress(writer.getvalue())) == [{"playerId": "p1"}]
+
+
+def test_stream_upload_with_patched_client_class(monkeypatch):
+    # Os jobs patcham `<módulo>.utils.GCSClient`; a serialização em streaming
+    # de uma instância real não pode depender do nome global da classe
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    monkeypatch.setattr(utils, "GCSClient", MagicMock())
+    players = [{"playerId": "p1", "rosterUnit": [{"id": "A"}]}, {"playerId": "p2"}]
+
+    assert gcs.upload_json_gzip(players, "a/players.json.gz", stream=True)
+    assert gcs.load_json_gzip("a/players.json.gz") == players
+
+
+# -------------------------
+# Codecs de compressão
+# -------------------------
+
+
+@pytest.mark.parametrize("path", ["a.json.gz", "a.json.xz", "a.json.bz2"])
+def test_codec_roundtrip_by_extension(path):
+    codec = utils.codec_for_path(path)
+    assert path.endswith(codec.extension)
+    assert codec.decompress(codec.compress(b'{"x": 1}', level=1)) == b'{"x": 1}'
+
+
+def test_compression_level_defaults_and_env(monkeypatch):
+    def xfl(gcs, path):
+        # Byte XFL do cabeçalho gzip: 2 = nível 9, 4 = nível 1
+        gcs.upload_json_gzip({"member": [1]}, path)
+        data, _ = gcs._download_bytes(path)
+        return data[8]
+
+    monkeypatch.delenv("GCS_COMPRESSION_LEVEL", raising=False)
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    assert gcs.compression_level_for("g/guild.json.gz") is None
+    assert xfl(gcs, "g/guild.json.gz") == 2
+
+    monkeypatch.setenv("GCS_COMPRESSION_LEVEL", "*/players*=1, bogus, *=9")
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    assert gcs.compression_levels == {"*/players*": 1, "*": 9}
+    assert xfl(gcs, "g/players.json.gz") == 4
+    assert xfl(gcs, "g/guild.json.gz") == 2
+
+    monkeypatch.setenv("GCS_COMPRESSION_LEVEL", "1")
+    assert utils.GCSClient("bucket", client=utils.MemoryStorageClient()).compression_levels == {
+        "*": 1
+    }
+
+
+def test_upload_and_load_use_codec_from_path():
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    gcs = utils.GCSClient("bucket", client=client, compression_level=1)
+
+    assert gcs.upload_json_gzip({"member": [1]}, "g/players.json.xz")
+    sent = blob.upload_from_file.call_args.args[0].getvalue()
+    assert sent.startswith(b"\xfd7zXZ")
+
+    blob.download_as_bytes.return_value = sent
+    assert gcs.load_json_gzip("g/players.json.xz") == {"member": [1]}
+    assert utils.codec_for_path("g/guild.json").name == "gzip"
+
+
+# -------------------------
+# Serialização JSON
+# -------------------------
+
+
+def test_serializers_are_byte_identical():
+    data = {
+        "member": [{"playerId": "p1", "nome": "ação", "gp": 2**63, "ratio": 0.25}],
+        "when": datetime(2024, 1, 2, tzinfo=timezone.utc),
+        1: None,
+        "huge": 2**70,  # fora do orjson: cai para a stdlib
+    }
+    stdlib = utils.get_serializer("json")
+    fast = utils.get_serializer("orjson")
+    assert fast.dumps(data) == stdlib.dumps(data)
+    assert fast.loads(stdlib.dumps(data)) == stdlib.loads(fast.dumps(data))
+
+
+def test_orjson_keeps_non_finite_floats():
+    data = {"stats": [{"value": float("nan")}, {"value": float("-inf")}], "relic": None}
+    stdlib = utils.get_serializer("json")
+    fast = utils.get_serializer("orjson")
+
+    # orjson gravaria null; a stdlib preserva NaN/-Infinity
+    assert fast.dumps(data) == stdlib.dumps(data)
+    loaded = fast.loads(fast.dumps(data))
+    assert math.isnan(loaded["stats"][0]["value"])
+    assert loaded["stats"][1]["value"] == float("-inf")
+    # null legítimo continua no caminho rápido, com a mesma saída
+    assert fast.dumps({"relic": None, "ratio": 0.25}) == stdlib.dumps(
+        {"relic": None, "ratio": 0.25}
+    )
+
+
+@pytest.mark.parametrize(
+    "value", [1e16, -1.5e300, 1.2345678901234568e17, 1e-05, 2.5e-07, -3e-100, 1e15, 0.0001]
+)
+def test_orjson_matches_stdlib_float_spelling(value):
+    stdlib = utils.get_serializer("json")
+    fast = utils.get_serializer("orjson")
+    data = {"stats": [{"value": value}, value], "name": "1e16"}
+
+    assert fast.dumps(data) == stdlib.dumps(data)
+    assert fast.dumps(value) == stdlib.dumps(value)
+
+
+def test_get_serializer_from_env(monkeypatch):
+    monkeypatch.setenv("JSON_SERIALIZER", "json")
+    assert utils.get_serializer().name == "json"
+    with pytest.raises(ValueError):
+        utils.get_serializer("ujson")
+
+
+# -------------------------
+# Leitura JSON em streaming
+# -------------------------
+
+
+def test_parse_key_path():
+    each = utils.parse_key_path("[*]")[0]
+    assert utils.parse_key_path("member[*]") == ("member", each)
+    assert utils.parse_key_path("data.totalBanners[*]") == ("data", "totalBanners", each)
+    with pytest.raises(ValueError):
+        utils.parse_key_path("member[0]")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_iter_json_paths_small_chunks(chunk_size, monkeypatch):
+    doc = {
+        "skip": {"s": 'x"}]{[\\', "n": [1, [2, {}]]},
+        "territoryMapId": "O1690000000000",
+        "data": {"totalBanners": [{"memberId": "p1", "banners": 10}, {"memberId": "p2"}]},
+    }
+    monkeypatch.setattr(utils._JsonStream.__init__, "__defaults__", (chunk_size,))
+    items = list(
+        utils.iter_json_paths(
+            io.StringIO(json.dumps(doc)), ["data.totalBanners[*]", "territoryMapId"]
+        )
+    )
+    assert items == [
+        ("territoryMapId", "O1690000000000"),
+        ("data.totalBanners[*]", {"memberId": "p1", "banners": 10}),
+        ("data.totalBanners[*]", {"memberId": "p2"}),
+    ]
+
+
+def test_load_json_gzip_select_projects_fields():
+    doc = {
+        "profile": {"name": "guild"},
+        "member": [{"playerId": "p1", "playerName": "A", "rosterUnit": [1, 2, 3]}],
+        "data": {"totalBanners": []},
+    }
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    blob.open.return_value.__enter__.return_value = io.BytesIO(
+        gzip.compress(json.dumps(doc).encode("utf-8"))
+    )
+
+    gcs = utils.GCSClient("bucket", client=client)
+    result = gcs.load_json_gzip(
+        "g/guild.json.gz", select={"member[*]": ["playerId"], "data.totalBanners[*]": None}
+    )
+
+    assert result == {"member": [{"playerId": "p1"}], "data": {"totalBanners": []}}
+    blob.download_as_bytes.assert_not_called()
+
+
+# -------------------------
+# Leitura em um único request / condicional por generation
+# -------------------------
+
+
+def test_load_json_gzip_single_request_not_found():
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    blob.download_as_bytes.side_effect = NotFound("missing")
+
+    gcs = utils.GCSClient("bucket", client=client)
+    assert gcs.load_json_gzip("calendar/calendar.json.gz") is None
+    blob.exists.assert_not_called()
+
+
+def test_load_json_gzip_if_exists(caplog):
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    gcs.upload_json_gzip({"a": 1}, "g/state.json.gz")
+
+    assert gcs.load_json_gzip_if_exists("g/state.json.gz") == {"a": 1}
+    assert gcs.load_json_gzip_if_exists("g/missing.json.gz") is None
+    assert "não encontrado" not in caplog.text
+
+    gcs.bucket.blob("g/broken.json.gz").upload_from_string(b"not gzip")
+    with pytest.raises(Exception):
+        gcs.load_json_gzip_if_exists("g/broken.json.gz")
+
+
+def test_fetch_json_gzip_generation():
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    blob.download_as_bytes.return_value = gzip.compress(b'{"code": 0}')
+    blob.generation = 7
+
+    gcs = utils.GCSClient("bucket", client=client)
+    assert gcs.fetch_json_gzip("a.json.gz") == ({"code": 0}, 7, False)
+
+    blob.download_as_bytes.side_effect = NotModified("304")
+    result = gcs.fetch_json_gzip("a.json.gz", if_generation_not_match=7)
+    assert result.not_modified and result.data is None and result.generation == 7
+    assert blob.download_as_bytes.call_args.kwargs["if_generation_not_match"] == 7
+
+
+# -------------------------
+# Cache local em disco
+# -------------------------
+
+
+def test_disk_cache_lru_eviction(tmp_path):
+    cache = utils.DiskCache(str(tmp_path), max_bytes=25)
+    cache.put("b", "a.json.gz", 1, b"x" * 10)
+    cache.put("b", "b.json.gz", 1, b"y" * 10)
+    os.utime(cache._object_path("b", "a.json.gz", 1), (0, 0))  # "a" vira o menos recente
+    assert cache.get("b", "b.json.gz", 1) == b"y" * 10
+    cache.put("b", "c.json.gz", 1, b"z" * 10)
+
+    assert cache.get("b", "a.json.gz", 1) is None
+    assert cache.get("b", "c.json.gz", 1) == b"z" * 10
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert cache.latest_generation("b", "c.json.gz") == 1
+
+
+def test_disk_cache_put_same_key_keeps_size(tmp_path):
+    cache = utils.DiskCache(str(tmp_path), max_bytes=25)
+    cache.put("b", "a.json.gz", 1, b"x" * 10)
+    cache.put("b", "a.json.gz", 1, b"y" * 10)
+    cache.put("b", "c.json.gz", 1, b"z" * 10)
+
+    # A regravação substitui o arquivo: 20 bytes em disco, nada a remover
+    assert cache.stats()["size_bytes"] == 20
+    assert cache.stats()["evictions"] == 0
+    assert cache.get("b", "a.json.gz", 1) == b"y" * 10
+
+    cache.put("b", "c.json.gz", 1, b"z" * 4)
+    assert cache.stats()["size_bytes"] == 14
+    assert sorted(os.listdir(tmp_path / "objects")) == sorted(
+        os.path.basename(cache._object_path("b", name, 1)) for name in ("a.json.gz", "c.json.gz")
+    )
+
+
+def test_is_immutable_path():
+    assert utils.is_immutable_path("g1/daily/2020/01/02/guild.json.gz")
+    assert not utils.is_immutable_path("g1/events/tw/20200102/twleaderboard.json.gz")
+    assert not utils.is_immutable_path("g1/events/tb/20200102/live/tbleaderboard/_head.json.gz")
+    today = datetime.now(timezone.utc)
+    assert not utils.is_immutable_path(
+        f"g1/daily/{today.year}/{today.month:02}/{today.day:02}/guild.json.gz"
+    )
+    assert not utils.is_immutable_path("g1/manifest.json.gz")
+
+
+def test_gcs_client_cache_avoids_network(tmp_path):
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    blob.download_as_bytes.return_value = gzip.compress(b'{"member": []}')
+    blob.generation = 42
+    gcs = utils.GCSClient("bucket", client=client, cache=utils.DiskCache(str(tmp_path)))
+
+    immutable = "g1/daily/2020/01/02/guild.json.gz"
+    assert gcs.load_json_gzip(immutable) == {"member": []}
+    assert gcs.load_json_gzip(immutable) == {"member": []}
+    assert blob.download_as_bytes.call_count == 1
+
+    # Path mutável: revalida por generation e usa a cópia local no 304
+    mutable = "calendar/latest.json.gz"
+    gcs.load_json_gzip(mutable)
+    blob.download_as_bytes.side_effect = NotModified("304")
+    assert gcs.load_json_gzip(mutable) == {"member": []}
+    assert blob.download_as_bytes.call_args.kwargs == {"if_generation_not_match": 42}
+
+
+def test_cached_client_rereads_rewritten_live_head(tmp_path):
+    # Evento de vários dias: o poller regrava o _head na pasta da data de
+    # início, que já é passada; outro leitor com cache precisa ver a versão nova
+    writer = utils.GCSClient("bucket", client=utils.LocalStorageClient(str(tmp_path / "gcs")))
+    reader = utils.GCSClient(
+        "bucket",
+        client=utils.LocalStorageClient(str(tmp_path / "gcs")),
+        cache=utils.DiskCache(str(tmp_path / "cache")),
+    )
+    head = "g1/events/tw/20200102/live/twleaderboard/_head.json.gz"
+
+    writer.upload_json_gzip({"seq": 1}, head)
+    assert reader.load_json_gzip(head) == {"seq": 1}
+    writer.upload_json_gzip({"seq": 2}, head)
+    assert reader.load_json_gzip(head) == {"seq": 2}
+
+
+# -------------------------
+# Backends de storage
+# -------------------------
+
+
+@pytest.fixture(params=["local", "memory"])
+def store_client(request, tmp_path):
+    if request.param == "local":
+        return utils.LocalStorageClient(str(tmp_path))
+    return utils.MemoryStorageClient()
+
+
+def test_storage_backend_roundtrip(store_client):
+    gcs = utils.GCSClient("bucket", client=store_client)
+    doc = {"member": [{"playerId": "p1"}, {"playerId": "p2"}]}
+
+    assert gcs.upload_json_gzip(doc, "g/daily/guild.json.gz")
+    assert gcs.upload_json_gzip(doc["member"], "g/daily/players.json.gz", stream=True)
+    assert gcs.load_json_gzip("g/daily/guild.json.gz") == doc
+    assert list(gcs.iter_json_gzip("g/daily/players.json.gz", "[*]")) == doc["member"]
+    assert gcs.load_json_gzip("g/daily/missing.json.gz") is None
+
+    first = gcs.fetch_json_gzip("g/daily/guild.json.gz")
+    assert first.data == doc and first.generation is not None
+    assert gcs.fetch_json_gzip("g/daily/guild.json.gz", first.generation).not_modified
+
+    gcs.upload_json_gzip({"member": []}, "g/daily/guild.json.gz")
+    second = gcs.fetch_json_gzip("g/daily/guild.json.gz", first.generation)
+    assert second.data == {"member": []} and second.generation > first.generation
+
+    names = [b.name for b in store_client.bucket("bucket").list_blobs(prefix="g/daily/")]
+    assert names == ["g/daily/guild.json.gz", "g/daily/players.json.gz"]
+
+
+def test_local_storage_layout_and_failed_write(tmp_path):
+    bucket = utils.LocalStorageClient(str(tmp_path)).bucket("bucket")
+    with pytest.raises(RuntimeError):
+        with bucket.blob("a/x.json.gz").open("wb") as writer:
+            writer.write(b"partial")
+            raise RuntimeError("falha no meio")
+    assert not bucket.blob("a/x.json.gz").exists()
+
+    bucket.blob("a/x.json.gz").upload_from_string(b"ok")
+    assert (tmp_path / "bucket" / "a" / "x.json.gz").read_bytes() == b"ok"
+    with pytest.raises(ValueError):
+        bucket.blob("../escape.json.gz").upload_from_string(b"x")
+
+
+def test_storage_client_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("STORAGE_LOCAL_DIR", str(tmp_path))
+    assert isinstance(utils.storage_client_from_env(), utils.LocalStorageClient)
+
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    assert utils.storage_client_from_env() is utils.storage_client_from_env()
+
+    monkeypatch.setenv("STORAGE_BACKEND", "s3")
+    with pytest.raises(ValueError):
+        utils.storage_client_from_env()
+
+
+# -------------------------
+# Manifest diário
+# -------------------------
+
+
+def test_bronze_manifest_record_and_resolve():
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    doc = {"territoryMapId": "O1", "data": {"totalBanners": [{"memberId": "p1"}]}}
+    assert gcs.upload_json_gzip(doc, "g/events/tw/20240102/twleaderboard.json.gz")
+    assert gcs.upload_json_gzip([1, 2], "g/daily/2024/01/02/players.json.gz", stream=True)
+
+    manifest = utils.BronzeManifest(gcs, "g", datetime(2024, 1, 2, tzinfo=timezone.utc))
+    assert manifest.path == "g/manifest/20240102.json.gz"
+    assert manifest.record(
+        "twleaderboard", "g/events/tw/20240102/twleaderboard.json.gz", records=1, event_id="O1"
+    )
+    assert manifest.record("players", "g/daily/2024/01/02/players.json.gz", records=2)
+
+    entry = utils.BronzeManifest(gcs, "g", "20240102").resolve("twleaderboard")
+    info = gcs.uploaded["g/events/tw/20240102/twleaderboard.json.gz"]
+    assert entry["eventId"] == "O1" and entry["records"] == 1
+    assert entry["generation"] == info.generation and entry["size"] == info.size
+    assert entry["sha256"] == hashlib.sha256(utils.get_serializer().dumps(doc)).hexdigest()
+    assert utils.BronzeManifest(gcs, "g", "20240102").resolve("players")["size"] > 0
+    assert utils.BronzeManifest(gcs, "g", "20240103").resolve("players") is None
+
+
+def test_bronze_manifest_retries_on_concurrent_update():
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    manifest = utils.BronzeManifest(gcs, "g", "20240102")
+    other = utils.BronzeManifest(gcs, "g", "20240102")
+    original_load = manifest.load
+    calls = []
+
+    def racing_load():
+        result = original_load()
+        if not calls:
+            # Outro job grava entre a leitura e a escrita deste
+            other.record("guild", "g/daily/2024/01/02/guild.json.gz")
+        calls.append(1)
+        return result
+
+    manifest.load = racing_load
+    assert manifest.record("players", "g/daily/2024/01/02/players.json.gz")
+
+    assert len(calls) == 2
+    objects = manifest.load()[0]["objects"]
+    assert set(objects) == {"guild", "players"}
+
+
+# -------------------------
+# Objetos fragmentados
+# -------------------------
+
+
+def test_sharded_writer_roundtrip():
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    prefix = "g/daily/2024/01/02/players"
+    assert utils.shard_path(prefix, "a/b c") == f"{prefix}/a_b_c.json.gz"
+
+    writer = utils.ShardedJsonWriter(gcs, prefix, max_workers=2, max_pending=1)
+    for i in range(5):
+        writer.put(f"p{i}", {"playerId": f"p{i}"})
+    assert utils.load_shard_manifest(gcs, prefix) is None  # ainda não fechado
+
+    manifest = writer.close(extra={"expected": 5})
+    assert manifest["complete"] and manifest["count"] == 5 and manifest["expected"] == 5
+    assert manifest["shards"]["p3"]["path"] == f"{prefix}/p3.json.gz"
+    assert manifest["shards"]["p3"]["size"] == gcs.uploaded[f"{prefix}/p3.json.gz"].size
+
+    shards = dict(utils.iter_shards(gcs, prefix, max_workers=3))
+    assert shards == {f"p{i}": {"playerId": f"p{i}"} for i in range(5)}
+    assert dict(utils.iter_shards(gcs, prefix, keys=["p1", "x"])) == {"p1": {"playerId": "p1"}}
+
+    with pytest.raises(FileNotFoundError):
+        list(utils.iter_shards(gcs, "g/daily/2024/01/03/players"))
+
+
+def test_sharded_writer_records_failures():
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    upload = gcs._upload_json_gzip
+
+    def flaky_upload(data, path, *args, **kwargs):
+        if path.endswith("bad.json.gz"):
+            raise RuntimeError("falha")
+        return upload(data, path, *args, **kwargs)
+
+    gcs._upload_json_gzip = flaky_upload
+    writer = utils.ShardedJsonWriter(gcs, "p")
+    writer.put("ok", {"a": 1})
+    writer.put("bad", {"a": 2})
+    manifest = writer.close()
+
+    assert not manifest["complete"] and manifest["errors"] == {"bad": "falha"}
+    assert list(manifest["shards"]) == ["ok"]
+    assert utils.load_shard_manifest(gcs, "p") == manifest
+
+
+# -------------------------
+# Deduplicação por hash de conteúdo
+# -------------------------
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_upload_json_gzip_dedup(store_client, stream):
+    gcs = utils.GCSClient("bucket", client=store_client)
+    bucket = store_client.bucket("bucket")
+    calendar = {"events": [{"id": "TW"}]}
+
+    assert gcs.upload_json_gzip(calendar, "calendar/d1.json.gz", stream, dedup_key="calendar")
+    first = bucket.get_blob("calendar/d1.json.gz")
+    assert first.metadata["sha256"] == gcs.uploaded["calendar/d1.json.gz"].sha256
+
+    # Mesmo conteúdo, mesmo path: nada é reescrito
+    assert gcs.upload_json_gzip(calendar, "calendar/d1.json.gz", stream, dedup_key="calendar")
+    again = bucket.get_blob("calendar/d1.json.gz")
+    assert again.generation == first.generation
+    assert again.metadata["dedupSkips"] == "1"
+
+    # Mesmo conteúdo, path novo: cópia no servidor marcada com a origem
+    assert gcs.upload_json_gzip(calendar, "calendar/d2.json.gz", stream, dedup_key="calendar")
+    copied = bucket.get_blob("calendar/d2.json.gz")
+    assert copied.metadata["dedupOf"] == "calendar/d1.json.gz"
+    assert "dedupSkips" not in copied.metadata
+    assert gcs.load_json_gzip("calendar/d2.json.gz") == calendar
+
+    # Conteúdo novo: upload normal
+    assert gcs.upload_json_gzip({"events": []}, "calendar/d3.json.gz", dedup_key="calendar")
+    assert "dedupOf" not in bucket.get_blob("calendar/d3.json.gz").metadata
+    assert gcs.load_json_gzip("_dedup/calendar.json.gz")["path"] == "calendar/d3.json.gz"
+
+
+# -------------------------
+# Snapshots diários em delta
+# -------------------------
+
+
+def test_json_delta_roundtrip():
+    old = {
+        "name": "A",
+        "gone": 1,
+        "stats": {"gp": 10, "tags": [1, 2]},
+        "rosterUnit": [{"id": "u1", "relic": 1}, {"id": "u2", "relic": 2}, {"id": "u3"}],
+        "ids": [{"id": 1}, {"id": 2}],
+    }
+    new = {
+        "name": "A",
+        "stats": {"gp": 11, "tags": [1, 2, 3]},
+        "rosterUnit": [{"id": "u2", "relic": 3}, {"id": "u1", "relic": 1}, {"id": "u4"}],
+        "ids": [{"id": 2}],
+        "extra": None,
+    }
+    delta = utils.json_delta(old, new)
+    assert utils.apply_json_delta(old, delta) == new
+    assert delta["sub"]["rosterUnit"]["del"] == ["u3"]
+    assert delta["set"]["ids"] == [{"id": 2}]  # ids não-str: substituição integral
+    assert utils.json_delta(new, new) is None
+
+
+def test_players_snapshots_base_and_deltas():
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    snapshots = utils.PlayersSnapshots(gcs, "g", base_interval=3)
+    start = datetime(2024, 1, 1).date()
+
+    days = []
+    players = [
+        {"playerId": f"p{i}", "gp": i, "rosterUnit": [{"id": "u", "relic": 1}]} for i in range(3)
+    ]
+    for offset in range(5):
+        players = [dict(p) for p in players]
+        players[offset % 3]["gp"] += 100
+        if offset == 2:
+            players.append({"playerId": "p9", "gp": 0})
+        days.append(players)
+
+    paths = [snapshots.write(start + timedelta(days=i), p) for i, p in enumerate(days)]
+    assert [p.rsplit("/", 1)[1] for p in paths] == [
+        "players.json.gz",
+        "players.delta.json.gz",
+        "players.delta.json.gz",
+        "players.json.gz",
+        "players.delta.json.gz",
+    ]
+    for i, expected in enumerate(days):
+        assert snapshots.read(start + timedelta(days=i)) == expected
+    assert snapshots.read(start + timedelta(days=9)) is None
+
+    # Reexecução do dia como base remove o delta anterior
+    utils.PlayersSnapshots(gcs, "g", base_interval=1).write(start + timedelta(days=4), days[4])
+    assert snapshots.read(start + timedelta(days=4)) == days[4]
+    assert not gcs.bucket.blob("g/daily/2024/01/05/players.delta.json.gz").exists()
+
+
+# -------------------------
+# Operações em lote
+# -------------------------
+
+
+def test_load_many_json_gzip_results_and_errors():
+    client = MagicMock()
+
+    def make_blob(path, **kwargs):
+        blob = MagicMock()
+        if path == "missing.json.gz":
+            blob.download_as_bytes.side_effect = NotFound("missing")
+        else:
+            blob.download_as_bytes.return_value = gzip.compress(json.dumps({"p": path}).encode())
+        return blob
+
+    client.bucket.return_value.blob.side_effect = make_blob
+    gcs = utils.GCSClient("bucket", client=client)
+
+    batch = gcs.load_many_json_gzip(["a.json.gz", "missing.json.gz", "b.json.gz"], max_workers=3)
+
+    assert batch.results == {"a.json.gz": {"p": "a.json.gz"}, "b.json.gz": {"p": "b.json.gz"}}
+    assert isinstance(batch.errors["missing.json.gz"], NotFound)
+    stats = batch.stats()
+    assert stats["items"] == 3 and stats["failed"] == 1 and not batch.ok
+
+
+def test_upload_many_json_gzip():
+    client = MagicMock()
+    gcs = utils.GCSClient("bucket", client=client)
+
+    batch = gcs.upload_many_json_gzip({"a.json.gz": {"x": 1}, "b.json.gz": [1, 2]})
+
+    assert batch.ok
+    assert batch.results == {"a.json.gz": True, "b.json.gz": True}
+    assert client.bucket.return_value.blob.return_value.upload_from_file.call_count == 2
+
+
+# -------------------------
+# Parquet colunar
+# -------------------------
+
+
+def test_flatten_record_and_table():
+    record = {"playerId": "p1", "profile": {"gp": 10}, "tags": [1], "memberContribution": []}
+    flat = utils.flatten_record(record, exclude=["memberContribution"])
+    assert flat == {"playerId": "p1", "profile_gp": 10, "tags": "[1]"}
+
+    table = utils.records_to_table([{"a": 1, "b": "x"}, {"a": "2"}, {"b": None}])
+    assert table.column("a").to_pylist() == ["1", "2", None]
+    assert table.column("b").to_pylist() == ["x", None, None]
+
+
+def test_upload_and_load_parquet_roundtrip():
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    stored = {}
+    blob.upload_from_file.side_effect = lambda f, **kw: stored.setdefault("data", f.read())
+    gcs = utils.GCSClient("bucket", client=client)
+
+    rows = [{"memberId": "p1", "banners": 10}, {"memberId": "p2", "banners": 5}]
+    assert utils.upload_bronze_parquet(gcs, "g/tw/twleaderboard.json.gz", {"totalBanners": rows})
+    assert client.bucket.return_value.blob.call_args.args[0] == (
+        "g/tw/twleaderboard.totalBanners.parquet"
+    )
+
+    blob.download_as_bytes.return_value = stored["data"]
+    df = gcs.load_parquet("g/tw/twleaderboard.totalBanners.parquet", columns=["banners"])
+    assert list(df.columns) == ["banners"]
+    assert df["banners"].tolist() == [10, 5]
+
+
+# -------------------------
+# Checkpoint de coleta
+# -------------------------
+
+
+def test_collection_checkpoint(monkeypatch, tmp_path):
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    checkpoint = utils.CollectionCheckpoint(gcs, "g/_checkpoint/players.json.gz")
+    assert checkpoint.load() == {"collected": set(), "failed": set()}
+
+    checkpoint.save(collected=["p1", "p2"], failed=["p2", "p3"])
+    assert checkpoint.load() == {"collected": {"p1", "p2"}, "failed": {"p3"}}
+
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    local = utils.CollectionCheckpoint.from_env(gcs, "g/_checkpoint/players.json.gz")
+    local.save(collected=["p9"])
+    assert (tmp_path / "checkpoints" / "g" / "_checkpoint" / "players.json.gz").exists()
+    assert local.load()["collected"] == {"p9"}
+    assert checkpoint.load()["collected"] == {"p1", "p2"}
+
+
+# -------------------------
+# Execução em várias guilds
+# -------------------------
+
+
+def test_guild_ids_and_allycodes_from_env(monkeypatch):
+    monkeypatch.delenv("GUILD_IDS", raising=False)
+    monkeypatch.delenv("GUILD_ID", raising=False)
+    with pytest.raises(ValueError):
+        utils.guild_ids_from_env()
+
+    monkeypatch.setenv("GUILD_ID", "g0")
+    monkeypatch.setenv("ALLYCODE", "100")
+    assert utils.guild_ids_from_env() == ["g0"]
+    assert utils.allycodes_for_guilds(["g0"]) == {"g0": "100"}
+
+    monkeypatch.setenv("GUILD_IDS", " g1, g2 ,g1,")
+    assert utils.guild_ids_from_env() == ["g1", "g2"]
+    with pytest.raises(ValueError):
+        utils.allycodes_for_guilds(["g1", "g2"])
+    monkeypatch.setenv("ALLYCODES", "111,222")
+    assert utils.allycodes_for_guilds(["g1", "g2"]) == {"g1": "111", "g2": "222"}
+
+
+def test_run_for_guilds_isolates_failures(caplog):
+    caplog.set_level("INFO")
+    done = []
+
+    def process(guild_id):
+        if guild_id == "g2":
+            raise SystemExit(1)
+        if guild_id == "g3":
+            raise RuntimeError("boom")
+        done.append(guild_id)
+
+    runs = utils.run_for_guilds(["g1", "g2", "g3", "g4"], process, max_workers=2)
+
+    assert list(runs) == ["g1", "g2", "g3", "g4"]
+    assert sorted(done) == ["g1", "g4"]
+    assert [run.ok for run in runs.values()] == [True, False, False, True]
+    assert "boom" in runs["g3"].error and runs["g1"].elapsed >= 0
+    assert "2/4 guilds concluídas" in caplog.text
+
+
+# -------------------------
+# Retry, timeout e hedging
+# -------------------------
+
+
+def test_latency_histogram_summary():
+    histogram = utils.LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(0.051) and summary["p95"] == pytest.approx(0.096)
+    assert summary["max"] == pytest.approx(0.1)
+    assert sum(summary["buckets"].values()) == 100 and summary["buckets"]["<=0.01s"] == 10
+
+
+def test_retry_policy_from_env(monkeypatch):
+    monkeypatch.setenv("PLAYER_FETCH_RETRIES", "4")
+    monkeypatch.setenv("PLAYER_FETCH_TIMEOUT", "0")
+    monkeypatch.setenv("PLAYER_FETCH_HEDGE", "1")
+    monkeypatch.setenv("PLAYER_FETCH_BACKOFF_BASE", "abc")
+    policy = utils.RetryPolicy.from_env("player_fetch")
+    assert policy.attempts == 5 and policy.timeout is None and policy.hedge
+    assert policy.base_delay == utils.RetryPolicy().base_delay
+    assert 0 <= policy.backoff(10) <= policy.max_delay
+
+
+def test_resilient_caller_retries_transient_errors():
+    caller = utils.ResilientCaller(utils.RetryPolicy(attempts=3, base_delay=0.001))
+    outcomes = [ConnectionError("reset"), Exception("status 503"), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert caller.call(flaky) == "ok"
+    assert caller.stats()["retries"] == 2
+
+    calls = []
+
+    def not_found():
+        calls.append(1)
+        raise Exception("status 404")
+
+    with pytest.raises(Exception, match="404"):
+        caller.call(not_found)
+    assert len(calls) == 1
+    caller.close()
+
+
+def test_resilient_caller_timeout_and_hedging():
+    caller = utils.ResilientCaller(utils.RetryPolicy(attempts=1, timeout=0.05))
+    with pytest.raises(TimeoutError):
+        caller.call(time.sleep, 0.5)
+    assert caller.stats()["timeouts"] == 1
+
+    policy = utils.RetryPolicy(attempts=1, timeout=2.0, hedge=True, hedge_min_samples=5)
+    caller = utils.ResilientCaller(policy)
+    for _ in range(5):
+        caller.call(time.sleep, 0.001)
+    delays = iter([1.0, 0.001])  # a primeira requisição trava; a duplicata responde
+
+    start = time.perf_counter()
+    caller.call(lambda: time.sleep(next(delays)))
+    assert time.perf_counter() - start < 0.5
+    stats = caller.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert stats["call_latency"]["count"] == 6
+    caller.close()
+
+
+# -------------------------
+# Projeção de campos
+# -------------------------
+
+
+def test_field_projection_apply_and_stats():
+    player = {
+        "name": "P1",
+        "allyCode": "123",
+        "datacron": [{"id": "d1", "affix": [1, 2, 3]}],
+        "rosterUnit": [
+            {"definitionId": "A:SEVEN_STAR", "relic": {"currentTier": 7}, "skill": [{"id": "s"}]},
+            {"definitionId": "B:SEVEN_STAR", "relic": None},
+        ],
+        "profileStat": [{"nameKey": "GP", "value": "1", "index": 3}],
+    }
+    projection = utils.FieldProjection(
+        ["name", "rosterUnit[*].definitionId", "rosterUnit[*].relic", "profileStat.value"],
+        serializer=utils.get_serializer("json"),
+    )
+
+    assert projection.apply(player) == {
+        "name": "P1",
+        "rosterUnit": [
+            {"definitionId": "A:SEVEN_STAR", "relic": {"currentTier": 7}},
+            {"definitionId": "B:SEVEN_STAR", "relic": None},
+        ],
+        "profileStat": [{"value": "1"}],
+    }
+    assert "datacron" in player  # o original não é alterado
+    stats = projection.stats()
+    assert stats["items"] == 1 and 0 < stats["projected_bytes"] < stats["raw_bytes"]
+    assert 0 < stats["reduction"] < 1
+
+    # Um prefixo declarado mantém o campo inteiro
+    whole = utils.FieldProjection(["rosterUnit[*].skill", "rosterUnit"])
+    assert whole.apply(player)["rosterUnit"] == player["rosterUnit"]
+
+
+def test_field_projection_from_spec(tmp_path):
+    assert utils.FieldProjection.from_spec("") is None
+    assert utils.FieldProjection.from_spec("name, allyCode").key_paths == ["name", "allyCode"]
+
+    spec = tmp_path / "players.projection"
+    spec.write_text("# perfil\nname\n\nrosterUnit[*].definitionId  # unidades\n")
+    assert utils.FieldProjection.from_spec(str(spec)).key_paths == [
+        "name",
+        "rosterUnit[*].definitionId",
+    ]
+    spec.write_text('["name"]')
+    assert utils.FieldProjection.from_spec(str(spec)).key_paths == ["name"]
+    with pytest.raises(ValueError):
+        utils.FieldProjection([])
+
+
+def test_field_projection_keeps_required_fields():
+    projection = utils.FieldProjection.from_spec("name", required=("playerId",))
+
+    assert projection.key_paths == ["name", "playerId"]
+    assert projection.apply({"playerId": "p1", "name": "P1", "xp": 1}) == {
+        "playerId": "p1",
+        "name": "P1",
+    }
+    # Já declarado no spec: não é duplicado
+    assert utils.FieldProjection(["playerId"], required=("playerId",)).key_paths == ["playerId"]
+
+
+# -------------------------
+# Extratores
+# -------------------------
+
+
+def test_extractor_context_shares_clients():
+    ctx = utils.ExtractorContext(resume=True)
+    created = []
+
+    class Client:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    def factory():
+        created.append(Client())
+        return created[-1]
+
+    ctx.current = "a"
+    first = ctx.client("x", factory)
+    ctx.current = "b"
+    assert ctx.client("x", factory) is first
+    assert len(created) == 1
+    assert ctx.get("x") is first and ctx.get("y") is None
+    assert ctx.init_time("a") > 0 and ctx.init_time("b") == 0
+    assert ctx.options == {"resume": True}
+
+    ctx.close()
+    assert first.closed
+
+
+def test_run_extractors_uploads_and_reports(monkeypatch):
+    monkeypatch.setenv("GUILD_IDS", "g1,g2")
+    monkeypatch.setenv("GCS_BUCKET_NAME", "bucket")
+    storage = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    ctx = utils.ExtractorContext()
+    ctx.client("gcs", lambda: storage)
+
+    def fetch(ctx, guild_id):
+        if guild_id == "g2":
+            raise RuntimeError("API fora")
+        return {"guild": guild_id}
+
+    extractor = utils.Extractor(
+        name="teste",
+        fetch=fetch,
+        path=lambda guild_id, payload: (f"{guild_id}/teste.json.gz", datetime(2024, 1, 1)),
+    )
+    single = utils.Extractor(
+        name="unico",
+        fetch=lambda ctx, guild_id: {"ok": True},
+        path=lambda guild_id, payload: ("unico.json.gz", datetime(2024, 1, 1)),
+        per_guild=False,
+    )
+
+    reports = utils.run_extractors([extractor, single], ctx, {"teste": 0.5})
+
+    assert [r.name for r in reports] == ["teste", "unico"]
+    assert not reports[0].ok and reports[1].ok
+    assert reports[0].guilds["g1"].ok and not reports[0].guilds["g2"].ok
+    assert reports[0].import_s == 0.5
+    assert storage.load_json_gzip("g1/teste.json.gz") == {"guild": "g1"}
+    assert storage.load_json_gzip("unico.json.gz") == {"ok": True}
+
+
+# -------------------------
+# Registro de instâncias de eventos
+# -------------------------
+
+
+def test_instance_registry_keys_and_calendar():
+    assert utils.instance_key("TERRITORY_WAR_EVENT_C01:O1700000000000") == "O1700000000000"
+    assert utils.instance_key("O1700000000000") == "O1700000000000"
+    assert utils.instance_key(None) is None
+
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    registry = utils.InstanceRegistry(gcs, "g1")
+    assert registry.get("tb", "O1") is None
+    assert registry.record("tb", [None, "TB_EVENT:O1"], "g1/events/tb/x.json.gz")
+    assert registry.get("tb", "O1")["path"] == "g1/events/tb/x.json.gz"
+    assert registry.get("tw", "O1") is None
+
+    events = {
+        "events": [
+            {
+                "type": "TERRITORY_BATTLE_EVENT",
+                "instance": [
+                    {"id": "O1", "startTime": "0", "endTime": "1000"},
+                    {"id": "O2", "startTime": "2000", "endTime": "3000"},
+                ],
+            }
+        ]
+    }
+    index = utils.CalendarIndex.build(events)
+    at = datetime.fromtimestamp(2.5, tz=timezone.utc)
+    assert index.instance("TERRITORY_BATTLE_EVENT", at)["id"] == "O2"
+    later = datetime.fromtimestamp(10, tz=timezone.utc)
+    assert index.instance("TERRITORY_BATTLE_EVENT", later)["id"] == "O1"
+    assert index.instance("TERRITORY_WAR_EVENT") is None
+
+
+# -------------------------
+# Snapshots ao vivo (poll)
+# -------------------------
+
+
+def test_live_snapshots_store_only_changes_and_resume():
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    live = utils.LiveSnapshots(gcs, "g1/events/tw/live/tw", base_every=3)
+    snapshots = [
+        {"data": [{"memberId": "p1", "banners": 1}, {"memberId": "p2", "banners": 0}]},
+        {"data": [{"memberId": "p1", "banners": 5}, {"memberId": "p2", "banners": 0}]},
+        {"data": [{"memberId": "p1", "banners": 5}, {"memberId": "p2", "banners": 0}]},
+        {"data": [{"memberId": "p1", "banners": 9}, {"memberId": "p2", "banners": 3}]},
+    ]
+
+    paths = [live.append(s, {"total": i}) for i, s in enumerate(snapshots)]
+
+    assert paths == [
+        "g1/events/tw/live/tw/base-00000.json.gz",
+        "g1/events/tw/live/tw/delta-00001.json.gz",
+        None,
+        "g1/events/tw/live/tw/base-00003.json.gz",
+    ]
+    delta = gcs.load_json_gzip(paths[1])
+    assert list(delta["delta"]["sub"]["data"]["sub"]) == ["p1"]
+    assert [live.read(i) for i in range(4)] == snapshots
+    assert [p["metrics"]["total"] for p in live.iter_series()] == [0, 1, 2, 3]
+
+    # Outro processo retoma a série de onde parou
+    resumed = utils.LiveSnapshots(gcs, "g1/events/tw/live/tw", base_every=10)
+    assert resumed.resume() == 4
+    assert resumed.base_every == 3 and resumed.previous == snapshots[3]
+    assert resumed.append(snapshots[3], {}) is None
+    assert resumed.append(snapshots[0], {}) == "g1/events/tw/live/tw/delta-00005.json.gz"
+    assert resumed.read(5) == snapshots[0]
+
+
+def test_calendar_index_cached_by_generation(tmp_path):
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    path = "calendar/2024/01/01/calendar.json.gz"
+    cache = str(tmp_path / "calendar_index.json")
+    calendar = {
+        "events": [
+            {"id": "E1", "type": "TERRITORY_WAR_EVENT", "instance": [{"id": "O1", "endTime": "9"}]},
+            {"id": "E2", "type": "TERRITORY_BATTLE_EVENT", "instance": [{"id": "O2"}]},
+        ]
+    }
+    gcs.upload_json_gzip(calendar, path)
+
+    first = utils.CalendarIndex.load(gcs, path, cache_path=cache)
+    assert first.resolve(["TERRITORY_WAR_EVENT", "TERRITORY_BATTLE_EVENT", "X"]) == {
+        "TERRITORY_WAR_EVENT": first.by_type["TERRITORY_WAR_EVENT"][0],
+        "TERRITORY_BATTLE_EVENT": first.by_type["TERRITORY_BATTLE_EVENT"][0],
+        "X": None,
+    }
+    assert first.instance("TERRITORY_WAR_EVENT")["end"] == 9
+
+    # Mesma generation: o calendário não é baixado nem reindexado
+    gcs._gzip_bytes_to_json = MagicMock(side_effect=AssertionError("não deveria decodificar"))
+    second = utils.CalendarIndex.load(gcs, path, cache_path=cache)
+    assert second.by_type == first.by_type and second.generation == first.generation
+    del gcs._gzip_bytes_to_json
+
+    # Calendário regravado: nova generation invalida o cache
+    calendar["events"][0]["instance"][0]["id"] = "O3"
+    gcs._upload_json_gzip(calendar, path)
+    third = utils.CalendarIndex.load(gcs, path, cache_path=cache)
+    assert third.instance("TERRITORY_WAR_EVENT")["id"] == "O3"
+    assert utils.CalendarIndex.load(gcs, "missing.json.gz", cache_path=cache).by_type == {}
+
+
+def test_calendar_index_concurrent_load_decodes_once(tmp_path):
+    gcs = utils.GCSClient("bucket", client=utils.MemoryStorageClient())
+    path = "calendar/2024/01/01/calendar.json.gz"
+    cache = tmp_path / "calendar_index.json"
+    gcs.upload_json_gzip({"events": [{"id": "E1", "type": "T", "instance": [{"id": "O1"}]}]}, path)
+    gcs._gzip_bytes_to_json = MagicMock(wraps=gcs._gzip_bytes_to_json)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        indexes = list(
+            pool.map(lambda _: utils.CalendarIndex.load(gcs, path, cache_path=str(cache)), range(8))
+        )
+
+    # Só a primeira thread baixa e indexa; as outras leem o cache gravado
+    assert gcs._gzip_bytes_to_json.call_count == 1
+    assert all(index.by_type == indexes[0].by_type for index in indexes)
+    assert json.loads(cache.read_text())["index"] == indexes[0].by_type
+    assert [p.name for p in tmp_path.iterdir()] == ["calendar_index.json"]